@@ -1,143 +1,490 @@
 import time
+
+# Startup time is measured from here, before any other import
+STARTUP_START = time.perf_counter()
+
 import sys
 import os
-import numpy as np
-import tensorflow as tf
-from models.samvara_model import build_samvara_model
-from models.microbiome_model import run_evolutionary_algorithm
-from models.mentor_model import MentorModel
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+import json
 import logging
-from utils.helpers import safe_remove, safe_remove_hdf5_dataset, ensure_directory_exists_and_writable, clear_existing_checkpoints
-from utils.gpu_monitor import start_gpu_monitoring
+import argparse
 
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 # Ensure the utils folder is in the Python path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), 'utils')))
 
-# Set logging configuration
-logging.basicConfig(level=logging.INFO)
-
-# Set random seed for reproducibility
-np.random.seed(42)
-tf.random.set_seed(42)
-
-# Hyperparameters
-BATCH_SIZE = 32
-EPOCHS = 50
-LEARNING_RATE = 0.001
-
-# Start GPU monitoring in a separate thread
-logging.info("Starting GPU monitoring...")
-gpu_monitor_thread = start_gpu_monitoring(interval=60)
-
-# Data Augmentation for Image Data
-data_augmentation = tf.keras.preprocessing.image.ImageDataGenerator(
-    rotation_range=20,
-    width_shift_range=0.2,
-    height_shift_range=0.2,
-    horizontal_flip=True
-)
-
-# Load data
-def load_data():
-    num_samples = 1000
-    image_data = np.random.random((num_samples, 32, 32, 3)).astype('float32')
-    text_data = np.random.randint(10000, size=(num_samples, 100)).astype('int64')
-    quantum_data_real = np.random.random((num_samples, 2)).astype('float32')
-    quantum_data_imaginary = np.random.random((num_samples, 2)).astype('float32')
-    labels = np.random.randint(10, size=(num_samples, 10)).astype('int64')
-
-    # Normalize the image, text, and quantum data
-    image_data = image_data / 255.0
-    text_data = text_data / 9999.0
-    quantum_data_real = quantum_data_real / np.max(quantum_data_real)
-    quantum_data_imaginary = quantum_data_imaginary / np.max(quantum_data_imaginary)
-
-    return image_data, text_data, quantum_data_real, quantum_data_imaginary, labels
-
-# Directory for checkpoints
-checkpoint_dir = "checkpoints/"
-ensure_directory_exists_and_writable(checkpoint_dir)
-clear_existing_checkpoints(checkpoint_dir)
-
-# Load data
-image_data, text_data, quantum_real, quantum_imaginary, labels = load_data()
-
-# Step 1: Train Material Layers (Subconscious Development)
-logging.info("Starting Phase 1: Training Material Layers (Subconscious Development)")
-
-# Build the Samvara model with material layers only
-material_model = build_samvara_model(include_immaterial=False)
-
-# Compile the material model
-material_optimizer = tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE)
-material_model.compile(optimizer=material_optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
-
-# Use a timestamp for unique file names to avoid conflicts
-timestamp = int(time.time())
-
-# Define filepaths
-material_best_model_path = os.path.join(checkpoint_dir, f'material_best_model_{timestamp}.keras')
-material_final_weights_path = os.path.join(checkpoint_dir, f'material_final_model_weights_{timestamp}.weights.h5')
-
-# Ensure pre-existing files or datasets are safely removed
-safe_remove(material_best_model_path)
-safe_remove(material_final_weights_path)
-
-# Train and save the best model during training
-material_history = material_model.fit(
-    [image_data, text_data], labels,
-    validation_split=0.2,
-    epochs=EPOCHS,
-    batch_size=BATCH_SIZE,
-    callbacks=[EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True),
-               ModelCheckpoint(filepath=material_best_model_path, save_best_only=True)],
-    verbose=1
-)
-
-# Save only the final weights with a .weights.h5 extension
-material_model.save_weights(material_final_weights_path)
-
-# Step 2: Evolve Microbiome Model (Evolutionary Algorithm)
-logging.info("Running Evolutionary Algorithm to simulate Microbiome Influence")
-evolutionary_data = run_evolutionary_algorithm(image_data, text_data, quantum_real, quantum_imaginary, labels)
-
-# Step 3: Train Immaterial Layers (Conscious Development)
-logging.info("Starting Phase 2: Training Immaterial Layers (Conscious Development)")
-
-# Build the full Samvara model (material + immaterial layers)
-samvara_model = build_samvara_model(include_immaterial=True)
-
-# Compile the full model
-full_optimizer = tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE)
-samvara_model.compile(optimizer=full_optimizer, loss='categorical_crossentropy', metrics=['accuracy'])
-
-# Define filepaths for the full model
-samvara_best_model_path = os.path.join(checkpoint_dir, f'samvara_best_model_{timestamp}.keras')
-samvara_final_model_path = os.path.join(checkpoint_dir, f'samvara_final_model_{timestamp}.keras')
-
-# Ensure pre-existing files or datasets are safely removed
-safe_remove(samvara_best_model_path)
-safe_remove(samvara_final_model_path)
-
-# Introduce mentor-based reinforcement learning
-mentor = MentorModel()
-
-full_history = samvara_model.fit(
-    [image_data, text_data, quantum_real, quantum_imaginary], labels,
-    validation_split=0.2,
-    epochs=EPOCHS,
-    batch_size=BATCH_SIZE,
-    callbacks=[mentor, EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True),
-               ModelCheckpoint(filepath=samvara_best_model_path, save_best_only=True)],
-    verbose=1
-)
-
-# Ensure no dataset conflicts in the HDF5 file before saving the final model
-safe_remove_hdf5_dataset(samvara_final_model_path, 'model_weights')
-
-# Save the full model (architecture + weights) using .keras
-samvara_model.save(samvara_final_model_path)
-logging.info(f"Final Samvara Model saved.")
+# Subcommands of the command line; heavy modules (TensorFlow, the models) are only imported by those that need them
+COMMANDS = {
+    "train": "Run the training pipeline: material phase, evolution and full phase (the default)",
+    "evolve": "Run only the evolutionary algorithm on the dataset store",
+    "benchmark": "Run the CPU benchmark suite (see utils/benchmark.py)",
+    "export": "Export a saved model as SavedModel and TFLite artifacts (see utils/export.py)",
+    "debug": "Run the environment health checks (see utils/debugger.py)",
+}
+
+
+def startup_report(command):
+    """Time from the start of main.py until `command` has imported its modules, and what it imported."""
+    return {
+        "command": command,
+        "startup_ms": round((time.perf_counter() - STARTUP_START) * 1000, 1),
+        "tensorflow_imported": "tensorflow" in sys.modules,
+        "modules_imported": len(sys.modules),
+    }
+
+
+def train(argv=None, ready=lambda: None):
+    """The training pipeline. Resumes an interrupted run from its checkpoints unless --fresh is given."""
+    from utils.parser import parse_arguments
+
+    # Parse command line arguments
+    args = parse_arguments(argv)
+
+    import numpy as np
+    import tensorflow as tf
+    import models.microbiome_model as microbiome_model
+    from models.samvara_model import build_samvara_model, configure_material_layers
+    from models.material_layers import VOCAB_SIZE, MAX_TEXT_LENGTH
+    from models.microbiome_model import run_evolutionary_algorithm, make_fitness_fn
+    from models.microbiome_stream import EvolutionStream
+    from models.mentor_model import MentorModel, MentorSchedule
+    from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
+    from utils.helpers import safe_remove, safe_remove_hdf5_dataset, ensure_directory_exists_and_writable
+    from utils.helpers import clear_existing_checkpoints, random_token_sequences
+    from utils.telemetry import Telemetry
+    from utils.telemetry_callback import TelemetryCallback
+    from utils.data_pipeline import write_dataset_shards, list_dataset_shards, load_spec, build_dataset
+    from utils.augmentation import build_augmentation, augment_batches
+    from utils.dataset_store import write_dataset_store, dataset_store_exists, open_dataset_store
+    from utils.fast_training import configure_fast_training
+    from utils.training_state import load_training_state, is_phase_complete, mark_phase_complete, backup_dir_for
+    from utils.training_callbacks import TimeToTarget
+    from utils.hyperparameter_search import split_config
+    from utils.distributed import make_strategy, is_chief, worker_dir, scale_for_replicas
+    from utils.profiling import FunctionTimer, profile_layers, trace_callback, summarize_trace, log_report
+    from utils.profiling import write_report
+    ready()
+
+    # Distribution strategy, created before any other TensorFlow work. Models are built in its scope. Saving runs
+    # collective ops, so every worker runs the checkpoint callbacks, but only the chief's ModelCheckpoint files are
+    # kept (Keras writes the other workers' copies to temporary files). Other workers keep their data, training state
+    # and backups in private subdirectories.
+    strategy = make_strategy(args.distributed, cpu_replicas=args.cpu_replicas)
+    chief = is_chief(strategy)
+
+    # Set random seed for reproducibility
+    np.random.seed(42)
+    tf.random.set_seed(42)
+
+    # Hyperparameters
+    BATCH_SIZE = 32
+    EPOCHS = 50
+    LEARNING_RATE = 0.001
+    LR_WARMUP_STEPS = 100  # Phase 2 learning rate warms up linearly over these steps
+    LR_DECAY_RATE = 0.5  # and then halves every LR_DECAY_STEPS steps
+    LR_DECAY_STEPS = 10000
+    SHUFFLE_BUFFER = 10000
+    NUM_SHARDS = 8
+    # Text lengths at which training batches are split into buckets of similar length
+    TEXT_BUCKET_BOUNDARIES = (25, 50, 75)
+    VALIDATION_SPLIT = 0.2
+    EVOLUTION_WORKERS = -1  # Process pool size for the evolutionary phase, -1 uses every core
+    EVOLUTION_PARAMS = {}  # Overrides of the evolve_population defaults (mutation/crossover rate, fitness threshold)
+
+    # Tuned hyperparameters from utils/hyperparameter_search.py replace the defaults above
+    if args.hyperparameters:
+        with open(args.hyperparameters) as f:
+            tuned = json.load(f)
+        training_params, EVOLUTION_PARAMS = split_config(tuned)
+        BATCH_SIZE = int(training_params.get("batch_size", BATCH_SIZE))
+        LEARNING_RATE = float(training_params.get("learning_rate", LEARNING_RATE))
+        logging.info(f"Using tuned hyperparameters from {args.hyperparameters}: {tuned}")
+    EVOLUTION_PARAMS["fitness_fn"] = make_fitness_fn(args.fitness)
+    if args.selection:
+        EVOLUTION_PARAMS["selection"] = args.selection
+
+    # BATCH_SIZE is per replica: the input pipelines use the global batch, and the learning rate scales with it
+    GLOBAL_BATCH_SIZE, LEARNING_RATE = scale_for_replicas(BATCH_SIZE, LEARNING_RATE, strategy.num_replicas_in_sync)
+    # Workers shard the training input by file or by batch position, so all of them must shuffle the same way
+    DATA_SEED = 42 if args.distributed == "multi_worker" else None
+
+    # Profile mode: one epoch per phase in a separate run, with the evolution in this process so its helpers are timed
+    if args.profile:
+        EPOCHS = 1
+        EVOLUTION_WORKERS = 1
+        function_timer = FunctionTimer()
+        function_timer.instrument(microbiome_model, ["evolve_population", "mutate_microbiomes", "crossover_microbiomes",
+                                                     "evaluate_fitness"])
+        run_evolutionary_algorithm = function_timer.wrap(run_evolutionary_algorithm)
+
+    # Opt-in fast-training mode (mixed precision, XLA, steps per execution), must be set before building models
+    compile_kwargs = configure_fast_training(mixed_precision=args.mixed_precision, jit_compile=args.jit_compile,
+                                             steps_per_execution=args.steps_per_execution)
+
+    # Sample CPU, RSS and (when available) GPU stats in a separate thread; the training phases add step times
+    logging.info("Starting telemetry...")
+    telemetry_file = os.path.join(worker_dir(os.path.dirname(args.telemetry_file), strategy),
+                                  os.path.basename(args.telemetry_file))
+    telemetry = Telemetry(interval=60, output_path=telemetry_file).start()
+    if args.telemetry_port and chief:
+        telemetry.serve(args.telemetry_port)
+
+    # Data Augmentation for Image Data: random rotation, shift and horizontal flip of whole batches, either as a
+    # parallel stage of the training input pipelines or as the first layers of the model
+    augmentation = build_augmentation(seed=DATA_SEED) if args.augmentation != "none" else None
+    pipeline_augmentation = augmentation if args.augmentation == "pipeline" else None
+    model_augmentation = augmentation if args.augmentation == "model" else None
+
+    # Load data
+    def load_data():
+        num_samples = 1000
+        image_data = np.random.random((num_samples, 32, 32, 3)).astype('float32')
+        # Token ids stay integers: sequences of 10 to 100 tokens, right-padded with 0
+        text_data = random_token_sequences(num_samples, vocab_size=VOCAB_SIZE, max_length=MAX_TEXT_LENGTH)
+        quantum_data_real = np.random.random((num_samples, 2)).astype('float32')
+        quantum_data_imaginary = np.random.random((num_samples, 2)).astype('float32')
+        labels = np.random.randint(10, size=(num_samples, 10)).astype('int64')
+
+        # Normalize the image and quantum data
+        image_data = image_data / 255.0
+        quantum_data_real = quantum_data_real / np.max(quantum_data_real)
+        quantum_data_imaginary = quantum_data_imaginary / np.max(quantum_data_imaginary)
+
+        return image_data, text_data, quantum_data_real, quantum_data_imaginary, labels
+
+    # Directory for checkpoints, kept across starts so an interrupted run resumes unless --fresh is given.
+    # Profile runs always start over in their own directory and never touch the training run.
+    checkpoint_dir = worker_dir("checkpoints/profile/" if args.profile else "checkpoints/", strategy)
+    ensure_directory_exists_and_writable(checkpoint_dir)
+    if args.fresh or args.profile:
+        clear_existing_checkpoints(checkpoint_dir)
+    training_state = load_training_state(checkpoint_dir)
+
+    # Directories for the memory-mapped dataset store, the sharded input pipeline, the evolutionary working copies,
+    # the persisted evolved population and its training shards
+    store_dir = worker_dir("data/store/", strategy)
+    data_dir = worker_dir("data/shards/", strategy)
+    run_data_dir = worker_dir("data/profile/" if args.profile else "data/", strategy)
+    evolution_dir = os.path.join(run_data_dir, "evolution/")
+    evolved_dir = os.path.join(run_data_dir, "evolved/")
+    evolved_data_dir = os.path.join(run_data_dir, "evolved_shards/")
+
+    # Generate the data and write it to disk only once, later runs open the memory-mapped store directly.
+    # The store is written last, its index marks both formats as complete.
+    if not dataset_store_exists(store_dir):
+        generated_data = load_data()
+        write_dataset_shards(data_dir, *generated_data, num_shards=NUM_SHARDS, validation_split=VALIDATION_SPLIT)
+        write_dataset_store(store_dir, *generated_data)
+        del generated_data
+    image_data, text_data, quantum_real, quantum_imaginary, labels = open_dataset_store(store_dir).modalities()
+
+    # Only the training rows are evolved, the validation rows stay untouched for a fair comparison
+    num_train = int(len(labels) * (1.0 - VALIDATION_SPLIT))
+    training_rows = tuple(array[:num_train]
+                          for array in (image_data, text_data, quantum_real, quantum_imaginary, labels))
+
+    # Training streams the TFRecord shards instead of holding the data in memory
+    train_files, val_files = list_dataset_shards(data_dir)
+    data_spec = load_spec(data_dir)
+
+    # The run id keeps file names stable across restarts of the same run
+    timestamp = training_state["run_id"]
+
+    # Define filepaths
+    material_best_model_path = os.path.join(checkpoint_dir, f'material_best_model_{timestamp}.keras')
+    material_final_weights_path = os.path.join(checkpoint_dir, f'material_final_model_weights_{timestamp}.weights.h5')
+
+    # Profiler traces (viewable in TensorBoard) and the consolidated report of a profile run
+    profile_dir = os.path.join("logs", "profile", str(timestamp))
+    profile_report = {"run_id": timestamp, "phases": {}}
+
+    def profile_callbacks(phase):
+        """Profiler trace callback for a training phase, in profile mode only."""
+        if not args.profile:
+            return []
+        first_batch, last_batch = (int(batch) for batch in args.profile_batches.split(","))
+        return [trace_callback(os.path.join(profile_dir, phase), (first_batch, last_batch))]
+
+    def profile_phase(phase, model, dataset):
+        """Per-layer forward/backward times on one batch and the summary of the phase trace, in profile mode only."""
+        if not args.profile:
+            return
+        inputs, _ = next(iter(dataset))
+        profile_report["phases"][phase] = {"layers": profile_layers(model, list(inputs)),
+                                           "trace": summarize_trace(os.path.join(profile_dir, phase))}
+
+    # Step 1: Train Material Layers (Subconscious Development)
+    if is_phase_complete(training_state, "material"):
+        logging.info("Phase 1 already completed, skipping Material Layers training")
+        # Rebuild the trained material model, phase 2 warm-starts from its weights
+        with strategy.scope():
+            material_model = build_samvara_model(include_immaterial=False, augmentation=model_augmentation)
+            material_model.load_weights(material_final_weights_path)
+    else:
+        logging.info("Starting Phase 1: Training Material Layers (Subconscious Development)")
+
+        # Build and compile the Samvara model with material layers only
+        with strategy.scope():
+            material_model = build_samvara_model(include_immaterial=False, augmentation=model_augmentation)
+            material_optimizer = tf.keras.optimizers.Adam(learning_rate=LEARNING_RATE)
+            material_model.compile(optimizer=material_optimizer, loss='categorical_crossentropy', metrics=['accuracy'],
+                                   **compile_kwargs)
+
+        # Streaming input pipelines for the material inputs only
+        material_train_dataset = build_dataset(train_files, data_spec, GLOBAL_BATCH_SIZE, include_immaterial=False,
+                                               shuffle_buffer=SHUFFLE_BUFFER, seed=DATA_SEED,
+                                               bucket_boundaries=TEXT_BUCKET_BOUNDARIES,
+                                               augmentation=pipeline_augmentation)
+        material_val_dataset = build_dataset(val_files, data_spec, GLOBAL_BATCH_SIZE, include_immaterial=False,
+                                             training=False)
+
+        # Track how long the cold-started material phase takes to reach its best accuracy
+        material_timer = TimeToTarget(monitor='val_accuracy')
+
+        # Train and save the best model during training. BackupAndRestore saves weights, optimizer state and epoch
+        # after every epoch, so a crash resumes mid-phase instead of from the first epoch.
+        material_history = material_model.fit(
+            material_train_dataset,
+            validation_data=material_val_dataset,
+            epochs=EPOCHS,
+            callbacks=[material_timer, TelemetryCallback(telemetry, "material", args.telemetry_input_wait),
+                       tf.keras.callbacks.BackupAndRestore(backup_dir=backup_dir_for(checkpoint_dir, "material")),
+                       EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True),
+                       ModelCheckpoint(filepath=material_best_model_path, save_best_only=True)]
+                      + profile_callbacks("material"),
+            verbose=1
+        )
+        profile_phase("material", material_model, material_val_dataset)
+
+        # Save only the final weights with a .weights.h5 extension
+        material_model.save_weights(material_final_weights_path)
+        training_state["material_best"] = material_timer.best()
+        mark_phase_complete(checkpoint_dir, training_state, "material")
+
+    def persist_evolved_population(evolutionary_data):
+        """Save the evolved population and its training shards, so a restart does not have to evolve it again."""
+        evolutionary_data.save(evolved_dir)
+        write_dataset_shards(evolved_data_dir, *open_dataset_store(evolved_dir).modalities(), num_shards=NUM_SHARDS,
+                             validation_split=0.0)
+        mark_phase_complete(checkpoint_dir, training_state, "evolution")
+
+    # Step 2: Evolve Microbiome Model (Evolutionary Algorithm)
+    if is_phase_complete(training_state, "evolution"):
+        logging.info("Evolutionary Algorithm already completed, phase 2 trains on the evolved population")
+    elif args.overlap_evolution:
+        logging.info("Evolutionary Algorithm will run overlapped with Phase 2, streaming each generation into training")
+    else:
+        logging.info("Running Evolutionary Algorithm to simulate Microbiome Influence")
+        evolution_start = time.perf_counter()
+        evolutionary_data = run_evolutionary_algorithm(*training_rows, n_jobs=EVOLUTION_WORKERS, as_view=True,
+                                                       work_dir=evolution_dir, evolution_params=EVOLUTION_PARAMS)
+        telemetry.record("phase_end", phase="evolution", seconds=time.perf_counter() - evolution_start,
+                         survivors=len(evolutionary_data))
+        persist_evolved_population(evolutionary_data)
+
+    # Step 3: Train Immaterial Layers (Conscious Development)
+    if is_phase_complete(training_state, "full"):
+        logging.info("Phase 2 already completed, nothing left to train")
+    else:
+        logging.info("Starting Phase 2: Training Immaterial Layers (Conscious Development)")
+
+        # Build the full Samvara model (material + immaterial layers) around the trained phase-1 material sub-model,
+        # instead of relearning the Conv2D/LSTM stack from scratch
+        with strategy.scope():
+            samvara_model = build_samvara_model(
+                include_immaterial=True,
+                material_model=material_model.get_layer('material_model'),
+                material_lr_multiplier=args.material_lr_multiplier if args.material_mode == "layerwise" else 1.0,
+                augmentation=model_augmentation
+            )
+            configure_material_layers(samvara_model, mode=args.material_mode, unfreeze_layers=args.unfreeze_layers)
+            logging.info(f"Phase 2 warm-starts from the phase-1 material weights (material mode: {args.material_mode})")
+
+            # Compile the full model. The learning rate schedule runs in-graph; the mentor only rescales it
+            # between epochs
+            full_schedule = MentorSchedule(LEARNING_RATE, warmup_steps=LR_WARMUP_STEPS, decay_rate=LR_DECAY_RATE,
+                                           decay_steps=LR_DECAY_STEPS)
+            full_optimizer = tf.keras.optimizers.Adam(learning_rate=full_schedule)
+            samvara_model.compile(optimizer=full_optimizer, loss='categorical_crossentropy', metrics=['accuracy'],
+                                  **compile_kwargs)
+
+        # Define filepaths for the full model
+        samvara_best_model_path = os.path.join(checkpoint_dir, f'samvara_best_model_{timestamp}.keras')
+        samvara_final_model_path = os.path.join(checkpoint_dir, f'samvara_final_model_{timestamp}.keras')
+
+        # Ensure a stale final model file is safely removed; the best model of an interrupted attempt is kept
+        safe_remove(samvara_final_model_path)
+
+        # Introduce mentor-based reinforcement learning
+        mentor = MentorModel(schedule=full_schedule)
+
+        # Measure how fast the warm-started model reaches the best accuracy of the cold-started phase 1
+        material_best = training_state.get("material_best")
+        full_timer = TimeToTarget(monitor='val_accuracy', target=material_best["value"] if material_best else None)
+
+        # Phase 2 trains on the evolved population: from its shards, or streamed from the still running evolution.
+        # Validation uses the original, unevolved validation rows.
+        evolution_stream = None
+        steps_per_epoch = None
+        if is_phase_complete(training_state, "evolution"):
+            evolved_train_files, _ = list_dataset_shards(evolved_data_dir)
+            full_train_dataset = build_dataset(evolved_train_files, load_spec(evolved_data_dir), GLOBAL_BATCH_SIZE,
+                                               include_immaterial=True, shuffle_buffer=SHUFFLE_BUFFER,
+                                               seed=DATA_SEED, bucket_boundaries=TEXT_BUCKET_BOUNDARIES,
+                                               augmentation=pipeline_augmentation)
+        else:
+            evolution_stream = EvolutionStream(*training_rows, batch_size=GLOBAL_BATCH_SIZE, work_dir=evolution_dir,
+                                               evolution_params=EVOLUTION_PARAMS).start()
+            full_train_dataset = evolution_stream.dataset()
+            if pipeline_augmentation is not None:
+                full_train_dataset = augment_batches(full_train_dataset, pipeline_augmentation)
+            steps_per_epoch = evolution_stream.steps_per_epoch
+        full_val_dataset = build_dataset(val_files, data_spec, GLOBAL_BATCH_SIZE, include_immaterial=True,
+                                         training=False)
+
+        try:
+            full_history = samvara_model.fit(
+                full_train_dataset,
+                validation_data=full_val_dataset,
+                epochs=EPOCHS,
+                steps_per_epoch=steps_per_epoch,
+                callbacks=[mentor, full_timer, TelemetryCallback(telemetry, "full", args.telemetry_input_wait),
+                           tf.keras.callbacks.BackupAndRestore(backup_dir=backup_dir_for(checkpoint_dir, "full")),
+                           EarlyStopping(monitor='val_loss', patience=5, restore_best_weights=True),
+                           ModelCheckpoint(filepath=samvara_best_model_path, save_best_only=True)]
+                          + profile_callbacks("full"),
+                verbose=1
+            )
+        finally:
+            if evolution_stream is not None:
+                evolutionary_data = evolution_stream.close()
+        if evolution_stream is not None:
+            persist_evolved_population(evolutionary_data)
+        profile_phase("full", samvara_model, full_val_dataset)
+
+        # Report the warm-start gain against the cold-started material phase
+        if material_best and full_timer.reached:
+            logging.info(f"Warm-started phase 2 reached the phase-1 best val_accuracy {material_best['value']:.4f} "
+                         f"after {full_timer.reached['epochs']} epochs ({full_timer.reached['seconds']:.1f}s); "
+                         f"cold-started phase 1 needed {material_best['epochs']} epochs ({material_best['seconds']:.1f}s).")
+        elif material_best:
+            logging.info(f"Warm-started phase 2 did not reach the phase-1 best val_accuracy "
+                         f"{material_best['value']:.4f}.")
+
+        # Ensure no dataset conflicts in the HDF5 file before saving the final model
+        safe_remove_hdf5_dataset(samvara_final_model_path, 'model_weights')
+
+        # Save the full model (architecture + weights) using .keras
+        samvara_model.save(samvara_final_model_path)
+        logging.info(f"Final Samvara Model saved.")
+        mark_phase_complete(checkpoint_dir, training_state, "full")
+
+    # Export the remaining telemetry records
+    telemetry.stop()
+
+    # Consolidated profile report: traced top ops and host vs device time, per-layer and function timings
+    if args.profile:
+        function_timer.restore()
+        profile_report["functions"] = function_timer.report()
+        log_report(profile_report)
+        write_report(profile_report, os.path.join(profile_dir, "profile_report.json"))
+
+def evolve(argv=None, ready=lambda: None):
+    """
+    Evolve the training rows of the dataset store, without training, and save the survivors as a dataset store.
+    Only NumPy and the evolution modules are imported.
+    """
+    parser = argparse.ArgumentParser(prog="main.py evolve", description=COMMANDS["evolve"])
+    parser.add_argument('--store-dir', type=str, default="data/store/", help="Dataset store to evolve")
+    parser.add_argument('--output', type=str, default="data/evolved/", help="Dataset store of the survivors")
+    parser.add_argument('--validation-split', type=float, default=0.2,
+                        help="Fraction of rows at the end of the store that is kept out of the evolution")
+    parser.add_argument('--workers', type=int, default=-1, help="Process pool size, -1 uses every core")
+    parser.add_argument('--seed', type=int, default=None, help="Seed of the evolution")
+    parser.add_argument('--hyperparameters', type=str, default=None,
+                        help="JSON file of tuned hyperparameters; its evolution parameters are used")
+    parser.add_argument('--fitness', type=str, default="quantum", choices=["quantum", "model"],
+                        help="Fitness function of the evolution")
+    parser.add_argument('--selection', type=str, default=None, choices=["tournament", "rank", "threshold"],
+                        help="Parent selection refilling the slots of dropped individuals (default: tournament)")
+    args = parser.parse_args(argv)
+
+    from models.microbiome_model import run_evolutionary_algorithm, make_fitness_fn
+    from utils.dataset_store import dataset_store_exists, open_dataset_store
+    ready()
+
+    if not dataset_store_exists(args.store_dir):
+        raise SystemExit(f"No dataset store in {args.store_dir}, run the train command once to create it")
+    evolution_params = {}
+    if args.hyperparameters:
+        from utils.hyperparameter_search import split_config
+        with open(args.hyperparameters) as f:
+            _, evolution_params = split_config(json.load(f))
+    evolution_params["fitness_fn"] = make_fitness_fn(args.fitness)
+    if args.selection:
+        evolution_params["selection"] = args.selection
+
+    modalities = open_dataset_store(args.store_dir).modalities()
+    num_train = int(len(modalities[-1]) * (1.0 - args.validation_split))
+    training_rows = tuple(array[:num_train] for array in modalities)
+    start_time = time.perf_counter()
+    evolved = run_evolutionary_algorithm(*training_rows, seed=args.seed, n_jobs=args.workers, as_view=True,
+                                         evolution_params=evolution_params)
+    evolved.save(args.output)
+    logging.info(f"Evolved {num_train} rows into {len(evolved)} survivors in {time.perf_counter() - start_time:.1f}s, "
+                 f"saved to {args.output}")
+
+
+def benchmark(argv=None, ready=lambda: None):
+    from utils import benchmark as benchmark_suite
+    ready()
+    benchmark_suite.main(argv)
+
+
+def export(argv=None, ready=lambda: None):
+    from utils import export as model_export
+    ready()
+    model_export.main(argv)
+
+
+def debug(argv=None, ready=lambda: None):
+    from utils import debugger
+    ready()
+    debugger.main(argv)
+
+
+def main(argv=None):
+    argv = list(sys.argv[1:] if argv is None else argv)
+    parser = argparse.ArgumentParser(
+        description="Samvara-AI. Without a command, the arguments are passed to train.",
+        epilog="Run 'main.py <command> -h' for the arguments of a command.")
+    parser.add_argument('--startup-report', action='store_true',
+                        help="Print the startup report of the command as JSON and exit without running it")
+    subparsers = parser.add_subparsers(dest="command", metavar="command")
+    for name, description in COMMANDS.items():
+        # Each command parses its own arguments
+        subparsers.add_parser(name, help=description, add_help=False)
+
+    # The original invocation, `python main.py [training arguments]`, trains
+    position = next((i for i, arg in enumerate(argv) if arg != "--startup-report"), len(argv))
+    if position == len(argv) or argv[position] not in tuple(COMMANDS) + ("-h", "--help"):
+        argv.insert(position, "train")
+    args, command_argv = parser.parse_known_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+
+    def ready():
+        report = startup_report(args.command)
+        if args.startup_report:
+            print(json.dumps(report))
+            sys.exit(0)
+        logging.info(f"Startup of '{args.command}' took {report['startup_ms']:.0f} ms "
+                     f"({report['modules_imported']} modules, TensorFlow "
+                     f"{'imported' if report['tensorflow_imported'] else 'not imported'})")
+
+    handlers = {"train": train, "evolve": evolve, "benchmark": benchmark, "export": export, "debug": debug}
+    handlers[args.command](command_argv, ready=ready)
+
+if __name__ == "__main__":
+    main()
@@ -5,43 +5,84 @@ from tensorflow.keras import layers
 
 # Custom Quantum Layer
 class CustomQuantumLayer(tf.keras.layers.Layer):
-    def __init__(self, units=2, **kwargs):
+    """
+    Quantum-inspired dense layer over a real and an imaginary part.
+    The input is either a [real, imaginary] pair or one packed tensor [real | imaginary] of equal halves.
+    A packed input takes a single fused matmul with the stacked kernels; a pair takes one matmul per part,
+    because concatenating the inputs on every call costs more than the matmul it saves.
+    By default the layer returns the summed real + imaginary outputs. With complex_path=True it computes the
+    complex product (real + i*imaginary) @ (real_kernel + i*imaginary_kernel) and returns it packed as
+    [real | imaginary] (2 * units wide), so stacked layers stay on the fused path.
+    """
+    def __init__(self, units=2, complex_path=False, **kwargs):
         super(CustomQuantumLayer, self).__init__(**kwargs)
         self.units = units
+        self.complex_path = complex_path
 
     def build(self, input_shape):
-        self.real_kernel = self.add_weight(shape=(input_shape[0][-1], self.units),
+        if isinstance(input_shape, (list, tuple)) and isinstance(input_shape[0], (list, tuple, tf.TensorShape)):
+            real_width, imaginary_width = input_shape[0][-1], input_shape[1][-1]
+        else:
+            real_width = imaginary_width = input_shape[-1] // 2
+        if self.complex_path and real_width != imaginary_width:
+            raise ValueError(f"complex_path needs real and imaginary parts of the same width, "
+                             f"got {real_width} and {imaginary_width}")
+        self.real_kernel = self.add_weight(name='real_kernel',
+                                           shape=(real_width, self.units),
                                            initializer='glorot_uniform',
                                            trainable=True,
                                            dtype=tf.float32)
-        self.imaginary_kernel = self.add_weight(shape=(input_shape[1][-1], self.units),
+        self.imaginary_kernel = self.add_weight(name='imaginary_kernel',
+                                                shape=(imaginary_width, self.units),
                                                 initializer='glorot_uniform',
                                                 trainable=True,
                                                 dtype=tf.float32)
 
+    def kernel_blocks(self):
+        """The kernel rows applied to the real part and to the imaginary part."""
+        real_kernel = tf.cast(self.real_kernel, self.compute_dtype)
+        imaginary_kernel = tf.cast(self.imaginary_kernel, self.compute_dtype)
+        if self.complex_path:
+            # [r, i] @ [[Wr, Wi], [-Wi, Wr]] = [r Wr - i Wi | r Wi + i Wr]
+            return (tf.concat([real_kernel, imaginary_kernel], axis=1),
+                    tf.concat([-imaginary_kernel, real_kernel], axis=1))
+        # [r, i] @ [[Wr], [Wi]] = r Wr + i Wi
+        return real_kernel, imaginary_kernel
+
     def call(self, inputs):
-        real_part, imaginary_part = inputs
-        real_output = tf.matmul(real_part, self.real_kernel)
-        imaginary_output = tf.matmul(imaginary_part, self.imaginary_kernel)
-        # Instead of returning complex values, return summed real + imaginary parts
-        return real_output + imaginary_output
+        real_rows, imaginary_rows = self.kernel_blocks()
+        if isinstance(inputs, (list, tuple)):
+            real_part, imaginary_part = inputs
+            return tf.matmul(real_part, real_rows) + tf.matmul(imaginary_part, imaginary_rows)
+        return tf.matmul(inputs, tf.concat([real_rows, imaginary_rows], axis=0))
 
     def compute_output_shape(self, input_shape):
-        return (input_shape[0][0], self.units)
+        batch_size = input_shape[0][0] if isinstance(input_shape[0], (list, tuple, tf.TensorShape)) else input_shape[0]
+        return (batch_size, 2 * self.units if self.complex_path else self.units)
 
     # Adding the required get_config() method
     def get_config(self):
         config = super(CustomQuantumLayer, self).get_config()
         config.update({
-            "units": self.units
+            "units": self.units,
+            "complex_path": self.complex_path
         })
         return config
 
 # Build the immaterial model
-def build_immaterial_model():
+def build_immaterial_model(units=2, num_layers=1):
+    """
+    Build the immaterial model: `num_layers - 1` stacked complex quantum layers followed by a summing one.
+    The default single layer is the original model; deeper stacks make room for the planned layers 7-15.
+    The stacked layers pass packed [real | imaginary] tensors, so only the first layer sees separate parts.
+    """
     real_input = layers.Input(shape=(2,), dtype=tf.float32, name="real_input")
     imaginary_input = layers.Input(shape=(2,), dtype=tf.float32, name="imaginary_input")
 
-    q_layer = CustomQuantumLayer(units=2)([real_input, imaginary_input])
+    # The quantum kernels always run in float32, also under a mixed precision policy
+    hidden = [real_input, imaginary_input]
+    for _ in range(num_layers - 1):
+        hidden = CustomQuantumLayer(units=units, complex_path=True, dtype='float32')(hidden)
+    q_layer = CustomQuantumLayer(units=units, dtype='float32')(hidden)
     model = tf.keras.Model(inputs=[real_input, imaginary_input], outputs=q_layer)
     return model
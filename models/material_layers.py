@@ -2,12 +2,16 @@ import tensorflow as tf
 from tensorflow.keras.layers import Dense, Input, Conv2D, Flatten, LSTM, Embedding, Concatenate, BatchNormalization, Dropout
 from tensorflow.keras.models import Model
 
+# Token ids run from 1 to VOCAB_SIZE - 1, 0 is the padding at the end of shorter sequences
+VOCAB_SIZE = 10000
+MAX_TEXT_LENGTH = 100
+
 def build_material_model():
     # Image input (e.g., 32x32 images with 3 color channels)
     image_input = Input(shape=(32, 32, 3), name='image_input', dtype='float32')
 
-    # Text input (e.g., a sequence of integers representing words)
-    text_input = Input(shape=(100,), name='text_input', dtype='int32')
+    # Text input (e.g., a sequence of integers representing words), right-padded with 0 to any length
+    text_input = Input(shape=(None,), name='text_input', dtype='int32')
 
     # Image processing
     image_conv1 = Conv2D(32, (3, 3), activation='relu', name='conv1')(image_input)
@@ -18,7 +22,10 @@ def build_material_model():
     image_dense = BatchNormalization()(image_dense)
 
     # Text processing
-    text_embed = Embedding(input_dim=10000, output_dim=64, name='text_embedding')(text_input)
+    # The padding is masked, so the LSTM state stops at the last token of each sequence
+    text_embed = Embedding(input_dim=VOCAB_SIZE, output_dim=64, mask_zero=True, name='text_embedding')(text_input)
+    # Default activations, no recurrent dropout and no unrolling keep the LSTM on the fused (cuDNN) kernel,
+    # which takes right-padded masks as sequence lengths
     text_lstm = LSTM(64, name='lstm')(text_embed)  # Reduced units
     text_dense = Dense(64, activation='relu', name='text_dense')(text_lstm)
     text_dense = Dropout(0.5)(text_dense)  # Dropout for regularization
@@ -4,19 +4,129 @@ import tensorflow as tf
 import numpy as np
 import logging
 
+@tf.keras.utils.register_keras_serializable(package="Samvara")
+class MentorSchedule(tf.keras.optimizers.schedules.LearningRateSchedule):
+    """
+    Learning rate schedule evaluated in-graph at every step: linear warmup over `warmup_steps`, exponential decay
+    by `decay_rate` every `decay_steps`, times a mentor scale. The scale is a tf.Variable the MentorModel callback
+    assigns between epochs, so adjusting the learning rate needs no get_value/set_value round trip.
+    """
+    def __init__(self, initial_learning_rate, warmup_steps=0, decay_rate=1.0, decay_steps=10000, scale=1.0):
+        super(MentorSchedule, self).__init__()
+        self.initial_learning_rate = initial_learning_rate
+        self.warmup_steps = warmup_steps
+        self.decay_rate = decay_rate
+        self.decay_steps = decay_steps
+        self.scale = tf.Variable(scale, trainable=False, dtype=tf.float32, name="mentor_scale")
+
+    def __call__(self, step):
+        step = tf.cast(step, tf.float32)
+        warmup = tf.minimum(1.0, (step + 1.0) / max(self.warmup_steps, 1)) if self.warmup_steps else 1.0
+        decay = tf.pow(tf.cast(self.decay_rate, tf.float32), step / self.decay_steps)
+        return self.initial_learning_rate * warmup * decay * self.scale
+
+    def get_config(self):
+        return {
+            "initial_learning_rate": self.initial_learning_rate,
+            "warmup_steps": self.warmup_steps,
+            "decay_rate": self.decay_rate,
+            "decay_steps": self.decay_steps,
+            "scale": float(self.scale.numpy()),
+        }
+
 class MentorModel(tf.keras.callbacks.Callback):
-    def __init__(self, learning_rate_adjustment=0.1):
+    """
+    Adjust the learning rate from a smoothed reward (accuracy - val_loss by default).
+    The reward is smoothed with a bias-corrected exponential moving average. While the smoothed reward improves
+    by more than `min_delta`, the learning rate is scaled up by `increase_factor`; after `patience` epochs without
+    improvement it is scaled down by `decrease_factor`. The scale stays within [min_scale, max_scale].
+    With a MentorSchedule the scale is applied in-graph on top of its warmup and decay; with a plain learning rate
+    the optimizer's learning rate variable is scaled directly.
+    The scale and the reward state are variables tracked by the optimizer, so training state checkpoints (like
+    BackupAndRestore) save them and a resumed run continues with the same learning rate.
+    """
+    def __init__(self, schedule=None, smoothing=0.8, min_delta=0.01, increase_factor=1.1, decrease_factor=0.5,
+                 patience=2, min_scale=0.01, max_scale=2.0):
         super(MentorModel, self).__init__()
-        self.learning_rate_adjustment = learning_rate_adjustment
-        self.reward_threshold = 0.1  # Adjust reward threshold for learning
+        self.schedule = schedule
+        self.smoothing = smoothing
+        self.min_delta = min_delta
+        self.increase_factor = increase_factor
+        self.decrease_factor = decrease_factor
+        self.patience = patience
+        self.min_scale = min_scale
+        self.max_scale = max_scale
+        self.state = tf.Module(name="mentor_state")
+        self.state.scale = schedule.scale if schedule is not None else tf.Variable(
+            1.0, trainable=False, dtype=tf.float32, name="mentor_scale")
+        self.state.smoothed_reward = tf.Variable(0.0, trainable=False, dtype=tf.float64, name="smoothed_reward")
+        self.state.num_rewards = tf.Variable(0, trainable=False, dtype=tf.int64, name="num_rewards")
+        self.state.best_reward = tf.Variable(-np.inf, trainable=False, dtype=tf.float64, name="best_reward")
+        self.state.wait = tf.Variable(0, trainable=False, dtype=tf.int64, name="wait")
+        self.base_learning_rate = None
+
+    @property
+    def current_scale(self):
+        return float(self.state.scale.numpy())
+
+    def reset(self):
+        self.state.scale.assign(1.0)
+        self.state.smoothed_reward.assign(0.0)
+        self.state.num_rewards.assign(0)
+        self.state.best_reward.assign(-np.inf)
+        self.state.wait.assign(0)
+        self.base_learning_rate = None
+
+    def set_model(self, model):
+        super(MentorModel, self).set_model(model)
+        # Checkpoints of the model reach the optimizer, and through it the mentor state. Attached before
+        # BackupAndRestore restores a checkpoint in on_train_begin, so the restore fills in the saved values
+        if getattr(model, "optimizer", None) is not None:
+            model.optimizer.mentor_state = self.state
+
+    def on_train_begin(self, logs=None):
+        if self.schedule is None:
+            # Read before a checkpoint restore, so this is the unscaled learning rate of the compiled optimizer
+            self.base_learning_rate = float(self.model.optimizer.learning_rate.numpy())
 
     def on_epoch_end(self, epoch, logs=None):
         """Adjust learning rate based on mentor feedback."""
+        if not logs or 'val_loss' not in logs or 'accuracy' not in logs:
+            return
         reward = self.calculate_reward(logs['val_loss'], logs['accuracy'])
-        if reward > self.reward_threshold:
-            logging.info(f"Mentor Model: Increasing learning rate by {self.learning_rate_adjustment}")
-            new_lr = float(tf.keras.backend.get_value(self.model.optimizer.learning_rate)) + self.learning_rate_adjustment
-            tf.keras.backend.set_value(self.model.optimizer.learning_rate, new_lr)
+
+        # Bias-corrected exponential moving average, so early epochs are not pulled towards zero
+        num_rewards = int(self.state.num_rewards.assign_add(1).numpy())
+        smoothed_reward = self.smoothing * float(self.state.smoothed_reward.numpy()) + (1 - self.smoothing) * reward
+        self.state.smoothed_reward.assign(smoothed_reward)
+        smoothed = smoothed_reward / (1 - self.smoothing ** num_rewards)
+
+        wait = int(self.state.wait.numpy())
+        if smoothed > float(self.state.best_reward.numpy()) + self.min_delta:
+            self.state.best_reward.assign(smoothed)
+            wait = 0
+            factor = self.increase_factor
+        else:
+            wait += 1
+            factor = 1.0
+            if wait >= self.patience:
+                wait = 0
+                factor = self.decrease_factor
+        self.state.wait.assign(wait)
+
+        current_scale = self.current_scale
+        new_scale = float(np.clip(current_scale * factor, self.min_scale, self.max_scale))
+        if new_scale != current_scale:
+            logging.info(f"Mentor Model: smoothed reward {smoothed:.4f}, scaling learning rate by "
+                         f"{new_scale / current_scale:.3f} (scale {new_scale:.3f})")
+            self.apply_scale(new_scale)
+        logs['mentor_reward'] = smoothed
+        logs['mentor_lr_scale'] = self.current_scale
+
+    def apply_scale(self, scale):
+        self.state.scale.assign(scale)
+        if self.schedule is None:
+            self.model.optimizer.learning_rate.assign(self.base_learning_rate * scale)
 
     def calculate_reward(self, val_loss, accuracy):
         """Calculate reward based on loss improvement and accuracy."""
@@ -0,0 +1,250 @@
+# models/microbiome_islands.py
+
+import os
+import time
+import socket
+import logging
+import secrets
+import threading
+import numpy as np
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Listener, Client
+from joblib import Parallel, delayed
+from models.microbiome_model import evolve_population, FitnessCache
+
+# Names of the per-individual arrays that travel with a migrant
+MIGRANT_KEYS = ("image", "text", "quantum_real", "quantum_imaginary", "labels", "fitness")
+
+
+class DirectoryTransport:
+    """
+    Exchange migrants through files in a shared directory (local disk for testing, or a network mount).
+    Each message is written to a temporary file and atomically renamed, so readers never see partial data.
+    """
+    def __init__(self, directory, poll_interval=0.05):
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self.island_id = None
+
+    def open(self, island_id):
+        os.makedirs(self.directory, exist_ok=True)
+        self.island_id = island_id
+
+    def _path(self, destination, source, generation):
+        return os.path.join(self.directory, f"to{destination}_from{source}_gen{generation}.npz")
+
+    def send(self, destination, generation, payload):
+        path = self._path(destination, self.island_id, generation)
+        with open(path + ".tmp", "wb") as f:
+            np.savez(f, **payload)
+        os.replace(path + ".tmp", path)
+
+    def receive(self, source, generation, timeout=600):
+        path = self._path(self.island_id, source, generation)
+        deadline = time.time() + timeout
+        while not os.path.exists(path):
+            if time.time() > deadline:
+                raise TimeoutError(f"Island {self.island_id}: no migrants from island {source} for generation {generation}.")
+            time.sleep(self.poll_interval)
+        with np.load(path) as data:
+            payload = {key: data[key] for key in data.files}
+        os.remove(path)
+        return payload
+
+    def close(self):
+        pass
+
+
+def _free_ports(count, host="localhost"):
+    """Ports the OS currently has free on `host`, found by binding to port 0."""
+    sockets = [socket.socket() for _ in range(count)]
+    try:
+        for s in sockets:
+            s.bind((host, 0))
+        return [s.getsockname()[1] for s in sockets]
+    finally:
+        for s in sockets:
+            s.close()
+
+
+class SocketTransport:
+    """
+    Exchange migrants over TCP sockets, island i listens on addresses[i].
+    Incoming migrants are accepted by a background thread, so sending never waits for the receiver
+    to reach the same generation. Works across machines when the addresses are reachable hosts.
+    Messages are pickled, so every connection is authenticated with `authkey`: a secret shared by the islands
+    only (e.g. secrets.token_bytes(32)), never a fixed value.
+    """
+    def __init__(self, addresses, authkey, connect_timeout=60):
+        if not authkey:
+            raise ValueError("SocketTransport needs a secret authkey shared by the islands")
+        self.addresses = [tuple(address) for address in addresses]
+        self.authkey = authkey
+        self.connect_timeout = connect_timeout
+        self.island_id = None
+
+    @classmethod
+    def local(cls, num_islands, **kwargs):
+        """
+        Transport for islands running as processes on this machine, on free ephemeral ports and with a random
+        authkey. The processes share both through the pickled transport.
+        """
+        kwargs.setdefault("authkey", secrets.token_bytes(32))
+        return cls([("localhost", port) for port in _free_ports(num_islands)], **kwargs)
+
+    def open(self, island_id):
+        self.island_id = island_id
+        self._inbox = {}
+        self._condition = threading.Condition()
+        self._listener = Listener(self.addresses[island_id], authkey=self.authkey)
+        self._accept_thread = threading.Thread(target=self._accept_loop)
+        self._accept_thread.daemon = True
+        self._accept_thread.start()
+
+    def _accept_loop(self):
+        while True:
+            try:
+                connection = self._listener.accept()
+            except AuthenticationError:
+                logging.warning(f"Island {self.island_id}: rejected a connection with a wrong authkey.")
+                continue
+            except OSError:
+                return  # Listener closed
+            try:
+                with connection:
+                    message = connection.recv()
+            except (EOFError, OSError):
+                continue  # The sender went away mid-message
+            if message is None:
+                return  # Woken up by close()
+            source, generation, payload = message
+            with self._condition:
+                self._inbox[(source, generation)] = payload
+                self._condition.notify_all()
+
+    def send(self, destination, generation, payload):
+        # The neighbour may not be listening yet, retry until it is
+        deadline = time.time() + self.connect_timeout
+        while True:
+            try:
+                connection = Client(self.addresses[destination], authkey=self.authkey)
+                break
+            except ConnectionRefusedError:
+                if time.time() > deadline:
+                    raise
+                time.sleep(0.1)
+        with connection:
+            connection.send((self.island_id, generation, payload))
+
+    def receive(self, source, generation, timeout=600):
+        with self._condition:
+            if not self._condition.wait_for(lambda: (source, generation) in self._inbox, timeout):
+                raise TimeoutError(f"Island {self.island_id}: no migrants from island {source} for generation {generation}.")
+            return self._inbox.pop((source, generation))
+
+    def close(self):
+        # A thread blocked in accept() keeps the port bound even after the listener is closed, so wake it with
+        # a connection of our own, wait for it to stop and only then release the port
+        with Client(self._listener.address, authkey=self.authkey) as connection:
+            connection.send(None)
+        self._accept_thread.join()
+        self._listener.close()
+
+
+def run_island(island_id, num_islands, image_data, text_data, quantum_real, quantum_imaginary, labels, transport,
+               migration_interval=2, migration_size=10, seed=None, evolution_params=None):
+    """
+    Evolve one island and exchange migrants with its neighbours on a ring.
+    Every `migration_interval` generations the `migration_size` fittest survivors are sent to the next island,
+    and migrants from the previous island take the free slots first, then the slots of the weakest survivors.
+    Can be called directly on each node of a cluster, with a transport every node can reach.
+    Returns the surviving individuals and a dict of throughput statistics.
+    """
+    rng = np.random.default_rng(seed)
+    # Migrants overwrite rows, so every array is a private working copy
+    arrays = {key: np.array(array, copy=True) for key, array in
+              zip(MIGRANT_KEYS, (image_data, text_data, quantum_real, quantum_imaginary, labels))}
+    num_individuals = len(arrays["labels"])
+    arrays["fitness"] = rng.random(num_individuals)
+    evolution_params = dict(evolution_params or {})
+    fitness_cache = FitnessCache(num_individuals, evolution_params.pop("fitness_fn", None))
+
+    next_island = (island_id + 1) % num_islands
+    previous_island = (island_id - 1) % num_islands
+    processed = {"individuals": 0, "population": num_individuals}
+
+    def migrate(generation, survivors):
+        processed["individuals"] += processed["population"]
+        if (generation + 1) % migration_interval == 0:
+            # Send the fittest survivors to the next island on the ring
+            fittest = survivors[np.argsort(arrays["fitness"][survivors])[::-1][:migration_size]]
+            transport.send(next_island, generation, {key: array[fittest] for key, array in arrays.items()})
+
+            # Migrants fill free slots first, then replace the weakest survivors
+            migrants = transport.receive(previous_island, generation)
+            free_slots = np.setdiff1d(np.arange(num_individuals), survivors, assume_unique=True)
+            weakest = survivors[np.argsort(arrays["fitness"][survivors])]
+            slots = np.concatenate([free_slots, weakest])[:len(migrants["labels"])]
+            for key, array in arrays.items():
+                array[slots] = migrants[key][:len(slots)]
+            # Migrants are new individuals in their slots, their cached scores belong to the old ones
+            fitness_cache.mark_changed(slots)
+            survivors = np.union1d(survivors, slots)
+            logging.info(f"Island {island_id}, generation {generation+1}: received {len(slots)} migrants.")
+        processed["population"] = len(survivors)
+        return survivors
+
+    transport.open(island_id)
+    start_time = time.time()
+    try:
+        survivors = evolve_population(arrays["image"], arrays["text"], arrays["quantum_real"],
+                                      arrays["quantum_imaginary"], arrays["fitness"], np.arange(num_individuals),
+                                      rng, on_generation=migrate, fitness_cache=fitness_cache,
+                                      labels=arrays["labels"], **evolution_params)
+    finally:
+        transport.close()
+    elapsed = time.time() - start_time
+
+    stats = {
+        "island": island_id,
+        "individuals": processed["individuals"],
+        "seconds": elapsed,
+        "individuals_per_sec": processed["individuals"] / elapsed if elapsed > 0 else float("inf"),
+        "survivors": len(survivors),
+    }
+    evolved = tuple(arrays[key][survivors] for key in MIGRANT_KEYS[:-1])
+    return evolved, stats
+
+
+def run_island_model(image_data, text_data, quantum_real, quantum_imaginary, labels, num_islands=4, transport=None,
+                     migration_interval=2, migration_size=10, seed=None, evolution_params=None):
+    """
+    Run an island model on this machine: the population is split into `num_islands` parts evolving in
+    separate processes, with migration over `transport` (local sockets by default).
+    Logs per-island throughput and returns the evolved data of all islands concatenated.
+    """
+    if transport is None:
+        transport = SocketTransport.local(num_islands)
+    if seed is None:
+        seed = np.random.randint(0, 2**31 - 1)
+    island_seeds = np.random.SeedSequence(seed).spawn(num_islands)
+    bounds = np.linspace(0, image_data.shape[0], num_islands + 1).astype(int)
+    logging.info(f"Starting island model with {num_islands} islands.")
+
+    # One process per island: islands block on each other's migrants, so they must all run at once
+    results = Parallel(n_jobs=num_islands)(
+        delayed(run_island)(i, num_islands, *(array[bounds[i]:bounds[i + 1]] for array in
+                                              (image_data, text_data, quantum_real, quantum_imaginary, labels)),
+                            transport, migration_interval, migration_size, island_seeds[i], evolution_params)
+        for i in range(num_islands)
+    )
+
+    for _, stats in results:
+        logging.info(f"Island {stats['island']}: {stats['individuals_per_sec']:.0f} individuals/sec "
+                     f"({stats['individuals']} individuals in {stats['seconds']:.2f}s), {stats['survivors']} survivors.")
+    total_individuals = sum(stats["individuals"] for _, stats in results)
+    wall_time = max(stats["seconds"] for _, stats in results)
+    if wall_time > 0:
+        logging.info(f"Island model throughput: {total_individuals / wall_time:.0f} individuals/sec overall.")
+
+    return tuple(np.concatenate([evolved[i] for evolved, _ in results]) for i in range(5))
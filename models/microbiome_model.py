@@ -1,84 +1,358 @@
 # models/microbiome_model.py
 
+import os
 import numpy as np
 import logging
+from utils.dataset_store import DatasetView, copy_to_memmap
+
+# Names of the per-individual arrays of a population, in the order the functions of this module take them
+POPULATION_KEYS = ("image", "text", "quantum_real", "quantum_imaginary", "labels")
 
 # Simulate microbiome evolution and return evolved data
-def run_evolutionary_algorithm(image_data, text_data, quantum_real, quantum_imaginary, labels):
+def run_evolutionary_algorithm(image_data, text_data, quantum_real, quantum_imaginary, labels, seed=None, n_jobs=1,
+                               num_islands=1, transport=None, as_view=False, work_dir=None, evolution_params=None):
     """
     Simulate microbiome evolution and return evolved data.
     The evolutionary algorithm affects physiological, emotional, and cognitive processes.
+    The population is evolved in place in one preallocated working copy of fixed capacity (see SlotPool), so the
+    data is only compacted once after the last generation.
+    With n_jobs other than 1 the population is split into shards evolved on a process pool
+    (see models/microbiome_parallel.py). With num_islands above 1 it runs an island model with periodic
+    migration over `transport` (see models/microbiome_islands.py).
+    The inputs may be memory-mapped (see utils/dataset_store.py). With `work_dir` the working copies are
+    memory-mapped files there instead of in RAM, and with `as_view` the result is a DatasetView that
+    selects the survivors by index, so nothing is copied until training takes a batch.
+    `evolution_params` overrides the keyword arguments of evolve_population (mutation_rate, crossover_rate,
+    fitness_threshold, generations, fitness_fn, selection).
     """
+    if num_islands > 1:
+        from models.microbiome_islands import run_island_model
+        evolved = run_island_model(image_data, text_data, quantum_real, quantum_imaginary, labels,
+                                   num_islands=num_islands, transport=transport, seed=seed,
+                                   evolution_params=evolution_params)
+        return DatasetView.from_arrays(*evolved) if as_view else evolved
+    if n_jobs != 1:
+        from models.microbiome_parallel import run_parallel_evolution
+        return run_parallel_evolution(image_data, text_data, quantum_real, quantum_imaginary, labels,
+                                      n_jobs=n_jobs, seed=seed, as_view=as_view, work_dir=work_dir,
+                                      evolution_params=evolution_params)
+
     logging.info("Starting evolutionary algorithm for microbiome simulation.")
+    rng = _make_rng(seed)
+
+    # Initial fitness scores for microbiomes (based on harmony with the host), drawn from the seeded generator
+    fitness_scores = rng.random(image_data.shape[0])
+
+    image_data, text_data, quantum_real, quantum_imaginary, labels = working_copies(
+        image_data, text_data, quantum_real, quantum_imaginary, labels, work_dir=work_dir)
+    survivors = np.arange(image_data.shape[0])
+
+    survivors = evolve_population(image_data, text_data, quantum_real, quantum_imaginary, fitness_scores, survivors, rng,
+                                  labels=labels, **(evolution_params or {}))
+
+    logging.info("Evolutionary algorithm completed.")
+    # Return the evolved data for further training
+    evolved = DatasetView.from_arrays(image_data, text_data, quantum_real, quantum_imaginary, labels, survivors)
+    return evolved if as_view else evolved.take()
 
-    # Initial fitness scores for microbiomes (based on harmony with the host)
-    fitness_scores = np.random.random(image_data.shape[0])
+def working_copies(*arrays, work_dir=None):
+    """
+    Copy the per-individual arrays (in POPULATION_KEYS order) into generation buffers: the caller's arrays are left
+    untouched, the copies are reused by every generation. Mutation and crossover write the image and text data,
+    and offspring are written into free slots of all of them. With `work_dir` they are memory-mapped files there
+    instead of in RAM, so the population can be larger than RAM.
+    """
+    if work_dir is None:
+        return tuple(np.array(array, copy=True) for array in arrays)
+    os.makedirs(work_dir, exist_ok=True)
+    return tuple(copy_to_memmap(array, os.path.join(work_dir, f"{key}.npy"))
+                 for key, array in zip(POPULATION_KEYS, arrays))
 
-    # Define mutation rates, crossover methods, and fitness thresholds
-    mutation_rate = 0.01
-    crossover_rate = 0.7
-    fitness_threshold = 0.9
+def evolve_population(image_data, text_data, quantum_real, quantum_imaginary, fitness_scores, survivors, rng,
+                      on_generation=None, mutation_rate=0.01, crossover_rate=0.7, fitness_threshold=0.9, generations=10,
+                      fitness_fn=None, fitness_cache=None, selection="tournament", labels=None):
+    """
+    Evolve a population in place over all generations and return the indices of the survivors.
+    The rows listed in `survivors` form a fixed-capacity SlotPool; the data arrays and fitness_scores are modified
+    in place. Each generation, individuals at or below `fitness_threshold` lose their slot. With `selection`
+    "tournament" or "rank", the free slots are refilled with offspring of parents picked by that strategy (see
+    SELECTION_STRATEGIES), so the population keeps its size; offspring copy every array, including `labels` if
+    given. With "threshold" the free slots stay empty and the population can shrink.
+    `on_generation(generation, survivors)`, if given, runs after each selection and returns the survivors
+    to continue with (the island model uses it to migrate individuals).
+    The mutation rate, crossover rate, fitness threshold and number of generations are tunable
+    (see utils/hyperparameter_search.py).
+    `fitness_fn` scores individuals (see quantum_fitness and ModelFitness). Scores are kept in `fitness_cache`
+    (a new FitnessCache by default), so only individuals changed since their last scoring are scored again.
+    """
+    if selection not in SELECTION_STRATEGIES:
+        raise ValueError(f"Unknown selection strategy '{selection}', expected one of {tuple(SELECTION_STRATEGIES)}")
+    select_parents = SELECTION_STRATEGIES[selection]
+    if fitness_cache is None:
+        fitness_cache = FitnessCache(image_data.shape[0], fitness_fn)
+    arrays = {"image": image_data, "text": text_data, "quantum_real": quantum_real,
+              "quantum_imaginary": quantum_imaginary}
+    pool = SlotPool([image_data, text_data, quantum_real, quantum_imaginary, labels], fitness_scores, survivors)
 
     # Evolve over several generations
-    generations = 10
     for generation in range(generations):
         logging.info(f"Generation {generation+1}: Running microbiome evolution")
+        members = pool.members()
 
         # Apply mutation and crossover to image and text data (representing physiological and emotional changes)
-        image_data = mutate_microbiomes(image_data, mutation_rate)
-        text_data = crossover_microbiomes(text_data, crossover_rate)
+        mutate_microbiomes(image_data, mutation_rate, rng=rng, indices=members, fitness_cache=fitness_cache)
+        crossover_microbiomes(text_data, crossover_rate, rng=rng, indices=members, fitness_cache=fitness_cache)
 
-        # Calculate new fitness scores based on feedback from quantum layers
-        fitness_scores = evaluate_fitness(quantum_real, quantum_imaginary, fitness_scores[:len(image_data)])  # Update only for current individuals
+        # Calculate new fitness scores based on feedback from quantum layers, only for current individuals
+        evaluate_fitness(arrays, members, fitness_scores, fitness_cache)
 
         # Select best-performing individuals based on fitness threshold
-        best_indices = np.where(fitness_scores > fitness_threshold)[0]
-        logging.info(f"Generation {generation+1}: {len(best_indices)} individuals passed fitness threshold")
+        pool.cull(members, fitness_threshold)
+        survivors = pool.members()
+        logging.info(f"Generation {generation+1}: {len(survivors)} individuals passed fitness threshold")
 
-        # Update datasets and fitness scores to keep only the best-performing individuals
-        image_data = image_data[best_indices]
-        text_data = text_data[best_indices]
-        quantum_real = quantum_real[best_indices]
-        quantum_imaginary = quantum_imaginary[best_indices]
-        labels = labels[best_indices]
-        fitness_scores = fitness_scores[best_indices]  # Update fitness scores for the remaining individuals
+        if select_parents is not None and len(members):
+            # Parents come from the survivors; if none is left, from the generation before the selection
+            candidates = survivors if len(survivors) else members
+            offspring_slots = pool.refill(select_parents(fitness_scores, candidates, pool.num_free(), rng),
+                                          fitness_cache)
+            survivors = pool.members()
+            logging.info(f"Generation {generation+1}: {len(offspring_slots)} offspring of {selection} selection "
+                         f"refilled the free slots")
 
-    logging.info("Evolutionary algorithm completed.")
-    # Return the evolved data for further training
-    return image_data, text_data, quantum_real, quantum_imaginary, labels
+        if on_generation is not None:
+            survivors = on_generation(generation, survivors)
+            pool.set_members(survivors)
+
+    logging.info(f"Scored {fitness_cache.evaluations} individuals over {generations} generations")
+    return pool.members()
+
+class SlotPool:
+    """
+    Fixed-capacity pool of population slots with an alive mask.
+    Selection clears the alive flag of dropped individuals instead of compacting the data, and offspring are
+    written into the free slots in place, so memory stays constant and no generation copies the surviving data.
+    `arrays` are the per-individual arrays offspring copy (None entries are skipped); `slots` are the rows of the
+    arrays that belong to the pool.
+    """
+    def __init__(self, arrays, fitness_scores, slots):
+        self.arrays = [array for array in arrays if array is not None]
+        self.fitness_scores = fitness_scores
+        self.slots = np.asarray(slots)
+        self.alive = np.zeros(len(fitness_scores), dtype=bool)
+        self.alive[self.slots] = True
+
+    def members(self):
+        """Indices of the live individuals, in slot order."""
+        return np.flatnonzero(self.alive)
+
+    def set_members(self, indices):
+        self.alive[:] = False
+        self.alive[indices] = True
+
+    def num_free(self):
+        return int(len(self.slots) - np.count_nonzero(self.alive[self.slots]))
+
+    def cull(self, members, fitness_threshold):
+        """Free the slots of the `members` at or below the fitness threshold."""
+        self.alive[members] = self.fitness_scores[members] > fitness_threshold
+
+    def refill(self, parents, fitness_cache=None):
+        """
+        Write offspring of `parents` into free slots and return the slots. An offspring starts as a copy of its
+        parent, with its fitness, and is diversified by the next generation's mutation and crossover.
+        """
+        slots = self.slots[~self.alive[self.slots]][:len(parents)]
+        parents = parents[:len(slots)]
+        for array in self.arrays:
+            array[slots] = array[parents]
+        self.fitness_scores[slots] = self.fitness_scores[parents]
+        self.alive[slots] = True
+        if fitness_cache is not None:
+            fitness_cache.mark_changed(slots)
+        return slots
+
+def tournament_selection(fitness_scores, candidates, num_parents, rng, tournament_size=3):
+    """Pick each parent as the fittest of `tournament_size` candidates drawn at random."""
+    entrants = candidates[rng.integers(0, len(candidates), (num_parents, tournament_size))]
+    return entrants[np.arange(num_parents), np.argmax(fitness_scores[entrants], axis=1)]
 
-def mutate_microbiomes(image_data, mutation_rate):
+def rank_selection(fitness_scores, candidates, num_parents, rng):
+    """Pick parents with a probability proportional to their fitness rank (the weakest has rank 1)."""
+    ranked = candidates[np.argsort(fitness_scores[candidates], kind="stable")]
+    weights = np.arange(1, len(ranked) + 1, dtype=float)
+    return rng.choice(ranked, num_parents, p=weights / weights.sum())
+
+# Parent selection refilling the free slots; "threshold" leaves them empty
+SELECTION_STRATEGIES = {"threshold": None, "tournament": tournament_selection, "rank": rank_selection}
+
+def _make_rng(seed=None):
+    """Create the generator driving the evolution; without a seed it follows the global NumPy seed."""
+    if seed is None:
+        seed = np.random.randint(0, 2**31 - 1)
+    return np.random.default_rng(seed)
+
+def mutate_microbiomes(image_data, mutation_rate, rng=None, indices=None, fitness_cache=None):
     """
     Apply random mutations to simulate microbiome evolution.
     Mutation affects the physiological data represented by the image dataset.
+    Mutated positions are sampled sparsely and overwritten in place, so only the selected elements are touched.
+    If `indices` is given, only those individuals (rows) take part.
+    The mutated rows are marked as changed in `fitness_cache`, if given.
     """
-    mutation_mask = np.random.rand(*image_data.shape) < mutation_rate
-    mutated_data = np.where(mutation_mask, np.random.random(image_data.shape), image_data)
-    logging.info(f"Applied mutations to {np.sum(mutation_mask)} elements in the image data.")
-    return mutated_data
+    rng = rng if rng is not None else _make_rng()
+    num_rows = image_data.shape[0] if indices is None else len(indices)
+    row_size = int(np.prod(image_data.shape[1:]))
 
-def crossover_microbiomes(text_data, crossover_rate):
+    # Same expected count as a dense Bernoulli mask over every element
+    num_mutations = rng.binomial(num_rows * row_size, mutation_rate)
+    if num_mutations > 0:
+        rows = rng.integers(0, num_rows, num_mutations)
+        if indices is not None:
+            rows = indices[rows]
+        columns = rng.integers(0, row_size, num_mutations)
+        flat_data = image_data.reshape(image_data.shape[0], row_size)
+        flat_data[rows, columns] = rng.random(num_mutations)
+        if fitness_cache is not None:
+            fitness_cache.mark_changed(rows, "image")
+    logging.info(f"Applied mutations to {num_mutations} elements in the image data.")
+    return image_data
+
+def crossover_microbiomes(text_data, crossover_rate, rng=None, indices=None, fitness_cache=None):
     """
     Apply crossover (gene exchange) to simulate microbiome gene exchange.
     Crossover occurs in the text data (representing cognitive/emotional data).
+    Each selected individual takes the prefix up to its crossover point from the next individual.
+    Donor rows are read before any row is overwritten, and the exchange is done in place with one masked copy.
+    Padding (token 0) that a shorter donor brings into the middle of a sequence is moved to its end, so every
+    sequence stays right-padded for the masked LSTM.
+    If `indices` is given, only those individuals (rows) take part, in that order.
+    The receiving rows are marked as changed in `fitness_cache`, if given.
     """
-    crossover_mask = np.random.rand(text_data.shape[0]) < crossover_rate
-    crossover_points = np.random.randint(0, text_data.shape[1], text_data.shape[0])
+    rng = rng if rng is not None else _make_rng()
+    population = np.arange(text_data.shape[0]) if indices is None else indices
+    num_individuals = len(population)
+    if num_individuals == 0:
+        logging.info("Crossover applied to 0 individuals in the text data.")
+        return text_data
+
+    crossover_mask = rng.random(num_individuals) < crossover_rate
+    crossover_points = rng.integers(0, text_data.shape[1], num_individuals)
+
+    positions = np.flatnonzero(crossover_mask)
+    receivers = population[positions]
+    donors = population[(positions + 1) % num_individuals]
 
-    for i in range(text_data.shape[0]):
-        if crossover_mask[i]:
-            crossover_point = crossover_points[i]
-            text_data[i, :crossover_point] = text_data[(i+1) % text_data.shape[0], :crossover_point]
-    logging.info(f"Crossover applied to {np.sum(crossover_mask)} individuals in the text data.")
+    # Genes left of the crossover point come from the donor, the rest are kept
+    prefix_mask = np.arange(text_data.shape[1]) < crossover_points[positions, None]
+    offspring = text_data[receivers]
+    np.copyto(offspring, text_data[donors], where=prefix_mask)
+    # Stable sort by "is padding": tokens keep their order, padding goes to the end
+    offspring = np.take_along_axis(offspring, np.argsort(offspring == 0, axis=1, kind="stable"), axis=1)
+    text_data[receivers] = offspring
+    if fitness_cache is not None:
+        fitness_cache.mark_changed(receivers, "text")
+    logging.info(f"Crossover applied to {len(positions)} individuals in the text data.")
     return text_data
 
-def evaluate_fitness(quantum_real, quantum_imaginary, fitness_scores):
+def evaluate_fitness(arrays, survivors, fitness_scores, fitness_cache):
     """
     Evaluate microbiome fitness based on physiological (real) and cognitive (imaginary) outcomes.
-    The quantum layers influence the new fitness scores.
+    The quantum layers influence the new fitness scores: each survivor's score is added to its fitness in place.
+    Scores come from `fitness_cache`, which only runs the fitness function on individuals changed since their
+    last scoring. `arrays` maps the input names ("image", "text", "quantum_real", "quantum_imaginary") to the data.
     """
-    real_sum = np.sum(quantum_real, axis=1)
-    imag_sum = np.sum(quantum_imaginary, axis=1)
-    new_fitness_scores = fitness_scores + (real_sum + imag_sum) / 2.0  # Fitness improvement based on quantum data
+    fitness_scores[survivors] += fitness_cache.scores(arrays, survivors)
     logging.info("Updated fitness scores based on quantum layer feedback.")
-    return new_fitness_scores
+    return fitness_scores
+
+def quantum_fitness(arrays, rows):
+    """Default fitness: the mean of the summed real and summed imaginary quantum outcomes of each individual."""
+    return (np.sum(arrays["quantum_real"][rows], axis=1) + np.sum(arrays["quantum_imaginary"][rows], axis=1)) / 2.0
+
+# The inputs a fitness function reads: changes to other inputs keep its cached scores
+quantum_fitness.inputs = ("quantum_real", "quantum_imaginary")
+
+class ModelFitness:
+    """
+    Model-based fitness: the mean output of the immaterial model for the quantum inputs of each individual.
+    Individuals are scored in batches of `batch_size` through one traced function. The model is built on the
+    first call in each process, so the fitness can be passed to the worker processes of the parallel and island
+    evolution. Its weights are loaded from `weights_path`, or else drawn (Glorot uniform) from `seed`, so every
+    process scores with the same model.
+    """
+    inputs = ("quantum_real", "quantum_imaginary")
+
+    def __init__(self, build_fn=None, weights_path=None, batch_size=8192, seed=0):
+        self.build_fn = build_fn
+        self.weights_path = weights_path
+        self.batch_size = batch_size
+        self.seed = seed
+        self._predict = None
+
+    def __getstate__(self):
+        return dict(self.__dict__, _predict=None)
+
+    def _build(self):
+        import tensorflow as tf
+        from models.immaterial_layers import build_immaterial_model
+
+        model = (self.build_fn or build_immaterial_model)()
+        if self.weights_path:
+            model.load_weights(self.weights_path)
+        else:
+            rng = np.random.default_rng(self.seed)
+            model.set_weights([rng.uniform(-1, 1, weights.shape) * np.sqrt(6 / sum(weights.shape[-2:]))
+                               if weights.ndim > 1 else np.zeros(weights.shape) for weights in model.get_weights()])
+        signature = [tf.TensorSpec(model_input.shape, model_input.dtype) for model_input in model.inputs]
+        return tf.function(lambda *inputs: tf.reduce_mean(model(list(inputs), training=False), axis=1),
+                           input_signature=signature)
+
+    def __call__(self, arrays, rows):
+        if self._predict is None:
+            self._predict = self._build()
+        scores = np.empty(len(rows))
+        for start in range(0, len(rows), self.batch_size):
+            batch = rows[start:start + self.batch_size]
+            scores[start:start + len(batch)] = self._predict(arrays["quantum_real"][batch].astype(np.float32),
+                                                             arrays["quantum_imaginary"][batch].astype(np.float32))
+        return scores
+
+FITNESS_FUNCTIONS = {"quantum": quantum_fitness, "model": ModelFitness}
+
+def make_fitness_fn(name="quantum", **kwargs):
+    """The fitness function registered as `name` in FITNESS_FUNCTIONS; classes are instantiated with `kwargs`."""
+    fitness_fn = FITNESS_FUNCTIONS[name]
+    return fitness_fn(**kwargs) if isinstance(fitness_fn, type) else fitness_fn
+
+class FitnessCache:
+    """
+    Fitness scores of the individuals of a population, keyed by row and version.
+    Mutation, crossover and migration bump the version of the rows they change, but only for changes to inputs
+    the fitness function reads (its `inputs` attribute, every input by default). A cached score is reused while
+    its row is at the version it was scored at, so each generation only scores the changed individuals.
+    """
+    INPUTS = ("image", "text", "quantum_real", "quantum_imaginary")
+
+    def __init__(self, num_individuals, fitness_fn=None):
+        self.fitness_fn = fitness_fn or quantum_fitness
+        self.inputs = set(getattr(self.fitness_fn, "inputs", self.INPUTS))
+        self.versions = np.zeros(num_individuals, dtype=np.int64)
+        self.scored_versions = np.full(num_individuals, -1, dtype=np.int64)
+        self.cached_scores = np.zeros(num_individuals)
+        self.evaluations = 0
+
+    def mark_changed(self, rows, *inputs):
+        """Bump the version of `rows` after a change to `inputs` (all inputs if none are named)."""
+        if not inputs or self.inputs.intersection(inputs):
+            self.versions[rows] += 1
+
+    def scores(self, arrays, rows):
+        """The scores of `rows`, running the fitness function only on rows changed since they were scored."""
+        stale = rows[self.scored_versions[rows] != self.versions[rows]]
+        if len(stale):
+            self.cached_scores[stale] = self.fitness_fn(arrays, stale)
+            self.scored_versions[stale] = self.versions[stale]
+            self.evaluations += len(stale)
+        logging.info(f"Scored {len(stale)} changed individuals, reused {len(rows) - len(stale)} cached scores.")
+        return self.cached_scores[rows]
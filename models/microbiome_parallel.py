@@ -0,0 +1,95 @@
+# models/microbiome_parallel.py
+
+import os
+import shutil
+import tempfile
+import logging
+import numpy as np
+from joblib import Parallel, delayed, effective_n_jobs
+from threadpoolctl import threadpool_limits
+from models.microbiome_model import evolve_population
+from utils.dataset_store import DatasetView
+
+# Number of shards the population is split into. Fixed rather than tied to the core count, so a seeded run
+# evolves the same population on every machine
+EVOLUTION_SHARDS = 16
+
+def _shared_folder():
+    """Create a scratch folder for the shared arrays, in RAM-backed /dev/shm when available."""
+    base_dir = "/dev/shm" if os.path.isdir("/dev/shm") else None
+    return tempfile.mkdtemp(prefix="samvara_evolution_", dir=base_dir)
+
+def _to_shared(array, folder, name):
+    """Copy an array into a file-backed memmap that every worker process opens instead of receiving a pickle."""
+    path = os.path.join(folder, f"{name}.mmap")
+    shared = np.memmap(path, dtype=array.dtype, mode="w+", shape=array.shape)
+    shared[:] = array
+    shared.flush()
+    # Reopen read/write, so workers attach to the same file rather than truncating it
+    return np.memmap(path, dtype=array.dtype, mode="r+", shape=array.shape)
+
+def _evolve_shard(shared_arrays, start, stop, seed_sequence, evolution_params=None):
+    """Evolve the rows [start, stop) of the shared arrays in place and return the global survivor indices."""
+    # One BLAS/OpenMP thread per worker, the pool already provides the parallelism
+    with threadpool_limits(limits=1):
+        image_data, text_data, quantum_real, quantum_imaginary, labels, fitness_scores = (
+            array[start:stop] for array in shared_arrays
+        )
+        rng = np.random.default_rng(seed_sequence)
+        # Initial fitness scores for microbiomes (based on harmony with the host), from the shard's own generator
+        fitness_scores[:] = rng.random(stop - start)
+        survivors = evolve_population(image_data, text_data, quantum_real, quantum_imaginary, fitness_scores,
+                                      np.arange(stop - start), rng, labels=labels, **(evolution_params or {}))
+    return survivors + start
+
+def run_parallel_evolution(image_data, text_data, quantum_real, quantum_imaginary, labels,
+                           n_jobs=-1, n_shards=EVOLUTION_SHARDS, seed=None, as_view=False, work_dir=None, evolution_params=None):
+    """
+    Evolve the microbiome population on a process pool.
+    The population is partitioned into contiguous shards that evolve independently (crossover partners are
+    drawn from the same shard). The arrays live in shared memory-mapped files, so workers only receive
+    file references, and each shard gets its own child seed, so results depend only on `seed` and
+    `n_shards` (a fixed default), not on the number of workers or their scheduling.
+    The shared files go to `work_dir` when given and are then kept, so `as_view` can return a DatasetView
+    over them; otherwise they live in a temporary folder and the survivors are copied out.
+    """
+    n_workers = effective_n_jobs(n_jobs)
+    num_samples = image_data.shape[0]
+    n_shards = max(1, min(n_shards, num_samples))
+    logging.info(f"Starting parallel evolutionary algorithm: {n_shards} shards on {n_workers} workers.")
+
+    if seed is None:
+        seed = np.random.randint(0, 2**31 - 1)
+    shard_seeds = np.random.SeedSequence(seed).spawn(n_shards)
+    bounds = np.linspace(0, num_samples, n_shards + 1).astype(int)
+
+    # Filled by each shard from its own seeded generator
+    fitness_scores = np.zeros(num_samples)
+
+    folder = work_dir or _shared_folder()
+    os.makedirs(folder, exist_ok=True)
+    try:
+        shared_arrays = [
+            _to_shared(array, folder, name)
+            for name, array in zip(("image", "text", "quantum_real", "quantum_imaginary", "labels", "fitness"),
+                                   (image_data, text_data, quantum_real, quantum_imaginary, labels, fitness_scores))
+        ]
+        shard_survivors = Parallel(n_jobs=n_workers)(
+            delayed(_evolve_shard)(shared_arrays, bounds[i], bounds[i + 1], shard_seeds[i], evolution_params)
+            for i in range(n_shards)
+        )
+        survivors = np.concatenate(shard_survivors)
+        logging.info(f"Parallel evolution completed: {len(survivors)} individuals survived.")
+
+        # Offspring are written into every array, so the result is read from the shared copies
+        evolved = DatasetView.from_arrays(*shared_arrays[:5], survivors)
+        if as_view and work_dir is not None:
+            return evolved
+        # Copy the survivors out of the shared files before they are removed
+        evolved_arrays = evolved.take()
+        del shared_arrays, evolved
+    finally:
+        if work_dir is None:
+            shutil.rmtree(folder, ignore_errors=True)
+
+    return DatasetView.from_arrays(*evolved_arrays) if as_view else evolved_arrays
@@ -0,0 +1,138 @@
+# models/microbiome_stream.py
+
+import time
+import queue
+import logging
+import threading
+import numpy as np
+from models.microbiome_model import evolve_population, working_copies, _make_rng
+from utils.dataset_store import DatasetView
+from utils.helpers import trim_padding
+
+
+class EvolutionStream:
+    """
+    Run the evolutionary algorithm as a producer for training.
+    Evolution runs in a background thread; after each generation its survivors are shuffled into batches and put
+    on a bounded queue, which `dataset()` feeds to Model.fit. Training consumes earlier generations while the next
+    one evolves, and the bounded queue makes evolution wait when training falls behind.
+    Once the last generation is published, the final population is streamed again (reshuffled) until closed.
+    """
+    def __init__(self, image_data, text_data, quantum_real, quantum_imaginary, labels, batch_size,
+                 include_immaterial=True, queue_size=64, seed=None, work_dir=None, evolution_params=None):
+        self.batch_size = batch_size
+        self.include_immaterial = include_immaterial
+        self.seed = seed
+        self.evolution_params = evolution_params or {}
+        self.steps_per_epoch = int(np.ceil(len(labels) / batch_size))
+
+        self._rng = _make_rng(seed)
+        # Initial fitness scores, drawn from the seeded generator like the rest of the evolution
+        self._fitness_scores = self._rng.random(image_data.shape[0])
+        self._arrays = working_copies(image_data, text_data, quantum_real, quantum_imaginary, labels, work_dir=work_dir)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._error = None
+        self.result = None
+        self.batches_per_generation = []
+        self.consumer_wait_seconds = 0.0
+        self._thread = threading.Thread(target=self._produce)
+        self._thread.daemon = True
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def _put(self, item):
+        """Put an item on the queue, giving up when the stream is closed. Returns whether it was queued."""
+        while not self._stop.is_set():
+            try:
+                self._queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _publish(self, view, seed):
+        """Queue one shuffled pass over the view; the batches are copies, so evolution can go on in place."""
+        num_batches = 0
+        for image, text, real, imaginary, labels in view.batches(self.batch_size, shuffle=True, seed=seed):
+            text = trim_padding(text)
+            inputs = (image, text, real, imaginary) if self.include_immaterial else (image, text)
+            if not self._put((inputs, labels)):
+                break
+            num_batches += 1
+        return num_batches
+
+    def _produce(self):
+        population = DatasetView.from_arrays(*self._arrays)
+
+        def on_generation(generation, survivors):
+            # After close() evolution still finishes, it just stops publishing
+            if not self._stop.is_set():
+                self.batches_per_generation.append(self._publish(population.select(survivors), generation))
+            return survivors
+
+        try:
+            image_data, text_data, quantum_real, quantum_imaginary, labels = self._arrays
+            survivors = evolve_population(image_data, text_data, quantum_real, quantum_imaginary,
+                                          self._fitness_scores, np.arange(len(population)), self._rng,
+                                          on_generation=on_generation, labels=labels, **self.evolution_params)
+            self.result = population.select(survivors)
+            logging.info(f"Streamed evolution completed with {len(self.result)} survivors, "
+                         f"batches per generation: {self.batches_per_generation}")
+
+            # Keep training on the final population until the consumer is done
+            replay = 0
+            while len(self.result) and not self._stop.is_set():
+                self._publish(self.result, len(self.batches_per_generation) + replay)
+                replay += 1
+        except Exception as e:
+            logging.error(f"Streamed evolution failed: {e}")
+            self._error = e
+        finally:
+            self._put(None)
+
+    def generator(self):
+        """Yield (inputs, labels) batches from the queue until the stream ends."""
+        while True:
+            start_time = time.perf_counter()
+            item = self._queue.get()
+            self.consumer_wait_seconds += time.perf_counter() - start_time
+            if item is None:
+                if self._error is not None:
+                    raise self._error
+                return
+            yield item
+
+    def dataset(self):
+        """A tf.data view of the stream; pass `steps_per_epoch` to Model.fit, the stream has no fixed length."""
+        import tensorflow as tf
+
+        image_data, text_data, quantum_real, quantum_imaginary, labels = self._arrays
+        inputs = (image_data, text_data, quantum_real, quantum_imaginary) if self.include_immaterial \
+            else (image_data, text_data)
+        spec = lambda array: tf.TensorSpec(shape=(None,) + array.shape[1:], dtype=tf.as_dtype(array.dtype))
+        # The text of each batch is cut to its longest sequence, so its length varies
+        input_specs = tuple(tf.TensorSpec(shape=(None, None), dtype=tf.as_dtype(array.dtype)) if array is text_data
+                            else spec(array) for array in inputs)
+        output_signature = (input_specs, spec(labels))
+        dataset = tf.data.Dataset.from_generator(self.generator, output_signature=output_signature)
+        return dataset.prefetch(tf.data.AUTOTUNE)
+
+    def close(self):
+        """
+        Stop streaming, wait for the evolution to finish and return the evolved population as a DatasetView.
+        """
+        self._stop.set()
+        self._thread.join()
+        # Wake a consumer still blocked on the queue, e.g. the prefetch of an abandoned tf.data iterator
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            pass
+        if self._error is not None:
+            raise self._error
+        logging.info(f"Training waited {self.consumer_wait_seconds:.1f}s in total for evolved batches.")
+        return self.result
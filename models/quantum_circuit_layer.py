@@ -0,0 +1,156 @@
+# models/quantum_circuit_layer.py
+
+import logging
+from collections import OrderedDict
+import numpy as np
+import pennylane as qml
+import tensorflow as tf
+from tensorflow.keras import layers
+
+def make_variational_circuit(num_qubits):
+    """
+    Variational circuit on a simulated CPU device: the real part is angle-embedded as RX rotations, the imaginary
+    part as RZ rotations, followed by strongly entangling layers and one PauliZ expectation per qubit.
+    The embedding broadcasts over a batch dimension, so a whole batch is one simulation of shape (batch, 2**n)
+    instead of one circuit execution per sample. With NumPy inputs it runs on NumPy, with TF inputs it is
+    differentiable by backprop.
+    """
+    device = qml.device("default.qubit", wires=num_qubits)
+
+    @qml.qnode(device, interface="auto", diff_method="backprop")
+    def circuit(real_part, imaginary_part, weights):
+        qml.AngleEmbedding(real_part, wires=range(num_qubits), rotation="X")
+        qml.AngleEmbedding(imaginary_part, wires=range(num_qubits), rotation="Z")
+        qml.StronglyEntanglingLayers(weights, wires=range(num_qubits))
+        return [qml.expval(qml.PauliZ(wire)) for wire in range(num_qubits)]
+
+    return circuit
+
+
+class ComplexCastWarningFilter(logging.Filter):
+    """
+    Drops TensorFlow's complex-to-real cast warning. PennyLane casts the real rotation matrices to the complex
+    state dtype, and the gradient of each of those casts is a complex128 to float cast that logs this warning
+    whenever a training step is traced. Dropping the imaginary part there is correct, the angles are real.
+    """
+    def filter(self, record):
+        return not record.getMessage().startswith("You are casting an input of type complex")
+
+
+COMPLEX_CAST_WARNING_FILTER = ComplexCastWarningFilter()
+
+
+class QuantumCircuitLayer(tf.keras.layers.Layer):
+    """
+    Keras layer running a variational quantum circuit over a [real, imaginary] pair (or a packed
+    [real | imaginary] tensor, like CustomQuantumLayer), with one qubit per input feature.
+    With `cache_size` > 0, results outside training are served from an LRU cache keyed on the inputs and weights
+    rounded to `cache_decimals`, so repeated evaluations skip the simulation for rows already seen with the same
+    weights and only the missing rows are simulated, in one batched call. The cache is off by default: it runs
+    in a py_function, which cannot be exported or run under a distribution strategy, and for a few qubits the
+    broadcast simulation is faster than the cache lookup. It pays off for larger qubit counts.
+    """
+    def __init__(self, num_layers=2, cache_size=0, cache_decimals=4, **kwargs):
+        super(QuantumCircuitLayer, self).__init__(**kwargs)
+        self.num_layers = num_layers
+        self.cache_size = cache_size
+        self.cache_decimals = cache_decimals
+        self._cache = OrderedDict()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def build(self, input_shape):
+        if isinstance(input_shape, (list, tuple)) and isinstance(input_shape[0], (list, tuple, tf.TensorShape)):
+            if input_shape[0][-1] != input_shape[1][-1]:
+                raise ValueError(f"Real and imaginary parts need the same width, "
+                                 f"got {input_shape[0][-1]} and {input_shape[1][-1]}")
+            self.num_qubits = int(input_shape[0][-1])
+        else:
+            self.num_qubits = int(input_shape[-1]) // 2
+        self.circuit = make_variational_circuit(self.num_qubits)
+        tf.get_logger().addFilter(COMPLEX_CAST_WARNING_FILTER)
+        self.circuit_weights = self.add_weight(name='circuit_weights',
+                                               shape=qml.StronglyEntanglingLayers.shape(self.num_layers,
+                                                                                        self.num_qubits),
+                                               initializer=tf.keras.initializers.RandomUniform(0, 2 * np.pi),
+                                               trainable=True,
+                                               dtype=tf.float32)
+
+    def _split(self, inputs):
+        if isinstance(inputs, (list, tuple)):
+            return inputs
+        return tf.split(inputs, 2, axis=-1)
+
+    def _evaluate(self, real_part, imaginary_part, weights):
+        """Run the circuit on a batch and return the expectations as a (batch, num_qubits) array or tensor."""
+        expectations = self.circuit(real_part, imaginary_part, weights)
+        if isinstance(real_part, np.ndarray):
+            return np.stack([np.real(expectation) for expectation in expectations], axis=-1).astype(np.float32)
+        return tf.cast(tf.stack([tf.math.real(expectation) for expectation in expectations], axis=-1), tf.float32)
+
+    def _cached_forward(self, real_part, imaginary_part, weights):
+        real_part = np.round(real_part.numpy().astype(np.float64), self.cache_decimals)
+        imaginary_part = np.round(imaginary_part.numpy().astype(np.float64), self.cache_decimals)
+        weights = np.round(weights.numpy().astype(np.float64), self.cache_decimals)
+        weights_key = weights.tobytes()
+
+        outputs = np.empty((len(real_part), self.num_qubits), dtype=np.float32)
+        keys = [(weights_key, real_row.tobytes(), imaginary_row.tobytes())
+                for real_row, imaginary_row in zip(real_part, imaginary_part)]
+        missing = OrderedDict()
+        for row, key in enumerate(keys):
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                outputs[row] = self._cache[key]
+                self.cache_hits += 1
+            else:
+                missing.setdefault(key, []).append(row)
+                self.cache_misses += 1
+
+        if missing:
+            # One broadcast simulation over the unique missing rows
+            first_rows = [rows[0] for rows in missing.values()]
+            results = self._evaluate(real_part[first_rows], imaginary_part[first_rows], weights)
+            for (key, rows), result in zip(missing.items(), results):
+                outputs[rows] = result
+                self._cache[key] = result
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return outputs
+
+    def call(self, inputs, training=None):
+        real_part, imaginary_part = self._split(inputs)
+        if training or not self.cache_size:
+            return self._evaluate(real_part, imaginary_part, self.circuit_weights)
+
+        outputs = tf.py_function(self._cached_forward, [real_part, imaginary_part, self.circuit_weights], tf.float32)
+        outputs.set_shape([None, self.num_qubits])
+        return outputs
+
+    def clear_cache(self):
+        self._cache.clear()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def compute_output_shape(self, input_shape):
+        batch_size = input_shape[0][0] if isinstance(input_shape[0], (list, tuple, tf.TensorShape)) else input_shape[0]
+        return (batch_size, self.num_qubits)
+
+    def get_config(self):
+        config = super(QuantumCircuitLayer, self).get_config()
+        config.update({
+            "num_layers": self.num_layers,
+            "cache_size": self.cache_size,
+            "cache_decimals": self.cache_decimals
+        })
+        return config
+
+# Build an immaterial model around the variational circuit, a drop-in for build_immaterial_model
+def build_circuit_immaterial_model(num_layers=2):
+    real_input = layers.Input(shape=(2,), dtype=tf.float32, name="real_input")
+    imaginary_input = layers.Input(shape=(2,), dtype=tf.float32, name="imaginary_input")
+
+    # The circuit simulation always runs in float32, also under a mixed precision policy
+    q_layer = QuantumCircuitLayer(num_layers=num_layers, dtype='float32')([real_input, imaginary_input])
+    model = tf.keras.Model(inputs=[real_input, imaginary_input], outputs=q_layer)
+    return model
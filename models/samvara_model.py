@@ -6,16 +6,108 @@ from tensorflow.keras.models import Model
 from models.material_layers import build_material_model
 from models.immaterial_layers import build_immaterial_model
 
-def build_samvara_model(include_immaterial=True):
+# Ways of treating warm-started material layers in phase 2
+MATERIAL_MODES = ("train", "freeze", "partial", "layerwise")
+
+@tf.keras.utils.register_keras_serializable(package="Samvara")
+class SamvaraModel(Model):
+    """
+    Functional Samvara model that can train its material sub-model with a scaled learning rate.
+    With material_lr_multiplier != 1 the material weights get their own copy of the optimizer, so
+    adaptive optimizers like Adam really take smaller steps (scaling gradients would be normalized away).
+    """
+    # The positional arguments are those of a functional Model and the multiplier is keyword-only, so Keras
+    # still serializes the layer graph in get_config like for a plain functional model
+    def __init__(self, inputs, outputs, name=None, trainable=True, *, material_lr_multiplier=1.0, **kwargs):
+        super(SamvaraModel, self).__init__(inputs=inputs, outputs=outputs, name=name, trainable=trainable, **kwargs)
+        self.material_lr_multiplier = material_lr_multiplier
+        self.material_optimizer = None
+
+    def get_config(self):
+        # The layer graph plus the multiplier. Not via a throwaway Model: that creates variables, which under
+        # MultiWorkerMirroredStrategy every worker would have to create too
+        config = super(SamvaraModel, self).get_config()
+        if "layers" not in config:
+            raise TypeError("SamvaraModel.__init__ must keep the signature of a functional Model to be serializable")
+        config['material_lr_multiplier'] = self.material_lr_multiplier
+        return config
+
+    @classmethod
+    def from_config(cls, config, custom_objects=None):
+        config = dict(config)
+        material_lr_multiplier = config.pop('material_lr_multiplier', 1.0)
+        functional_model = Model.from_config(config, custom_objects=custom_objects)
+        return cls(inputs=functional_model.inputs, outputs=functional_model.outputs, name=functional_model.name,
+                   material_lr_multiplier=material_lr_multiplier)
+
+    def compile(self, *args, **kwargs):
+        super(SamvaraModel, self).compile(*args, **kwargs)
+        if self.material_lr_multiplier != 1.0:
+            self.material_optimizer = _scaled_optimizer_copy(self.optimizer, self.material_lr_multiplier)
+
+    def train_step(self, data):
+        if self.material_optimizer is None:
+            return super(SamvaraModel, self).train_step(data)
+
+        x, y, sample_weight = tf.keras.utils.unpack_x_y_sample_weight(data)
+        with tf.GradientTape(persistent=True) as tape:
+            y_pred = self(x, training=True)
+            loss = self.compute_loss(x, y, y_pred, sample_weight)
+
+        material_variables = self.get_layer('material_model').trainable_variables
+        material_refs = {variable.ref() for variable in material_variables}
+        other_variables = [v for v in self.trainable_variables if v.ref() not in material_refs]
+
+        self.optimizer.minimize(loss, other_variables, tape=tape)
+        self.material_optimizer.minimize(loss, material_variables, tape=tape)
+        del tape
+        return self.compute_metrics(x, y, y_pred, sample_weight)
+
+class _ScaledSchedule(tf.keras.optimizers.schedules.LearningRateSchedule):
+    """A learning rate schedule multiplied by a constant; the wrapped schedule is shared, not copied."""
+    def __init__(self, schedule, multiplier):
+        super(_ScaledSchedule, self).__init__()
+        self.schedule = schedule
+        self.multiplier = multiplier
+
+    def __call__(self, step):
+        return self.schedule(step) * self.multiplier
+
+    def get_config(self):
+        return {"schedule": tf.keras.optimizers.schedules.serialize(self.schedule), "multiplier": self.multiplier}
+
+def _scaled_optimizer_copy(optimizer, multiplier):
+    """
+    Create a fresh optimizer of the same kind with the learning rate scaled by `multiplier`.
+    A learning rate schedule is shared, so adjustments to it (e.g. by the MentorModel) apply to both optimizers.
+    """
+    loss_scaled = isinstance(optimizer, tf.keras.mixed_precision.LossScaleOptimizer)
+    base_optimizer = optimizer.inner_optimizer if loss_scaled else optimizer
+    config = base_optimizer.get_config()
+    if isinstance(base_optimizer._learning_rate, tf.keras.optimizers.schedules.LearningRateSchedule):
+        config['learning_rate'] = _ScaledSchedule(base_optimizer._learning_rate, multiplier)
+    else:
+        config['learning_rate'] = float(config['learning_rate']) * multiplier
+    config['name'] = f"material_{config['name']}"
+    scaled = base_optimizer.__class__.from_config(config)
+    return tf.keras.mixed_precision.LossScaleOptimizer(scaled) if loss_scaled else scaled
+
+def build_samvara_model(include_immaterial=True, material_model=None, material_lr_multiplier=1.0, augmentation=None):
     """
     Build the Samvara model. If include_immaterial=False, only train material layers.
+    Pass the material sub-model of a trained phase-1 model as `material_model` to warm-start from its weights
+    (the layers are shared, not copied).
+    `augmentation` (see utils/augmentation.py) is applied to the image input inside the model, so it runs on the
+    training device; it is the identity at inference.
     """
     # Material model (image and text inputs)
     image_input = Input(shape=(32, 32, 3), name='image_input')
-    text_input = Input(shape=(100,), name='text_input')
-    material_model = build_material_model()
+    text_input = Input(shape=(None,), name='text_input', dtype='int32')
+    if material_model is None:
+        material_model = build_material_model()
 
-    material_output = material_model([image_input, text_input])
+    image_features = augmentation(image_input) if augmentation is not None else image_input
+    material_output = material_model([image_features, text_input])
 
     if include_immaterial:
         # Immaterial model (quantum input)
@@ -31,10 +123,32 @@ def build_samvara_model(include_immaterial=True):
         # Only material output
         combined_output = material_output
 
-    # Final dense layer for classification
-    output = Dense(10, activation='softmax')(combined_output)
+    # Final dense layer for classification, kept in float32 so the softmax stays stable under mixed precision
+    output = Dense(10, activation='softmax', dtype='float32')(combined_output)
 
     if include_immaterial:
-        return Model(inputs=[image_input, text_input, real_input, imaginary_input], outputs=output)
+        return SamvaraModel(inputs=[image_input, text_input, real_input, imaginary_input], outputs=output,
+                            material_lr_multiplier=material_lr_multiplier)
+    else:
+        return SamvaraModel(inputs=[image_input, text_input], outputs=output,
+                            material_lr_multiplier=material_lr_multiplier)
+
+def configure_material_layers(samvara_model, mode="train", unfreeze_layers=2):
+    """
+    Set which warm-started material layers train in phase 2, before compiling:
+    "train" and "layerwise" train everything, "freeze" freezes the whole material sub-model and "partial"
+    only unfreezes its last `unfreeze_layers` layers that have weights.
+    """
+    if unfreeze_layers < 0:
+        raise ValueError(f"unfreeze_layers must be non-negative, got {unfreeze_layers}")
+    material_model = samvara_model.get_layer('material_model')
+    if mode == "freeze":
+        material_model.trainable = False
+    elif mode == "partial":
+        material_model.trainable = True
+        weighted_layers = [layer for layer in material_model.layers if layer.weights]
+        # More layers than there are unfreezes all of them, not a negative slice from the end
+        for layer in weighted_layers[:max(0, len(weighted_layers) - unfreeze_layers)]:
+            layer.trainable = False
     else:
-        return Model(inputs=[image_input, text_input], outputs=output)
+        material_model.trainable = True
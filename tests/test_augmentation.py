@@ -0,0 +1,55 @@
+# tests/test_augmentation.py
+
+import io
+import unittest
+import contextlib
+import numpy as np
+import tensorflow as tf
+from utils.augmentation import AUGMENTATION_MODES, build_augmentation, augment_batches
+from utils.parser import parse_arguments
+
+
+def make_batches(num_samples=8, batch_size=4):
+    rng = np.random.default_rng(0)
+    inputs = (rng.random((num_samples, 32, 32, 3), dtype=np.float32), rng.integers(1, 100, (num_samples, 7)),
+              rng.random((num_samples, 2), dtype=np.float32))
+    labels = np.arange(num_samples)
+    return inputs, labels, tf.data.Dataset.from_tensor_slices((inputs, labels)).batch(batch_size)
+
+
+class TestAugmentationArgument(unittest.TestCase):
+
+    def test_default_is_no_augmentation(self):
+        self.assertEqual(AUGMENTATION_MODES[0], "none")
+        self.assertEqual(parse_arguments([]).augmentation, "none")
+
+    def test_every_mode_is_accepted_and_others_are_rejected(self):
+        for mode in AUGMENTATION_MODES:
+            self.assertEqual(parse_arguments(["--augmentation", mode]).augmentation, mode)
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            parse_arguments(["--augmentation", "gpu"])
+
+
+class TestAugmentBatches(unittest.TestCase):
+
+    def test_only_the_images_are_augmented(self):
+        inputs, labels, dataset = make_batches()
+        batches = list(augment_batches(dataset, build_augmentation(seed=0)))
+        self.assertEqual(len(batches), 2)
+        # The parallel map may reorder batches; the untouched labels identify them
+        for batch_inputs, batch_labels in batches:
+            rows = batch_labels.numpy()
+            self.assertEqual(batch_inputs[0].shape, (4, 32, 32, 3))
+            for augmented, original in zip(batch_inputs[1:], inputs[1:]):
+                np.testing.assert_array_equal(augmented, original[rows])
+        images = np.concatenate([batch_inputs[0].numpy() for batch_inputs, _ in batches])
+        order = np.concatenate([batch_labels.numpy() for _, batch_labels in batches])
+        self.assertFalse(np.allclose(images, inputs[0][order]))
+
+    def test_augmentation_is_the_identity_outside_training(self):
+        images = np.random.default_rng(1).random((4, 32, 32, 3), dtype=np.float32)
+        np.testing.assert_array_equal(build_augmentation(seed=0)(images, training=False), images)
+
+
+if __name__ == "__main__":
+    unittest.main()
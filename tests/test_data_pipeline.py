@@ -0,0 +1,91 @@
+# tests/test_data_pipeline.py
+
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from utils.data_pipeline import write_dataset_shards, list_dataset_shards, load_spec, build_dataset
+
+NUM_SAMPLES = 40
+TEXT_LENGTH = 12
+
+
+def make_arrays(num_samples=NUM_SAMPLES):
+    """Rows whose label is their index, with right-padded text of 1 to TEXT_LENGTH tokens."""
+    rng = np.random.default_rng(0)
+    lengths = rng.integers(1, TEXT_LENGTH + 1, num_samples)
+    text = np.where(np.arange(TEXT_LENGTH) < lengths[:, None],
+                    rng.integers(1, 50, (num_samples, TEXT_LENGTH)), 0).astype(np.int32)
+    return (rng.random((num_samples, 4, 4, 3), dtype=np.float32), text,
+            rng.random((num_samples, 2), dtype=np.float32), rng.random((num_samples, 2), dtype=np.float32),
+            np.arange(num_samples, dtype=np.int64))
+
+
+def collect(dataset):
+    """Every batch of a dataset as numpy arrays: ([image, text, real, imaginary], labels)."""
+    return [([x.numpy() for x in inputs], labels.numpy()) for inputs, labels in dataset]
+
+
+class TestDataPipeline(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.arrays = make_arrays()
+        self.train_files, self.val_files = write_dataset_shards(self.directory, *self.arrays, num_shards=4,
+                                                                validation_split=0.25)
+        self.spec = load_spec(self.directory)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_shards_round_trip(self):
+        self.assertEqual((len(self.train_files), len(self.val_files)), (4, 1))
+        self.assertEqual(list_dataset_shards(self.directory), (self.train_files, self.val_files))
+        self.assertEqual(self.spec["image"], {"shape": [4, 4, 3], "dtype": "float32"})
+
+        batches = collect(build_dataset(self.train_files + self.val_files, self.spec, 8, training=False))
+        labels = np.concatenate([batch_labels for _, batch_labels in batches])
+        # Shards are interleaved, so rows are compared in label (original row) order
+        np.testing.assert_array_equal(np.sort(labels), np.arange(NUM_SAMPLES))
+        for i in (0, 2, 3):
+            np.testing.assert_array_equal(np.concatenate([inputs[i] for inputs, _ in batches]),
+                                          self.arrays[i][labels])
+        # The text of each batch is cut to its longest sequence and otherwise unchanged
+        for inputs, batch_labels in batches:
+            text = inputs[1]
+            original = self.arrays[1][batch_labels]
+            self.assertEqual(text.shape[1], np.max(np.count_nonzero(original, axis=1)))
+            np.testing.assert_array_equal(text, original[:, :text.shape[1]])
+
+    def test_material_inputs_only(self):
+        inputs, _ = collect(build_dataset(self.val_files, self.spec, 8, include_immaterial=False,
+                                          training=False))[0]
+        self.assertEqual(len(inputs), 2)
+
+    def test_training_epoch_reads_every_record_exactly_once(self):
+        dataset = build_dataset(self.train_files, self.spec, 8, shuffle_buffer=100, seed=0)
+        for _ in range(2):
+            labels = np.concatenate([batch_labels for _, batch_labels in collect(dataset)])
+            np.testing.assert_array_equal(np.sort(labels), np.arange(30))
+
+    def test_bucketed_batches_hold_similar_lengths_padded_to_their_longest(self):
+        boundaries = [4, 8]
+        dataset = build_dataset(self.train_files, self.spec, 4, shuffle_buffer=100, seed=0,
+                                bucket_boundaries=boundaries)
+        batches = collect(dataset)
+        labels = np.concatenate([batch_labels for _, batch_labels in batches])
+        np.testing.assert_array_equal(np.sort(labels), np.arange(30))
+        for inputs, batch_labels in batches:
+            text = inputs[1]
+            lengths = np.count_nonzero(self.arrays[1][batch_labels], axis=1)
+            # One bucket per batch: lengths in [1, 4), [4, 8) or [8, TEXT_LENGTH]
+            self.assertEqual(len(set(np.digitize(lengths, boundaries))), 1)
+            self.assertEqual(text.shape[1], lengths.max())
+            np.testing.assert_array_equal(np.count_nonzero(text, axis=1), lengths)
+            # Padding stays at the end of each sequence
+            for row, length in zip(text, lengths):
+                self.assertFalse(np.any(row[length:]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,74 @@
+# tests/test_dataset_store.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+from utils.dataset_store import (DatasetView, copy_to_memmap, write_dataset_store, open_dataset_store,
+                                 dataset_store_exists)
+
+
+def make_arrays(num_samples=10):
+    rng = np.random.default_rng(0)
+    return (rng.random((num_samples, 4, 4, 3), dtype=np.float32),
+            rng.integers(0, 100, (num_samples, 6)).astype(np.int32),
+            rng.random((num_samples, 2)), rng.random((num_samples, 2)),
+            np.arange(num_samples))
+
+
+class TestDatasetStore(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_copy_to_memmap_copies_every_chunk(self):
+        array = np.arange(50, dtype=np.int64).reshape(10, 5)
+        copy = copy_to_memmap(array, os.path.join(self.directory, "array.npy"), chunk_rows=3)
+        self.assertIsInstance(copy, np.memmap)
+        np.testing.assert_array_equal(copy, array)
+        np.testing.assert_array_equal(np.load(os.path.join(self.directory, "array.npy")), array)
+
+    def test_store_round_trip(self):
+        arrays = make_arrays()
+        write_dataset_store(self.directory, *arrays)
+        self.assertTrue(dataset_store_exists(self.directory))
+        store = open_dataset_store(self.directory)
+        self.assertEqual(len(store), 10)
+        for stored, original in zip(store.modalities(), arrays):
+            self.assertIsInstance(stored, np.memmap)
+            np.testing.assert_array_equal(stored, original)
+
+    def test_select_composes_indices_and_take_materializes_them(self):
+        arrays = make_arrays()
+        view = DatasetView.from_arrays(*arrays).select(np.array([8, 6, 4, 2])).select(np.array([True, False, True,
+                                                                                                False]))
+        np.testing.assert_array_equal(view.indices, [8, 4])
+        # Selecting does not copy the data
+        self.assertIs(view.modalities()[0], arrays[0])
+        image, _, _, _, labels = view.take()
+        np.testing.assert_array_equal(labels, [8, 4])
+        np.testing.assert_array_equal(image, arrays[0][[8, 4]])
+
+    def test_save_writes_only_the_selected_rows(self):
+        view = DatasetView.from_arrays(*make_arrays()).select(np.array([9, 0, 5]))
+        view.save(self.directory, chunk_rows=2)
+        saved = open_dataset_store(self.directory)
+        for saved_array, selected in zip(saved.take(), view.take()):
+            np.testing.assert_array_equal(saved_array, selected)
+
+    def test_batches_cover_every_row_once_and_follow_the_seed(self):
+        view = DatasetView.from_arrays(*make_arrays())
+        batches = list(view.batches(4, shuffle=True, seed=3))
+        self.assertEqual([len(batch[-1]) for batch in batches], [4, 4, 2])
+        labels = np.concatenate([batch[-1] for batch in batches])
+        np.testing.assert_array_equal(np.sort(labels), np.arange(10))
+        again = np.concatenate([batch[-1] for batch in view.batches(4, shuffle=True, seed=3)])
+        np.testing.assert_array_equal(labels, again)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,79 @@
+# tests/test_distributed.py
+
+import os
+import sys
+import json
+import unittest
+import subprocess
+import tensorflow as tf
+from utils.distributed import make_strategy, is_chief, worker_index, worker_dir, scale_for_replicas
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Logical CPU devices must be configured before TensorFlow initializes, so the mirrored run gets its own process.
+# One SGD step on a global batch of 8 split over 2 replicas must match the same step on one device.
+MIRRORED_STEP = """
+import json
+import numpy as np
+import tensorflow as tf
+from utils.distributed import make_strategy
+
+def train_step(strategy):
+    with strategy.scope():
+        tf.keras.utils.set_random_seed(0)
+        model = tf.keras.Sequential([tf.keras.Input((3,)), tf.keras.layers.Dense(2)])
+        model.compile(optimizer=tf.keras.optimizers.SGD(0.1), loss="mse")
+    rng = np.random.default_rng(0)
+    model.fit(rng.random((8, 3)), rng.random((8, 2)), batch_size=8, epochs=1, shuffle=False, verbose=0)
+    return model.get_weights()
+
+mirrored = make_strategy("mirrored", cpu_replicas=2)
+distributed, single = train_step(mirrored), train_step(tf.distribute.get_strategy())
+print(json.dumps({"replicas": mirrored.num_replicas_in_sync,
+                  "difference": max(float(np.abs(a - b).max()) for a, b in zip(distributed, single))}))
+"""
+
+
+class FakeStrategy:
+    def __init__(self, cluster, task_type, task_id):
+        self.cluster_resolver = tf.distribute.cluster_resolver.SimpleClusterResolver(
+            tf.train.ClusterSpec(cluster), task_type=task_type, task_id=task_id)
+
+
+class TestDistributed(unittest.TestCase):
+
+    def test_batch_size_and_learning_rate_scale_with_the_replicas(self):
+        self.assertEqual(scale_for_replicas(32, 0.001, 1), (32, 0.001))
+        self.assertEqual(scale_for_replicas(32, 0.001, 4), (128, 0.004))
+
+    def test_unknown_strategy_is_rejected(self):
+        with self.assertRaises(ValueError):
+            make_strategy("parameter_server")
+
+    def test_chief_and_worker_directories(self):
+        default = tf.distribute.get_strategy()
+        self.assertEqual((worker_index(default), is_chief(default)), (0, True))
+        self.assertEqual(worker_dir("checkpoints/", default), "checkpoints/")
+
+        workers = {"worker": ["localhost:1", "localhost:2"]}
+        self.assertTrue(is_chief(FakeStrategy(workers, "worker", 0)))
+        second_worker = FakeStrategy(workers, "worker", 1)
+        self.assertFalse(is_chief(second_worker))
+        self.assertEqual(worker_index(second_worker), 1)
+        self.assertEqual(worker_dir("checkpoints/", second_worker), "checkpoints/worker_1/")
+
+        # With a chief task, worker 0 is not the chief
+        with_chief = dict(workers, chief=["localhost:3"])
+        self.assertTrue(is_chief(FakeStrategy(with_chief, "chief", 0)))
+        self.assertFalse(is_chief(FakeStrategy(with_chief, "worker", 0)))
+
+    def test_mirrored_step_on_two_cpu_replicas_matches_one_device(self):
+        result = subprocess.run([sys.executable, "-c", MIRRORED_STEP], cwd=ROOT, stdout=subprocess.PIPE,
+                                stderr=subprocess.DEVNULL, check=True)
+        report = json.loads(result.stdout.decode().strip().splitlines()[-1])
+        self.assertEqual(report["replicas"], 2)
+        self.assertLess(report["difference"], 1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
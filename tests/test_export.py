@@ -0,0 +1,59 @@
+# tests/test_export.py
+
+import unittest
+import numpy as np
+import tensorflow as tf
+from models.samvara_model import build_samvara_model
+from utils.augmentation import build_augmentation
+from utils.export import fold_inference_layers
+
+
+def all_layers(model):
+    for layer in model.layers:
+        yield layer
+        if isinstance(layer, tf.keras.Model):
+            yield from all_layers(layer)
+
+
+def randomize_batch_norm(model, rng):
+    """Give every BatchNormalization non-trivial statistics, so folding them changes the Dense weights."""
+    for layer in all_layers(model):
+        if isinstance(layer, tf.keras.layers.BatchNormalization):
+            width = layer.moving_mean.shape[0]
+            layer.moving_mean.assign(rng.normal(size=width))
+            layer.moving_variance.assign(rng.uniform(0.5, 2.0, size=width))
+            layer.gamma.assign(rng.uniform(0.5, 1.5, size=width))
+            layer.beta.assign(rng.normal(size=width))
+
+
+class TestFoldInferenceLayers(unittest.TestCase):
+
+    def test_folded_samvara_model_matches_the_original(self):
+        rng = np.random.default_rng(0)
+        model = build_samvara_model(augmentation=build_augmentation(seed=0))
+        randomize_batch_norm(model, rng)
+        folded = fold_inference_layers(model)
+
+        removed = (tf.keras.layers.Dropout, tf.keras.layers.BatchNormalization, tf.keras.layers.RandomFlip,
+                   tf.keras.layers.RandomRotation, tf.keras.layers.RandomTranslation)
+        self.assertFalse([layer.name for layer in all_layers(folded) if isinstance(layer, removed)])
+        self.assertLess(folded.count_params(), model.count_params())
+
+        inputs = [rng.random((4, 32, 32, 3), dtype=np.float32), rng.integers(1, 100, (4, 12)).astype(np.int32),
+                  rng.random((4, 2), dtype=np.float32), rng.random((4, 2), dtype=np.float32)]
+        np.testing.assert_allclose(folded(inputs, training=False), model(inputs, training=False), atol=1e-5)
+
+    def test_batch_norm_without_a_dense_consumer_is_kept(self):
+        inputs = tf.keras.Input(shape=(3,))
+        hidden = tf.keras.layers.BatchNormalization()(tf.keras.layers.Dense(4)(inputs))
+        model = tf.keras.Model(inputs, tf.keras.layers.Activation("relu")(hidden))
+        randomize_batch_norm(model, np.random.default_rng(1))
+        folded = fold_inference_layers(model)
+
+        self.assertTrue(any(isinstance(layer, tf.keras.layers.BatchNormalization) for layer in folded.layers))
+        x = np.random.default_rng(2).random((5, 3), dtype=np.float32)
+        np.testing.assert_allclose(folded(x, training=False), model(x, training=False), atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+# tests/test_fast_training.py
+
+import unittest
+import tensorflow as tf
+from utils.fast_training import configure_fast_training, training_modes
+
+
+class TestFastTraining(unittest.TestCase):
+
+    def tearDown(self):
+        tf.keras.mixed_precision.set_global_policy("float32")
+
+    def test_combined_mode_only_uses_xla_on_gpu_hosts(self):
+        cpu_modes = training_modes(steps_per_execution=4, gpu=False)
+        self.assertEqual(cpu_modes["fast (no XLA)"], {"mixed_precision": True, "steps_per_execution": 4})
+        self.assertNotIn("fast (all)", cpu_modes)
+        self.assertTrue(training_modes(steps_per_execution=4, gpu=True)["fast (all)"]["jit_compile"])
+        # XLA alone is still measured
+        self.assertEqual(cpu_modes["jit_compile"], {"jit_compile": True})
+
+    def test_configure_returns_compile_arguments_and_sets_the_policy(self):
+        compile_kwargs = configure_fast_training(mixed_precision=True, steps_per_execution=4)
+        self.assertEqual(compile_kwargs, {"jit_compile": False, "steps_per_execution": 4})
+        self.assertTrue(tf.keras.mixed_precision.global_policy().name.startswith("mixed_"))
+
+    @unittest.skipIf(tf.config.list_physical_devices("GPU"), "XLA is only discouraged without a GPU")
+    def test_xla_without_gpu_logs_a_warning(self):
+        with self.assertLogs(level="WARNING") as logs:
+            configure_fast_training(jit_compile=True)
+        self.assertIn("XLA", logs.output[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
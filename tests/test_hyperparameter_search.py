@@ -0,0 +1,94 @@
+# tests/test_hyperparameter_search.py
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from concurrent.futures import Future
+from utils.hyperparameter_search import HyperparameterSearch, hyperband_brackets
+
+
+class SynchronousExecutor:
+    """
+    Runs trials in the calling thread with a fake trial function instead of run_trial: the score of a trial is its
+    crossover rate, so the ranking is known. Records (trial, epochs, initial_epoch) of every submitted trial.
+    """
+    def __init__(self, failing_trials=()):
+        self.failing_trials = set(failing_trials)
+        self.submitted = []
+
+    def submit(self, fn, trial_id, config, epochs, initial_epoch, trial_dir, seed):
+        self.submitted.append((trial_id, epochs, initial_epoch))
+        future = Future()
+        if trial_id in self.failing_trials:
+            future.set_exception(RuntimeError("out of memory"))
+        else:
+            future.set_result({"trial": trial_id, "epochs": epochs, "score": config["crossover_rate"],
+                               "status": "ok"})
+        return future
+
+
+class TestHyperparameterSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def make_search(self, failing_trials=(), **kwargs):
+        search = HyperparameterSearch(search_dir=self.directory, eta=3, max_epochs=9, min_epochs=1, seed=0, **kwargs)
+        search._executor = SynchronousExecutor(failing_trials)
+        return search
+
+    def test_hyperband_brackets(self):
+        self.assertEqual(hyperband_brackets(9, eta=3), [(9, 1), (5, 3), (3, 9)])
+        self.assertEqual(hyperband_brackets(27, eta=3), [(27, 1), (12, 3), (6, 9), (4, 27)])
+        self.assertEqual(hyperband_brackets(8, eta=2, min_epochs=2), [(4, 2), (3, 4), (3, 8)])
+
+    def test_successive_halving_budget(self):
+        search = self.make_search()
+        search.successive_halving(9)
+        submitted = search._executor.submitted
+
+        # 9 trials for 1 epoch, the best 3 resume up to 3 epochs, the best one resumes up to 9
+        self.assertEqual([(epochs, initial_epoch) for _, epochs, initial_epoch in submitted],
+                         [(1, 0)] * 9 + [(3, 1)] * 3 + [(9, 3)])
+        self.assertEqual(sum(epochs - initial_epoch for _, epochs, initial_epoch in submitted), 9 + 3 * 2 + 6)
+
+        ranking = sorted(search.trials, key=lambda trial: trial["config"]["crossover_rate"], reverse=True)
+        self.assertEqual([trial["status"] for trial in ranking], ["completed"] + ["pruned"] * 8)
+        self.assertEqual([trial["epochs"] for trial in ranking], [9, 3, 3] + [1] * 6)
+        self.assertEqual(search.best(), ranking[0])
+        with open(os.path.join(self.directory, "best_hyperparameters.json")) as f:
+            self.assertEqual(json.load(f), ranking[0]["config"])
+
+    def test_failed_trials_are_never_promoted(self):
+        search = self.make_search(failing_trials={0, 1, 2, 3, 4, 5, 6})
+        search.successive_halving(9)
+        self.assertEqual([trial["status"] for trial in search.trials[:7]], ["failed"] * 7)
+        # 2 trials are left after the first rung, max(1, 2 // 3) = 1 of them is promoted
+        self.assertEqual([(epochs, initial_epoch) for _, epochs, initial_epoch in search._executor.submitted[9:]],
+                         [(3, 1)])
+        survivor = max(search.trials[7:], key=lambda trial: trial["config"]["crossover_rate"])
+        self.assertEqual((survivor["status"], survivor["epochs"]), ("completed", 3))
+        self.assertEqual(search.best(), survivor)
+
+    def test_hyperband_runs_every_bracket(self):
+        search = self.make_search()
+        search.hyperband()
+        self.assertEqual(len(search.trials), 9 + 5 + 3)
+        first_rungs = {}
+        for trial_id, epochs, initial_epoch in search._executor.submitted:
+            if initial_epoch == 0:
+                first_rungs[trial_id] = epochs
+        self.assertEqual(sorted(first_rungs.values()), [1] * 9 + [3] * 5 + [9] * 3)
+        # The first two brackets end with one trial trained for max_epochs, the last trains all of its 3 for it
+        self.assertEqual(sum(trial["status"] == "completed" for trial in search.trials), 1 + 1 + 3)
+        self.assertTrue(all(trial["epochs"] == 9 for trial in search.trials if trial["status"] == "completed"))
+        self.assertEqual(search.best()["epochs"], 9)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+# tests/test_inference_server.py
+
+import time
+import threading
+import unittest
+import numpy as np
+from utils.inference_server import DynamicBatcher, InferenceHTTPServer, generate_load, make_handler, parse_request
+
+INPUT_SHAPES = [[None, 32, 32, 3], [None, None], [None, 2], [None, 2]]
+
+
+def make_request(num_samples, value=0.0, image_shape=(32, 32, 3)):
+    return [np.full((num_samples,) + image_shape, value, dtype=np.float32), np.ones((num_samples, 5)),
+            np.zeros((num_samples, 2)), np.zeros((num_samples, 2))]
+
+
+class RecordingPredict:
+    """Numpy stand-in for a model: one prediction per sample, the mean of its image. Records the batch sizes."""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.batch_sizes = []
+
+    def __call__(self, inputs):
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(inputs[0]))
+        # Merging fails on a malformed image, as the real model would
+        images = np.asarray(inputs[0]).reshape(len(inputs[0]), 32, 32, 3)
+        return images.mean(axis=(1, 2, 3))[:, np.newaxis]
+
+
+def run_concurrently(batcher, requests):
+    futures = [None] * len(requests)
+    threads = [threading.Thread(target=lambda i=i: futures.__setitem__(i, batcher.submit(requests[i])))
+               for i in range(len(requests))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return futures
+
+
+class TestDynamicBatcher(unittest.TestCase):
+
+    def test_outputs_are_split_back_per_request(self):
+        predict = RecordingPredict()
+        batcher = DynamicBatcher(predict, max_batch_size=64, max_wait_ms=200)
+        try:
+            requests = [make_request(num_samples, value=i) for i, num_samples in enumerate((1, 3, 2, 4))]
+            futures = run_concurrently(batcher, requests)
+            for i, (request, future) in enumerate(zip(requests, futures)):
+                result = future.result(timeout=10)
+                self.assertEqual(result.shape, (len(request[0]), 1))
+                np.testing.assert_allclose(result, i)
+        finally:
+            batcher.close()
+        self.assertLess(len(predict.batch_sizes), 4)
+
+    def test_batches_never_exceed_max_batch_size(self):
+        predict = RecordingPredict(delay=0.05)
+        batcher = DynamicBatcher(predict, max_batch_size=8, max_wait_ms=200)
+        try:
+            futures = run_concurrently(batcher, [make_request(3, value=i) for i in range(10)])
+            for i, future in enumerate(futures):
+                np.testing.assert_allclose(future.result(timeout=10), i)
+        finally:
+            batcher.close()
+        self.assertLessEqual(max(predict.batch_sizes), 8)
+        self.assertEqual(sum(predict.batch_sizes), 30)
+
+    def test_oversized_request_runs_alone(self):
+        predict = RecordingPredict()
+        batcher = DynamicBatcher(predict, max_batch_size=4, max_wait_ms=1)
+        try:
+            self.assertEqual(batcher.predict(make_request(10), timeout=10).shape, (10, 1))
+        finally:
+            batcher.close()
+        self.assertEqual(predict.batch_sizes, [10])
+
+    def test_batch_is_run_after_the_wait_time(self):
+        batcher = DynamicBatcher(RecordingPredict(), max_batch_size=64, max_wait_ms=50)
+        try:
+            start_time = time.perf_counter()
+            batcher.predict(make_request(1), timeout=10)
+            elapsed = time.perf_counter() - start_time
+        finally:
+            batcher.close()
+        self.assertGreaterEqual(elapsed, 0.04)
+        self.assertLess(elapsed, 2.0)
+
+    def test_malformed_request_fails_alone(self):
+        batcher = DynamicBatcher(RecordingPredict(), max_batch_size=64, max_wait_ms=200)
+        try:
+            requests = [make_request(2, value=1), make_request(1, image_shape=(28, 28, 1)), make_request(3, value=2)]
+            futures = run_concurrently(batcher, requests)
+            np.testing.assert_allclose(futures[0].result(timeout=10), 1)
+            np.testing.assert_allclose(futures[2].result(timeout=10), 2)
+            with self.assertRaises(ValueError):
+                futures[1].result(timeout=10)
+            self.assertEqual(batcher.metrics()["errors"], 1)
+        finally:
+            batcher.close()
+
+
+class TextSumPredict:
+    """Numpy stand-in whose prediction is the sum of the text tokens of each sample. Records the text widths."""
+    input_shapes = INPUT_SHAPES
+
+    def __init__(self):
+        self.text_widths = []
+
+    def __call__(self, inputs):
+        self.text_widths.append(inputs[1].shape[1])
+        return inputs[1].sum(axis=1, keepdims=True)
+
+
+class TestServerUnderLoad(unittest.TestCase):
+
+    def test_requests_with_different_text_lengths_are_padded_and_merged(self):
+        predict = TextSumPredict()
+        batcher = DynamicBatcher(predict, max_batch_size=64, max_wait_ms=200)
+        try:
+            requests = [make_request(2), make_request(3), make_request(1)]
+            for request, length in zip(requests, (3, 7, 5)):
+                request[1] = np.arange(1, length + 1, dtype=np.float32)[np.newaxis].repeat(len(request[0]), axis=0)
+            futures = run_concurrently(batcher, requests)
+            for request, future in zip(requests, futures):
+                np.testing.assert_allclose(future.result(timeout=10), request[1].sum(axis=1, keepdims=True))
+        finally:
+            batcher.close()
+        self.assertEqual(predict.text_widths, [7])
+
+    def test_load_generator_against_a_running_server(self):
+        predict = TextSumPredict()
+        batcher = DynamicBatcher(predict, max_batch_size=64, max_wait_ms=50)
+        server = InferenceHTTPServer(("127.0.0.1", 0), make_handler(batcher))
+        server_thread = threading.Thread(target=server.serve_forever)
+        server_thread.start()
+        try:
+            report = generate_load(f"http://127.0.0.1:{server.server_address[1]}", num_requests=40, concurrency=8,
+                                   samples_per_request=2)
+            metrics = batcher.metrics()
+        finally:
+            server.shutdown()
+            server_thread.join()
+            server.server_close()
+            batcher.close()
+
+        self.assertEqual((report["requests"], report["concurrency"]), (40, 8))
+        self.assertGreater(report["samples_per_sec"], 0)
+        self.assertLessEqual(report["p50_latency_ms"], report["p99_latency_ms"])
+        self.assertEqual((metrics["requests"], metrics["samples"], metrics["errors"]), (40, 80, 0))
+        # Concurrent clients are merged into batches of more than one request
+        self.assertLess(metrics["batches"], 40)
+        # The generated text is right-padded to 100 tokens
+        self.assertEqual(set(predict.text_widths), {100})
+
+
+class TestParseRequest(unittest.TestCase):
+
+    def payload(self, image_shape=(32, 32, 3), num_samples=None):
+        batch = () if num_samples is None else (num_samples,)
+        return {"image": np.zeros(batch + image_shape).tolist(), "text": np.ones(batch + (5,)).tolist(),
+                "quantum_real": np.zeros(batch + (2,)).tolist(), "quantum_imaginary": np.zeros(batch + (2,)).tolist()}
+
+    def test_single_sample_gets_a_batch_dimension(self):
+        inputs = parse_request(self.payload(), INPUT_SHAPES)
+        self.assertEqual([x.shape for x in inputs], [(1, 32, 32, 3), (1, 5), (1, 2), (1, 2)])
+
+    def test_wrong_image_shape_is_rejected(self):
+        with self.assertRaisesRegex(ValueError, "image"):
+            parse_request(self.payload(image_shape=(28, 28, 1), num_samples=2), INPUT_SHAPES)
+
+    def test_mismatched_batch_sizes_are_rejected(self):
+        payload = self.payload(num_samples=2)
+        payload["quantum_real"] = np.zeros((3, 2)).tolist()
+        with self.assertRaisesRegex(ValueError, "batch size"):
+            parse_request(payload, INPUT_SHAPES)
+
+    def test_missing_input_is_rejected(self):
+        payload = self.payload()
+        del payload["text"]
+        with self.assertRaisesRegex(ValueError, "text"):
+            parse_request(payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+# tests/test_main.py
+
+import os
+import sys
+import json
+import unittest
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def startup_report(*argv):
+    result = subprocess.run([sys.executable, "main.py", "--startup-report"] + list(argv), cwd=ROOT,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, check=True)
+    return json.loads(result.stdout.decode().strip().splitlines()[-1])
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_lightweight_commands_do_not_import_tensorflow(self):
+        for command in ("evolve", "debug"):
+            report = startup_report(command)
+            self.assertEqual(report["command"], command)
+            self.assertFalse(report["tensorflow_imported"], command)
+
+    def test_training_arguments_without_a_command_train(self):
+        report = startup_report("--material-mode", "freeze")
+        self.assertEqual(report["command"], "train")
+        self.assertTrue(report["tensorflow_imported"])
+
+
+if __name__ == "__main__":
+    unittest.main()
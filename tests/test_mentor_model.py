@@ -0,0 +1,79 @@
+# tests/test_mentor_model.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import tensorflow as tf
+from models.mentor_model import MentorModel, MentorSchedule
+
+
+class RisingRewardMentor(MentorModel):
+    """Mentor whose reward rises every epoch, so it scales the learning rate up at every epoch end."""
+    def calculate_reward(self, val_loss, accuracy):
+        return float(self.state.num_rewards.numpy())
+
+
+class InterruptAtEpoch(tf.keras.callbacks.Callback):
+    def __init__(self, epoch):
+        super(InterruptAtEpoch, self).__init__()
+        self.epoch = epoch
+
+    def on_epoch_end(self, epoch, logs=None):
+        if epoch == self.epoch:
+            raise RuntimeError("Interrupted")
+
+
+def make_dataset():
+    rng = np.random.default_rng(0)
+    features = rng.random((32, 4), dtype=np.float32)
+    labels = tf.keras.utils.to_categorical(rng.integers(0, 2, 32), 2)
+    return tf.data.Dataset.from_tensor_slices((features, labels)).batch(8)
+
+
+class TestMentorResume(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def fit(self, epochs, extra_callbacks=(), use_schedule=True):
+        schedule = MentorSchedule(0.01) if use_schedule else None
+        model = tf.keras.Sequential([tf.keras.layers.Dense(2, activation="softmax", input_shape=(4,))])
+        model.compile(optimizer=tf.keras.optimizers.SGD(learning_rate=schedule or 0.01),
+                      loss="categorical_crossentropy", metrics=["accuracy"])
+        mentor = RisingRewardMentor(schedule=schedule, increase_factor=1.5, min_delta=0.0, max_scale=100.0)
+        callbacks = [mentor, tf.keras.callbacks.BackupAndRestore(backup_dir=self.directory)] + list(extra_callbacks)
+        dataset = make_dataset()
+        model.fit(dataset, validation_data=dataset, epochs=epochs, callbacks=callbacks, verbose=0)
+        return model, mentor
+
+    def check_resume(self, use_schedule):
+        with self.assertRaises(RuntimeError):
+            self.fit(4, [InterruptAtEpoch(1)], use_schedule=use_schedule)
+        model, mentor = self.fit(4, use_schedule=use_schedule)
+        # Two epochs before the interruption and two after it: the scale keeps growing instead of restarting at 1
+        self.assertAlmostEqual(mentor.current_scale, 1.5 ** 4, places=4)
+        self.assertEqual(int(mentor.state.num_rewards.numpy()), 4)
+        if not use_schedule:
+            self.assertAlmostEqual(float(model.optimizer.learning_rate.numpy()), 0.01 * 1.5 ** 4, places=6)
+
+    def test_resume_restores_the_schedule_scale_and_reward_state(self):
+        self.check_resume(use_schedule=True)
+
+    def test_resume_restores_a_plain_learning_rate_scale(self):
+        self.check_resume(use_schedule=False)
+
+    def test_keras_file_of_a_model_with_a_mentor_still_loads(self):
+        model, _ = self.fit(1)
+        path = os.path.join(self.directory, "model.keras")
+        model.save(path)
+        restored = tf.keras.models.load_model(path)
+        np.testing.assert_allclose(restored.get_weights()[0], model.get_weights()[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
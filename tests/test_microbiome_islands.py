@@ -0,0 +1,102 @@
+# tests/test_microbiome_islands.py
+
+import os
+import copy
+import socket
+import shutil
+import tempfile
+import threading
+import unittest
+import numpy as np
+from models.microbiome_islands import DirectoryTransport, SocketTransport, run_island, run_island_model
+
+EVOLUTION_PARAMS = {"generations": 4, "fitness_threshold": 0.9}
+
+
+def make_population(num_samples, first_label=0, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((num_samples, 4, 4, 3), dtype=np.float32),
+            rng.integers(1, 100, (num_samples, 10)).astype(np.int32),
+            rng.random((num_samples, 2)), rng.random((num_samples, 2)),
+            np.arange(first_label, first_label + num_samples))
+
+
+def run_islands_in_threads(transport, populations, migration_size=5):
+    """Run one island per thread, each with its own copy of the transport like the island processes."""
+    results = [None] * len(populations)
+
+    def run(i):
+        results[i] = run_island(i, len(populations), *populations[i], copy.copy(transport), migration_interval=2,
+                                migration_size=migration_size, seed=i, evolution_params=EVOLUTION_PARAMS)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(len(populations))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class TestIslandModel(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_migrants_arrive_from_the_previous_island(self):
+        # Labels tell the islands apart: island 0 has labels below 1000, island 1 from 1000
+        populations = [make_population(50, 0, seed=0), make_population(50, 1000, seed=1)]
+        results = run_islands_in_threads(DirectoryTransport(self.directory, poll_interval=0.01), populations)
+        for island, ((_, _, _, _, labels), stats) in enumerate(results):
+            self.assertEqual(stats["island"], island)
+            foreign = labels >= 1000 if island == 0 else labels < 1000
+            self.assertGreater(np.count_nonzero(foreign), 0)
+        # Every message was received and removed
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_seeded_directory_runs_are_identical(self):
+        population = make_population(120)
+        runs = []
+        for run in range(2):
+            transport = DirectoryTransport(os.path.join(self.directory, str(run)), poll_interval=0.01)
+            runs.append(run_island_model(*population, num_islands=2, transport=transport, migration_size=5,
+                                         seed=3, evolution_params=EVOLUTION_PARAMS))
+        for first_array, second_array in zip(*runs):
+            np.testing.assert_array_equal(first_array, second_array)
+
+    def test_socket_runs_back_to_back_on_the_same_ports(self):
+        transport = SocketTransport.local(2)
+        populations = [make_population(50, 0, seed=0), make_population(50, 1000, seed=1)]
+        for _ in range(2):
+            results = run_islands_in_threads(transport, populations)
+            self.assertEqual(len(results), 2)
+            self.assertTrue(all(result is not None for result in results))
+        # The ports are released once the islands are done
+        for address in transport.addresses:
+            with socket.socket() as s:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                s.bind(address)
+                s.listen()
+
+    def test_socket_run_island_model_with_the_default_transport(self):
+        population = make_population(100)
+        for _ in range(2):
+            evolved = run_island_model(*population, num_islands=2, migration_size=5, seed=0,
+                                       evolution_params=EVOLUTION_PARAMS)
+            self.assertEqual(len(evolved), 5)
+
+    def test_local_socket_transports_get_different_ports_and_keys(self):
+        first, second = SocketTransport.local(2), SocketTransport.local(2)
+        self.assertNotEqual(first.authkey, second.authkey)
+        self.assertEqual(len(first.authkey), 32)
+        self.assertEqual(len(set(first.addresses)), 2)
+        with self.assertRaises(TypeError):
+            SocketTransport([("localhost", 0)])
+        with self.assertRaises(ValueError):
+            SocketTransport([("localhost", 0)], authkey=b"")
+
+
+if __name__ == "__main__":
+    unittest.main()
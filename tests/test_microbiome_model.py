@@ -0,0 +1,199 @@
+# tests/test_microbiome_model.py
+
+import pickle
+import unittest
+import numpy as np
+from models.microbiome_model import (run_evolutionary_algorithm, evolve_population, FitnessCache, ModelFitness,
+                                     SlotPool, make_fitness_fn, quantum_fitness)
+from models.microbiome_parallel import run_parallel_evolution
+from models.microbiome_stream import EvolutionStream
+
+
+def make_population(num_samples=400, seed=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((num_samples, 8, 8, 3), dtype=np.float32),
+            rng.integers(1, 100, (num_samples, 20)).astype(np.int32),
+            rng.random((num_samples, 2)), rng.random((num_samples, 2)),
+            rng.integers(0, 10, num_samples))
+
+
+class TestEvolutionReproducibility(unittest.TestCase):
+
+    def test_serial_runs_with_the_same_seed_are_identical(self):
+        population = make_population()
+        params = {"fitness_threshold": 1.2, "selection": "threshold"}
+        # The global NumPy state differs between the runs, only `seed` may matter
+        np.random.seed(1)
+        first = run_evolutionary_algorithm(*population, seed=0, evolution_params=params)
+        np.random.seed(2)
+        second = run_evolutionary_algorithm(*population, seed=0, evolution_params=params)
+        self.assertEqual(len(first[0]), len(second[0]))
+        for first_array, second_array in zip(first, second):
+            np.testing.assert_array_equal(first_array, second_array)
+
+    def test_parallel_runs_with_the_same_seed_are_identical(self):
+        population = make_population()
+        params = {"fitness_threshold": 1.2, "selection": "threshold"}
+        np.random.seed(1)
+        first = run_evolutionary_algorithm(*population, seed=0, n_jobs=2, evolution_params=params)
+        np.random.seed(2)
+        second = run_evolutionary_algorithm(*population, seed=0, n_jobs=2, evolution_params=params)
+        for first_array, second_array in zip(first, second):
+            np.testing.assert_array_equal(first_array, second_array)
+
+    def test_parallel_result_does_not_depend_on_the_number_of_workers(self):
+        population = make_population()
+        params = {"fitness_threshold": 1.2}
+        one_worker = run_parallel_evolution(*population, n_jobs=1, seed=0, evolution_params=params)
+        two_workers = run_parallel_evolution(*population, n_jobs=2, seed=0, evolution_params=params)
+        for first_array, second_array in zip(one_worker, two_workers):
+            np.testing.assert_array_equal(first_array, second_array)
+
+
+class CountingFitness:
+    """Quantum fitness that records the rows it scores."""
+    inputs = ("quantum_real", "quantum_imaginary")
+
+    def __init__(self):
+        self.scored_rows = []
+
+    def __call__(self, arrays, rows):
+        self.scored_rows.append(np.array(rows))
+        return quantum_fitness(arrays, rows)
+
+
+def population_arrays(population):
+    return dict(zip(("image", "text", "quantum_real", "quantum_imaginary"), population[:4]))
+
+
+class TestFitnessCache(unittest.TestCase):
+
+    def test_only_changed_rows_are_scored_again(self):
+        arrays = population_arrays(make_population(10))
+        fitness_fn = CountingFitness()
+        cache = FitnessCache(10, fitness_fn)
+        rows = np.arange(10)
+        first = cache.scores(arrays, rows)
+        np.testing.assert_array_equal(first, quantum_fitness(arrays, rows))
+
+        np.testing.assert_array_equal(cache.scores(arrays, rows), first)
+        self.assertEqual(cache.evaluations, 10)
+
+        arrays["quantum_real"][[2, 7]] += 1.0
+        cache.mark_changed(np.array([2, 7]), "quantum_real")
+        np.testing.assert_array_equal(cache.scores(arrays, rows), quantum_fitness(arrays, rows))
+        np.testing.assert_array_equal(fitness_fn.scored_rows[-1], [2, 7])
+        self.assertEqual(cache.evaluations, 12)
+
+    def test_changes_to_unread_inputs_keep_the_cached_scores(self):
+        cache = FitnessCache(10, CountingFitness())
+        cache.mark_changed(np.arange(5), "image")
+        cache.mark_changed(np.arange(5), "text")
+        np.testing.assert_array_equal(cache.versions, 0)
+        cache.mark_changed(np.array([1]))
+        self.assertEqual(cache.versions[1], 1)
+
+    def test_fitness_function_reading_every_input_sees_image_changes(self):
+        cache = FitnessCache(10, lambda arrays, rows: np.zeros(len(rows)))
+        cache.mark_changed(np.array([3]), "image")
+        self.assertEqual(cache.versions[3], 1)
+
+    def test_evolution_scores_only_the_first_generation_without_quantum_changes(self):
+        population = make_population(100)
+        fitness_fn = CountingFitness()
+        fitness_cache = FitnessCache(100, fitness_fn)
+        evolve_population(*population[:4], np.zeros(100), np.arange(100), np.random.default_rng(0),
+                          fitness_threshold=-1.0, generations=5, fitness_cache=fitness_cache,
+                          selection="threshold")
+        # Mutation and crossover only change the image and text data, which the quantum fitness does not read
+        self.assertEqual(len(fitness_fn.scored_rows), 1)
+        self.assertEqual(fitness_cache.evaluations, 100)
+
+
+class TestFitnessFunctions(unittest.TestCase):
+
+    def test_make_fitness_fn(self):
+        self.assertIs(make_fitness_fn("quantum"), quantum_fitness)
+        model_fitness = make_fitness_fn("model", batch_size=16, seed=3)
+        self.assertIsInstance(model_fitness, ModelFitness)
+        self.assertEqual((model_fitness.batch_size, model_fitness.seed), (16, 3))
+        with self.assertRaises(KeyError):
+            make_fitness_fn("unknown")
+
+    def test_model_fitness_pickles_without_its_traced_function(self):
+        model_fitness = ModelFitness(seed=1)
+        model_fitness._predict = lambda *inputs: None
+        restored = pickle.loads(pickle.dumps(model_fitness))
+        self.assertIsNone(restored._predict)
+        self.assertEqual(restored.seed, 1)
+
+
+class TestSlotPool(unittest.TestCase):
+
+    def test_refill_copies_parents_into_free_slots_only(self):
+        data = np.arange(8) * 10
+        labels = np.arange(8)
+        fitness_scores = np.linspace(0, 1, 8)
+        cache = FitnessCache(8)
+        pool = SlotPool([data, labels, None], fitness_scores, np.arange(8))
+        pool.cull(pool.members(), 0.5)
+        self.assertEqual(pool.num_free(), 4)
+
+        slots = pool.refill(np.array([7, 6, 7, 6, 5, 4]), cache)
+        np.testing.assert_array_equal(slots, [0, 1, 2, 3])
+        np.testing.assert_array_equal(data[:4], [70, 60, 70, 60])
+        np.testing.assert_array_equal(labels[:4], [7, 6, 7, 6])
+        np.testing.assert_array_equal(fitness_scores[:4], fitness_scores[[7, 6, 7, 6]])
+        np.testing.assert_array_equal(cache.versions, [1, 1, 1, 1, 0, 0, 0, 0])
+        self.assertEqual(pool.num_free(), 0)
+
+    def evolve(self, selection, population, seed=0):
+        image_data, text_data, quantum_real, quantum_imaginary, labels = (array.copy() for array in population)
+        fitness_scores = np.random.default_rng(seed).random(len(labels))
+        return evolve_population(image_data, text_data, quantum_real, quantum_imaginary, fitness_scores,
+                                 np.arange(len(labels)), np.random.default_rng(seed), fitness_threshold=1.2,
+                                 generations=3, selection=selection, labels=labels)
+
+    def test_selection_keeps_the_population_at_capacity(self):
+        population = make_population(200)
+        for selection in ("tournament", "rank"):
+            self.assertEqual(len(self.evolve(selection, population)), 200, selection)
+        # Without parent selection the culled slots stay empty
+        self.assertLess(len(self.evolve("threshold", population)), 200)
+
+    def test_unknown_selection_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.evolve("roulette", make_population(10))
+
+    def test_working_copies_leave_the_inputs_untouched(self):
+        population = make_population(200)
+        originals = [array.copy() for array in population]
+        run_evolutionary_algorithm(*population, seed=0, evolution_params={"fitness_threshold": 1.2})
+        for array, original in zip(population, originals):
+            np.testing.assert_array_equal(array, original)
+
+
+class TestEvolutionStream(unittest.TestCase):
+
+    def stream_run(self, global_seed, num_batches=5):
+        np.random.seed(global_seed)
+        stream = EvolutionStream(*make_population(200), batch_size=32, queue_size=1000, seed=0,
+                                 evolution_params={"fitness_threshold": 1.2, "generations": 3}).start()
+        generator = stream.generator()
+        batches = [next(generator) for _ in range(num_batches)]
+        return batches, stream.close()
+
+    def test_seeded_streams_are_identical(self):
+        first_batches, first = self.stream_run(1)
+        second_batches, second = self.stream_run(2)
+        for (first_inputs, first_labels), (second_inputs, second_labels) in zip(first_batches, second_batches):
+            np.testing.assert_array_equal(first_labels, second_labels)
+            for first_input, second_input in zip(first_inputs, second_inputs):
+                np.testing.assert_array_equal(first_input, second_input)
+        self.assertEqual(len(first), 200)
+        for first_array, second_array in zip(first.take(), second.take()):
+            np.testing.assert_array_equal(first_array, second_array)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+# tests/test_model_cache.py
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+import multiprocessing
+import numpy as np
+import tensorflow as tf
+from utils.model_cache import InferenceCache, INDEX_FILENAME
+
+
+def build_model(seed=0):
+    tf.keras.utils.set_random_seed(seed)
+    inputs = tf.keras.Input(shape=(3,), name="features")
+    return tf.keras.Model(inputs, tf.keras.layers.Dense(2)(inputs))
+
+
+def add_index_entries(directory, prefix, count):
+    # Read-modify-write of the index as put and get do it, from its own process
+    cache = InferenceCache(directory)
+    for i in range(count):
+        with cache._locked():
+            index = cache._read_index()
+            index[f"{prefix}{i}"] = {"bytes": 0, "last_used": 0.0}
+            cache._write_index(index)
+
+
+class TestInferenceCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_concurrent_index_updates_are_not_lost(self):
+        processes = [multiprocessing.get_context("fork").Process(target=add_index_entries,
+                                                                  args=(self.directory, f"p{p}_", 50))
+                     for p in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(len(InferenceCache(self.directory)._read_index()), 200)
+
+    def test_concurrent_puts_keep_every_entry(self):
+        cache = InferenceCache(self.directory)
+        models = [build_model(seed) for seed in range(3)]
+        threads = [threading.Thread(target=cache.put, args=(f"key{i}", model)) for i, model in enumerate(models)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(entry["key"] for entry in cache.entries()), ["key0", "key1", "key2"])
+
+    def test_concurrent_puts_of_the_same_key_leave_one_complete_entry(self):
+        cache = InferenceCache(self.directory)
+        model = build_model()
+        errors = []
+
+        def put():
+            try:
+                cache.put("key", model)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=put) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual([entry["key"] for entry in cache.entries()], ["key"])
+        self.assertEqual(sorted(os.listdir(self.directory)), sorted([".lock", INDEX_FILENAME, "key"]))
+        x = np.random.default_rng(0).random((2, 3), dtype=np.float32)
+        np.testing.assert_allclose(cache.get("key")([x]), model(x).numpy(), atol=1e-6)
+
+    def test_restored_function_matches_the_model(self):
+        model = build_model()
+        cache = InferenceCache(self.directory)
+        cache.put("key", model)
+        predict = InferenceCache(self.directory).get("key")
+        x = np.random.default_rng(0).random((4, 3), dtype=np.float32)
+        np.testing.assert_allclose(predict([x]), model(x).numpy(), atol=1e-6)
+        self.assertEqual(predict.input_shapes, [[None, 3]])
+        self.assertIsNone(cache.get("missing"))
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = InferenceCache(self.directory)
+        cache.put("first", build_model())
+        entry_bytes = cache.entries()[0]["bytes"]
+        cache.max_bytes = int(entry_bytes * 2.5)
+        cache.put("second", build_model())
+        cache.get("first")
+        cache.put("third", build_model())
+        self.assertEqual(sorted(entry["key"] for entry in cache.entries()), ["first", "third"])
+        self.assertFalse(os.path.exists(os.path.join(self.directory, "second")))
+
+    def test_clear_removes_entries_and_index(self):
+        cache = InferenceCache(self.directory)
+        cache.put("key", build_model())
+        cache.clear()
+        self.assertEqual(cache.entries(), [])
+        self.assertFalse(os.path.exists(os.path.join(self.directory, INDEX_FILENAME)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,68 @@
+# tests/test_profiling.py
+
+import sys
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import tensorflow as tf
+from utils.profiling import FunctionTimer, profile_layers, summarize_trace
+
+
+def square(x):
+    return x * x
+
+
+def sum_of_squares(values):
+    # Calls square through the module globals, as evolve_population calls mutate_microbiomes
+    return sum(square(value) for value in values)
+
+
+class TestFunctionTimer(unittest.TestCase):
+
+    def test_instrumented_functions_are_timed_and_restored(self):
+        this_module = sys.modules[__name__]
+        timer = FunctionTimer()
+        timer.instrument(this_module, ["square", "sum_of_squares"])
+        try:
+            self.assertEqual(this_module.sum_of_squares([1, 2, 3]), 14)
+        finally:
+            timer.restore()
+        self.assertIs(this_module.square, square)
+
+        rows = timer.report()
+        calls = {row["function"]: row["calls"] for row in rows}
+        self.assertEqual(calls, {f"{__name__}.square": 3, f"{__name__}.sum_of_squares": 1})
+        # Sorted by total time, and the caller's time includes its callees
+        self.assertEqual(rows[0]["function"], f"{__name__}.sum_of_squares")
+
+
+class TestProfileLayers(unittest.TestCase):
+
+    def test_every_layer_of_nested_models_is_profiled(self):
+        inner_inputs = tf.keras.Input(shape=(4,))
+        inner = tf.keras.Model(inner_inputs, tf.keras.layers.Dense(8, name="hidden")(inner_inputs), name="inner")
+        inputs = tf.keras.Input(shape=(4,))
+        model = tf.keras.Model(inputs, tf.keras.layers.Dense(2, name="head")(inner(inputs)))
+
+        rows = profile_layers(model, np.random.default_rng(0).random((16, 4), dtype=np.float32), repeats=2)
+        self.assertEqual([row["layer"] for row in rows], ["inner", "inner/hidden", "head"])
+        self.assertEqual([row["params"] for row in rows], [40, 40, 18])
+        for row in rows:
+            self.assertGreater(row["forward_ms"], 0)
+            self.assertGreaterEqual(row["backward_ms"], 0)
+        # The layer calls are restored after profiling
+        self.assertNotIn("call", vars(model.get_layer("head")))
+
+    def test_summary_of_a_directory_without_traces_is_empty(self):
+        directory = tempfile.mkdtemp()
+        try:
+            summary = summarize_trace(directory)
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+        self.assertEqual((summary["trace_files"], summary["host_ms"], summary["device_ms"], summary["top_ops"]),
+                         ([], 0.0, 0.0, []))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+# tests/test_quantum_circuit_layer.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import tensorflow as tf
+from models.quantum_circuit_layer import QuantumCircuitLayer, build_circuit_immaterial_model
+
+
+def make_inputs(batch_size=8, seed=0):
+    rng = np.random.default_rng(seed)
+    return [rng.random((batch_size, 2), dtype=np.float32), rng.random((batch_size, 2), dtype=np.float32)]
+
+
+class TestQuantumCircuitLayer(unittest.TestCase):
+
+    def test_cache_is_off_by_default(self):
+        layer = QuantumCircuitLayer()
+        layer(make_inputs(), training=False)
+        self.assertEqual(layer.cache_size, 0)
+        self.assertEqual((layer.cache_hits, layer.cache_misses), (0, 0))
+
+    def test_cached_outputs_match_the_uncached_outputs(self):
+        inputs = make_inputs()
+        uncached = QuantumCircuitLayer(cache_size=0)
+        cached = QuantumCircuitLayer(cache_size=100, cache_decimals=4)
+        uncached(inputs)
+        cached(inputs)
+        cached.set_weights(uncached.get_weights())
+        cached.clear_cache()
+
+        expected = uncached(inputs, training=False).numpy()
+        # Inputs and weights are rounded to cache_decimals, which moves each angle by at most 5e-5
+        tolerance = 10 ** -cached.cache_decimals
+        np.testing.assert_allclose(cached(inputs, training=False), expected, atol=tolerance)
+        self.assertEqual((cached.cache_hits, cached.cache_misses), (0, 8))
+        np.testing.assert_allclose(cached(inputs, training=False), expected, atol=tolerance)
+        self.assertEqual((cached.cache_hits, cached.cache_misses), (8, 8))
+
+        # New weights miss the cache
+        cached.circuit_weights.assign_add(tf.ones_like(cached.circuit_weights))
+        uncached.set_weights(cached.get_weights())
+        np.testing.assert_allclose(cached(inputs, training=False), uncached(inputs, training=False), atol=tolerance)
+        self.assertEqual(cached.cache_misses, 16)
+
+    def test_training_step_logs_no_cast_warnings(self):
+        layer = QuantumCircuitLayer()
+        inputs = make_inputs()
+        with self.assertNoLogs("tensorflow", "WARNING"):
+            with tf.GradientTape() as tape:
+                loss = tf.reduce_sum(layer(inputs, training=True))
+            gradients = tape.gradient(loss, layer.trainable_variables)
+        self.assertEqual(gradients[0].dtype, tf.float32)
+
+    def test_keras_file_round_trip(self):
+        model = build_circuit_immaterial_model()
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "model.keras")
+            model.save(path)
+            restored = tf.keras.models.load_model(path, custom_objects={"QuantumCircuitLayer": QuantumCircuitLayer})
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        layer = restored.layers[-1]
+        self.assertIsInstance(layer, QuantumCircuitLayer)
+        self.assertEqual((layer.num_layers, layer.cache_size, layer.cache_decimals), (2, 0, 4))
+        inputs = make_inputs()
+        np.testing.assert_allclose(restored(inputs, training=False), model(inputs, training=False), atol=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
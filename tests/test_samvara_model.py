@@ -0,0 +1,68 @@
+# tests/test_samvara_model.py
+
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import tensorflow as tf
+from models.immaterial_layers import CustomQuantumLayer
+from models.samvara_model import SamvaraModel, build_samvara_model, configure_material_layers
+from utils.parser import parse_arguments
+
+
+class TestSamvaraModelSerialization(unittest.TestCase):
+
+    def test_keras_file_round_trip_keeps_graph_weights_and_multiplier(self):
+        model = build_samvara_model(material_lr_multiplier=0.5)
+        config = model.get_config()
+        self.assertIn("layers", config)
+        self.assertEqual(config["material_lr_multiplier"], 0.5)
+
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "model.keras")
+            model.save(path)
+            restored = tf.keras.models.load_model(path, custom_objects={"CustomQuantumLayer": CustomQuantumLayer})
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        self.assertIsInstance(restored, SamvaraModel)
+        self.assertEqual(restored.material_lr_multiplier, 0.5)
+        rng = np.random.default_rng(0)
+        inputs = [rng.random((2, 32, 32, 3), dtype=np.float32), rng.integers(1, 100, (2, 7)).astype(np.int32),
+                  rng.random((2, 2), dtype=np.float32), rng.random((2, 2), dtype=np.float32)]
+        np.testing.assert_allclose(restored(inputs, training=False), model(inputs, training=False), atol=1e-6)
+
+
+class TestConfigureMaterialLayers(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = build_samvara_model()
+
+    def trainable_weighted_layers(self, unfreeze_layers):
+        configure_material_layers(self.model, mode="partial", unfreeze_layers=unfreeze_layers)
+        weighted_layers = [layer for layer in self.model.get_layer('material_model').layers if layer.weights]
+        return [layer.trainable for layer in weighted_layers]
+
+    def test_partial_unfreezes_the_last_layers(self):
+        trainable = self.trainable_weighted_layers(2)
+        self.assertEqual(trainable, [False] * (len(trainable) - 2) + [True, True])
+        self.assertFalse(any(self.trainable_weighted_layers(0)))
+
+    def test_unfreezing_more_layers_than_there_are_unfreezes_all(self):
+        num_layers = len(self.trainable_weighted_layers(0))
+        for unfreeze_layers in (num_layers, num_layers + 1, num_layers + 3):
+            self.assertTrue(all(self.trainable_weighted_layers(unfreeze_layers)), unfreeze_layers)
+
+    def test_negative_unfreeze_layers_are_rejected(self):
+        with self.assertRaises(ValueError):
+            configure_material_layers(self.model, mode="partial", unfreeze_layers=-1)
+        with self.assertRaises(SystemExit):
+            parse_arguments(["--unfreeze-layers", "-1"])
+        self.assertEqual(parse_arguments(["--unfreeze-layers", "12"]).unfreeze_layers, 12)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+# tests/test_telemetry.py
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+import subprocess
+from utils.telemetry import Telemetry
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestTelemetry(unittest.TestCase):
+
+    def test_gpu_monitor_and_telemetry_do_not_import_tensorflow(self):
+        code = "import sys, utils.gpu_monitor, utils.telemetry; print('tensorflow' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, stdout=subprocess.PIPE, check=True)
+        self.assertEqual(result.stdout.decode().strip(), "False")
+
+    def test_records_are_exported_once_and_served_by_label(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "telemetry.jsonl")
+            telemetry = Telemetry(gpu=False, output_path=path)
+            telemetry.record("step", phase="material", step_ms=12.5)
+            telemetry.record("step", phase="full", step_ms=20.0)
+            self.assertEqual(telemetry.export_jsonl(path), 2)
+            self.assertEqual(telemetry.export_jsonl(path), 0)
+            telemetry.record("step", phase="full", step_ms=30.0)
+            self.assertEqual(telemetry.export_jsonl(path), 1)
+            with open(path) as f:
+                self.assertEqual([json.loads(line)["step_ms"] for line in f], [12.5, 20.0, 30.0])
+        finally:
+            shutil.rmtree(directory, ignore_errors=True)
+
+        text = telemetry.prometheus_text()
+        self.assertIn('samvara_step_step_ms{phase="material"} 12.5', text)
+        self.assertIn('samvara_step_step_ms{phase="full"} 30.0', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,252 @@
+# utils/benchmark.py
+
+import os
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import resource
+import subprocess
+import numpy as np
+import tensorflow as tf
+from utils.helpers import random_token_sequences
+
+# Batch sizes for the inference measurements
+INFERENCE_BATCH_SIZES = (1, 32, 256)
+# Population sizes for the evolutionary phase
+POPULATION_SIZES = (1000, 10000, 50000)
+# Batch sizes and widths (input width = units) for the CustomQuantumLayer micro-benchmark
+QUANTUM_BATCH_SIZES = (1024, 16384, 131072)
+QUANTUM_UNITS = (2, 64)
+# Batch sizes for the variational quantum circuit layer
+CIRCUIT_BATCH_SIZES = (32, 256, 1024)
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, in MB (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def synthetic_inputs(variant, batch_size):
+    """Random inputs and targets shaped for the "material", "immaterial" or "full" model."""
+    image = np.random.random((batch_size, 32, 32, 3)).astype("float32")
+    text = random_token_sequences(batch_size)
+    quantum_real = np.random.random((batch_size, 2)).astype("float32")
+    quantum_imaginary = np.random.random((batch_size, 2)).astype("float32")
+
+    if variant == "material":
+        return (image, text), np.random.random((batch_size, 128)).astype("float32")
+    if variant == "immaterial":
+        return (quantum_real, quantum_imaginary), np.random.random((batch_size, 2)).astype("float32")
+    labels = tf.keras.utils.to_categorical(np.random.randint(10, size=batch_size), 10)
+    return (image, text, quantum_real, quantum_imaginary), labels
+
+def _model_builders():
+    from models.material_layers import build_material_model
+    from models.immaterial_layers import build_immaterial_model
+    from models.samvara_model import build_samvara_model
+
+    # The material and immaterial sub-models have no classification head, so they train on a regression target
+    return {
+        "material": (build_material_model, "mse"),
+        "immaterial": (build_immaterial_model, "mse"),
+        "full": (build_samvara_model, "categorical_crossentropy"),
+    }
+
+def benchmark_model(variant, train_batch_size=32, train_steps=50, inference_batches=50,
+                    inference_batch_sizes=INFERENCE_BATCH_SIZES):
+    """Measure build/compile time, training steps/sec and inference throughput and latency for one model variant."""
+    builder, loss = _model_builders()[variant]
+    results = {"variant": variant}
+
+    start_time = time.perf_counter()
+    model = builder()
+    results["build_seconds"] = time.perf_counter() - start_time
+
+    # Compiling is lazy, so the first training step (graph tracing) counts as part of compile time
+    inputs, targets = synthetic_inputs(variant, train_batch_size)
+    start_time = time.perf_counter()
+    model.compile(optimizer=tf.keras.optimizers.Adam(), loss=loss)
+    model.train_on_batch(inputs, targets)
+    results["compile_seconds"] = time.perf_counter() - start_time
+
+    dataset = tf.data.Dataset.from_tensors((inputs, targets)).repeat()
+    start_time = time.perf_counter()
+    model.fit(dataset, steps_per_epoch=train_steps, epochs=1, verbose=0)
+    results["train_steps_per_sec"] = train_steps / (time.perf_counter() - start_time)
+
+    results["inference"] = {}
+    for batch_size in inference_batch_sizes:
+        batch_inputs, _ = synthetic_inputs(variant, batch_size)
+        model.predict_on_batch(batch_inputs)  # Warm up (tracing)
+        latencies = []
+        for _ in range(inference_batches):
+            start_time = time.perf_counter()
+            model.predict_on_batch(batch_inputs)
+            latencies.append(time.perf_counter() - start_time)
+        latencies = np.array(latencies)
+        results["inference"][str(batch_size)] = {
+            "samples_per_sec": batch_size * len(latencies) / latencies.sum(),
+            "p50_latency_ms": float(np.percentile(latencies, 50) * 1000),
+            "p99_latency_ms": float(np.percentile(latencies, 99) * 1000),
+        }
+
+    results["peak_rss_mb"] = peak_rss_mb()
+    return results
+
+def benchmark_evolution(population_size, n_jobs=1):
+    """Time the evolutionary phase on a random population of the given size."""
+    from models.microbiome_model import run_evolutionary_algorithm
+
+    image_data = np.random.random((population_size, 32, 32, 3)).astype("float32")
+    text_data = random_token_sequences(population_size)
+    quantum_real = np.random.random((population_size, 2)).astype("float32")
+    quantum_imaginary = np.random.random((population_size, 2)).astype("float32")
+    labels = np.random.randint(10, size=(population_size, 10)).astype("int64")
+
+    start_time = time.perf_counter()
+    evolved = run_evolutionary_algorithm(image_data, text_data, quantum_real, quantum_imaginary, labels,
+                                         seed=0, n_jobs=n_jobs)
+    elapsed = time.perf_counter() - start_time
+    return {
+        "population_size": population_size,
+        "n_jobs": n_jobs,
+        "seconds": elapsed,
+        "individuals_per_sec": population_size / elapsed,
+        "survivors": len(evolved[-1]),
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+def benchmark_quantum_layer(batch_size, units=2, calls=100):
+    """
+    Per-call latency of the CustomQuantumLayer forward pass with separate and with packed [real | imaginary]
+    inputs, for the summing and the complex path, next to the unfused matmul kernels as a reference.
+    """
+    from models.immaterial_layers import CustomQuantumLayer
+
+    real_part = tf.constant(np.random.random((batch_size, units)).astype("float32"))
+    imaginary_part = tf.constant(np.random.random((batch_size, units)).astype("float32"))
+    packed = tf.concat([real_part, imaginary_part], axis=-1)
+    summing_layer = CustomQuantumLayer(units=units)
+    complex_layer = CustomQuantumLayer(units=units, complex_path=True)
+    summing_layer(packed)
+    complex_layer(packed)
+
+    def unfused_complex(r, i):
+        real_kernel, imaginary_kernel = complex_layer.real_kernel, complex_layer.imaginary_kernel
+        return tf.concat([tf.matmul(r, real_kernel) - tf.matmul(i, imaginary_kernel),
+                          tf.matmul(r, imaginary_kernel) + tf.matmul(i, real_kernel)], axis=-1)
+
+    kernels = {
+        "unfused_sum": (lambda r, i: tf.matmul(r, summing_layer.real_kernel) +
+                        tf.matmul(i, summing_layer.imaginary_kernel), (real_part, imaginary_part)),
+        "sum_pair": (lambda r, i: summing_layer([r, i]), (real_part, imaginary_part)),
+        "sum_packed": (summing_layer, (packed,)),
+        "unfused_complex": (unfused_complex, (real_part, imaginary_part)),
+        "complex_pair": (lambda r, i: complex_layer([r, i]), (real_part, imaginary_part)),
+        "complex_packed": (complex_layer, (packed,)),
+    }
+    results = {"batch_size": batch_size, "units": units}
+    for name, (kernel, inputs) in kernels.items():
+        step = tf.function(kernel)
+        step(*inputs)  # Trace outside the timing
+        latencies = []
+        for _ in range(calls):
+            start_time = time.perf_counter()
+            step(*inputs).numpy()
+            latencies.append(time.perf_counter() - start_time)
+        results[f"{name}_us"] = float(np.median(latencies) * 1e6)
+    return results
+
+def benchmark_quantum_circuit(batch_size, num_layers=2, per_sample_runs=32):
+    """
+    Milliseconds per batch of the QuantumCircuitLayer forward pass: one circuit execution per sample
+    (extrapolated from `per_sample_runs` samples), one broadcast execution over the batch, and a cached repeat.
+    """
+    from models.quantum_circuit_layer import QuantumCircuitLayer
+
+    (real_part, imaginary_part), _ = synthetic_inputs("immaterial", batch_size)
+    layer = QuantumCircuitLayer(num_layers=num_layers, cache_size=100000)
+    layer([real_part, imaginary_part], training=True)
+    weights = layer.circuit_weights.numpy()
+
+    start_time = time.perf_counter()
+    for i in range(min(per_sample_runs, batch_size)):
+        layer.circuit(real_part[i], imaginary_part[i], weights)
+    per_sample = (time.perf_counter() - start_time) / min(per_sample_runs, batch_size) * batch_size
+
+    start_time = time.perf_counter()
+    layer._evaluate(real_part, imaginary_part, weights)
+    broadcast = time.perf_counter() - start_time
+
+    layer([real_part, imaginary_part], training=False)  # Fill the cache
+    start_time = time.perf_counter()
+    layer([real_part, imaginary_part], training=False)
+    cached = time.perf_counter() - start_time
+
+    return {"batch_size": batch_size, "num_layers": num_layers, "per_sample_ms": per_sample * 1000,
+            "broadcast_ms": broadcast * 1000, "cached_ms": cached * 1000}
+
+def _git_commit():
+    try:
+        result = subprocess.run(["git", "rev-parse", "HEAD"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                                cwd=os.path.dirname(os.path.abspath(__file__)))
+        return result.stdout.decode().strip() or None
+    except FileNotFoundError:
+        return None
+
+def run_benchmarks(variants=("material", "immaterial", "full"), population_sizes=POPULATION_SIZES,
+                   train_steps=50, inference_batches=50, evolution_jobs=1, quantum_batch_sizes=QUANTUM_BATCH_SIZES,
+                   circuit_batch_sizes=CIRCUIT_BATCH_SIZES):
+    """Run the whole suite and return the results with enough metadata to compare runs across commits."""
+    np.random.seed(0)
+    tf.random.set_seed(0)
+    results = {
+        "commit": _git_commit(),
+        "timestamp": int(time.time()),
+        "tensorflow": tf.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "models": [],
+        "evolution": [],
+        "quantum_layer": [],
+        "quantum_circuit": [],
+    }
+    for variant in variants:
+        logging.info(f"Benchmarking {variant} model")
+        results["models"].append(benchmark_model(variant, train_steps=train_steps, inference_batches=inference_batches))
+    for population_size in population_sizes:
+        logging.info(f"Benchmarking evolutionary phase with {population_size} individuals")
+        results["evolution"].append(benchmark_evolution(population_size, n_jobs=evolution_jobs))
+    for units in QUANTUM_UNITS:
+        for batch_size in quantum_batch_sizes:
+            logging.info(f"Benchmarking CustomQuantumLayer with batch size {batch_size} and {units} units")
+            results["quantum_layer"].append(benchmark_quantum_layer(batch_size, units=units))
+    for batch_size in circuit_batch_sizes:
+        logging.info(f"Benchmarking QuantumCircuitLayer with batch size {batch_size}")
+        results["quantum_circuit"].append(benchmark_quantum_circuit(batch_size))
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Samvara-AI Benchmarks")
+    parser.add_argument('--output', type=str, default="benchmark_results.json", help="Path of the JSON results")
+    parser.add_argument('--quick', action='store_true', help="Fewer steps and smaller populations, for smoke runs")
+    parser.add_argument('--evolution-jobs', type=int, default=1, help="Worker count for the evolutionary phase")
+    args = parser.parse_args(argv)
+
+    # The evolutionary phase logs every generation, keep the benchmark output readable
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.quick:
+        results = run_benchmarks(population_sizes=(1000,), train_steps=5, inference_batches=5,
+                                 evolution_jobs=args.evolution_jobs, quantum_batch_sizes=(1024,), circuit_batch_sizes=(32,))
+    else:
+        results = run_benchmarks(evolution_jobs=args.evolution_jobs)
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+# utils/data_pipeline.py
+
+import os
+import json
+import logging
+import numpy as np
+import tensorflow as tf
+from utils.augmentation import augment_batches
+
+AUTOTUNE = tf.data.AUTOTUNE
+
+# Order of the modalities in every record and in the model inputs
+FEATURE_KEYS = ("image", "text", "quantum_real", "quantum_imaginary", "labels")
+MATERIAL_KEYS = ("image", "text")
+FULL_KEYS = ("image", "text", "quantum_real", "quantum_imaginary")
+
+SPEC_FILENAME = "spec.json"
+
+
+def _bytes_feature(value):
+    return tf.train.Feature(bytes_list=tf.train.BytesList(value=[value]))
+
+
+def _write_shards(output_dir, split, arrays, indices, num_shards):
+    """Write the rows selected by `indices` into `num_shards` TFRecord files."""
+    paths = []
+    for shard, shard_indices in enumerate(np.array_split(indices, num_shards)):
+        path = os.path.join(output_dir, f"{split}-{shard:05d}-of-{num_shards:05d}.tfrecord")
+        with tf.io.TFRecordWriter(path) as writer:
+            for i in shard_indices:
+                feature = {key: _bytes_feature(np.ascontiguousarray(arrays[key][i]).tobytes()) for key in FEATURE_KEYS}
+                example = tf.train.Example(features=tf.train.Features(feature=feature))
+                writer.write(example.SerializeToString())
+        paths.append(path)
+    return paths
+
+
+def write_dataset_shards(output_dir, image_data, text_data, quantum_real, quantum_imaginary, labels,
+                         num_shards=8, validation_split=0.2):
+    """
+    Serialize the four model inputs and the labels into sharded TFRecord files.
+    Every modality is stored as raw bytes so decoding in the pipeline is a cheap, vectorized decode_raw.
+    The last `validation_split` fraction of the rows goes to the validation shards, like Model.fit does.
+    Returns the lists of training and validation shard paths.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    arrays = dict(zip(FEATURE_KEYS, (image_data, text_data, quantum_real, quantum_imaginary, labels)))
+
+    # The spec lets the reader restore shapes and dtypes without touching the data
+    spec = {key: {"shape": list(array.shape[1:]), "dtype": np.dtype(array.dtype).name} for key, array in arrays.items()}
+    with open(os.path.join(output_dir, SPEC_FILENAME), "w") as f:
+        json.dump(spec, f, indent=2)
+
+    num_samples = len(labels)
+    num_train = int(num_samples * (1.0 - validation_split))
+    indices = np.arange(num_samples)
+
+    train_files = _write_shards(output_dir, "train", arrays, indices[:num_train], num_shards)
+    val_files = []
+    if num_train < num_samples:
+        val_files = _write_shards(output_dir, "validation", arrays, indices[num_train:], max(1, num_shards // 4))
+
+    logging.info(f"Wrote {num_train} training and {num_samples - num_train} validation samples to {output_dir}")
+    return train_files, val_files
+
+
+def list_dataset_shards(data_dir):
+    """Return the training and validation shard paths previously written to data_dir."""
+    train_files = sorted(tf.io.gfile.glob(os.path.join(data_dir, "train-*.tfrecord")))
+    val_files = sorted(tf.io.gfile.glob(os.path.join(data_dir, "validation-*.tfrecord")))
+    return train_files, val_files
+
+
+def load_spec(data_dir):
+    """Load the feature spec written next to the shards."""
+    with open(os.path.join(data_dir, SPEC_FILENAME)) as f:
+        return json.load(f)
+
+
+def _make_batch_parser(spec, input_keys):
+    """Build a function that decodes a batch of serialized examples into (inputs, labels)."""
+    feature_description = {key: tf.io.FixedLenFeature([], tf.string) for key in FEATURE_KEYS}
+
+    def parse_batch(serialized):
+        parsed = tf.io.parse_example(serialized, feature_description)
+        decoded = {}
+        for key in input_keys + ("labels",):
+            values = tf.io.decode_raw(parsed[key], tf.as_dtype(spec[key]["dtype"]))
+            decoded[key] = tf.reshape(values, [-1] + spec[key]["shape"])
+        return tuple(decoded[key] for key in input_keys), decoded["labels"]
+
+    return parse_batch
+
+
+def _text_lengths(text):
+    """Number of tokens of right-padded token sequences (the padding id is 0), at least 1."""
+    return tf.maximum(tf.reduce_sum(tf.cast(tf.not_equal(text, 0), tf.int32), axis=-1), 1)
+
+
+def _trim_text(inputs, labels):
+    """Cut the text of a batch (or of one example) to its longest sequence."""
+    text = inputs[1]
+    text = text[..., :tf.reduce_max(_text_lengths(text))]
+    return (inputs[0], text) + inputs[2:], labels
+
+
+def build_dataset(files, spec, batch_size, include_immaterial=True, training=True,
+                  shuffle_buffer=10000, cache=None, seed=None, bucket_boundaries=None, augmentation=None):
+    """
+    Build a streaming tf.data pipeline over the TFRecord shards.
+    Shards are read in parallel, batches are decoded with a parallel map and the result is prefetched.
+    `cache` is None (no caching), "" (in memory) or a file path for an on-disk cache of the raw records.
+    The inputs match build_samvara_model: (image, text) or (image, text, quantum real, quantum imaginary).
+    The text of every batch is cut to its longest sequence. With `bucket_boundaries`, training batches are
+    also grouped by text length, so short sequences are not padded to the length of long ones.
+    `augmentation` (see utils/augmentation.py) is applied to the images of the decoded training batches.
+    """
+    input_keys = FULL_KEYS if include_immaterial else MATERIAL_KEYS
+
+    file_dataset = tf.data.Dataset.from_tensor_slices(list(files))
+    if training:
+        file_dataset = file_dataset.shuffle(len(files), seed=seed)
+
+    dataset = file_dataset.interleave(
+        tf.data.TFRecordDataset,
+        cycle_length=min(len(files), 8),
+        num_parallel_calls=AUTOTUNE,
+        deterministic=not training
+    )
+
+    # Cache the serialized records, so reshuffling each epoch does not re-read the shards
+    if cache is not None:
+        dataset = dataset.cache(cache)
+    if training:
+        dataset = dataset.shuffle(shuffle_buffer, seed=seed, reshuffle_each_iteration=True)
+
+    # Batch before parsing so decoding runs vectorized over the whole batch
+    dataset = dataset.batch(batch_size, drop_remainder=False)
+    dataset = dataset.map(_make_batch_parser(spec, input_keys), num_parallel_calls=AUTOTUNE)
+    if training and augmentation is not None:
+        # Augment whole batches, before bucketing splits them into examples
+        dataset = augment_batches(dataset, augmentation)
+    if training and bucket_boundaries:
+        # Regroup the decoded examples into batches of similar length, padded to the longest in each batch
+        dataset = dataset.unbatch().map(_trim_text, num_parallel_calls=AUTOTUNE)
+        dataset = dataset.bucket_by_sequence_length(lambda inputs, labels: _text_lengths(inputs[1]),
+                                                    list(bucket_boundaries),
+                                                    [batch_size] * (len(bucket_boundaries) + 1))
+    else:
+        dataset = dataset.map(_trim_text, num_parallel_calls=AUTOTUNE)
+    return dataset.prefetch(AUTOTUNE)
@@ -0,0 +1,121 @@
+# utils/dataset_store.py
+
+import os
+import json
+import logging
+import numpy as np
+
+# One memory-mapped .npy file per modality, in this order
+MODALITIES = ("image", "text", "quantum_real", "quantum_imaginary", "labels")
+
+INDEX_FILENAME = "index.json"
+CHUNK_ROWS = 4096
+
+
+def copy_to_memmap(array, path, chunk_rows=CHUNK_ROWS):
+    """Copy an array (possibly itself memory-mapped) into a new .npy memmap, chunk by chunk, and return it."""
+    target = np.lib.format.open_memmap(path, mode="w+", dtype=array.dtype, shape=array.shape)
+    for start in range(0, array.shape[0], chunk_rows):
+        target[start:start + chunk_rows] = array[start:start + chunk_rows]
+    target.flush()
+    return target
+
+
+def _prepare_directory(directory):
+    """Create the directory and drop any old index, so an overwrite in progress is never seen as complete."""
+    os.makedirs(directory, exist_ok=True)
+    index_path = os.path.join(directory, INDEX_FILENAME)
+    if os.path.exists(index_path):
+        os.remove(index_path)
+
+
+def _write_index(directory, num_samples, arrays):
+    index = {"num_samples": int(num_samples), "modalities": {}}
+    for name, array in zip(MODALITIES, arrays):
+        index["modalities"][name] = {"file": f"{name}.npy", "shape": [int(num_samples)] + list(array.shape[1:]),
+                                     "dtype": np.dtype(array.dtype).name}
+    with open(os.path.join(directory, INDEX_FILENAME), "w") as f:
+        json.dump(index, f, indent=2)
+    logging.info(f"Wrote dataset store with {num_samples} samples to {directory}")
+
+
+def write_dataset_store(directory, image_data, text_data, quantum_real, quantum_imaginary, labels):
+    """
+    Write the five modality arrays as a columnar on-disk dataset: one .npy file per modality plus an index.
+    The index is written last, so a store interrupted mid-write is not picked up as complete.
+    """
+    _prepare_directory(directory)
+    arrays = (image_data, text_data, quantum_real, quantum_imaginary, labels)
+    for name, array in zip(MODALITIES, arrays):
+        copy_to_memmap(array, os.path.join(directory, f"{name}.npy"))
+    _write_index(directory, labels.shape[0], arrays)
+
+
+def dataset_store_exists(directory):
+    """Check whether a complete dataset store exists in the directory."""
+    return os.path.exists(os.path.join(directory, INDEX_FILENAME))
+
+
+def open_dataset_store(directory, mode="r"):
+    """
+    Open a dataset store without reading it: every modality is returned as an np.memmap view.
+    Use mode "c" for copy-on-write views that can be modified without touching the files.
+    """
+    with open(os.path.join(directory, INDEX_FILENAME)) as f:
+        index = json.load(f)
+    arrays = {
+        name: np.load(os.path.join(directory, entry["file"]), mmap_mode=mode)
+        for name, entry in index["modalities"].items()
+    }
+    return DatasetView(arrays)
+
+
+class DatasetView:
+    """
+    The five modality arrays restricted to a set of rows.
+    Selecting rows only composes index arrays; data is copied when a batch is taken for training.
+    """
+    def __init__(self, arrays, indices=None):
+        self.arrays = arrays
+        num_samples = len(arrays["labels"])
+        self.indices = np.arange(num_samples) if indices is None else np.asarray(indices)
+
+    @classmethod
+    def from_arrays(cls, image_data, text_data, quantum_real, quantum_imaginary, labels, indices=None):
+        return cls(dict(zip(MODALITIES, (image_data, text_data, quantum_real, quantum_imaginary, labels))), indices)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def modalities(self):
+        """Return the underlying (unselected) arrays, in MODALITIES order."""
+        return tuple(self.arrays[name] for name in MODALITIES)
+
+    def select(self, positions):
+        """Return a view of the rows at `positions` (indices or boolean mask) of this view, without copying."""
+        return DatasetView(self.arrays, self.indices[positions])
+
+    def take(self, positions=None):
+        """Materialize the rows at `positions` of this view (all rows by default) as in-memory arrays."""
+        rows = self.indices if positions is None else self.indices[positions]
+        return tuple(np.asarray(self.arrays[name][rows]) for name in MODALITIES)
+
+    def save(self, directory, chunk_rows=CHUNK_ROWS):
+        """Write the selected rows as a new dataset store, chunk by chunk, without materializing the whole view."""
+        _prepare_directory(directory)
+        arrays = self.modalities()
+        for name, array in zip(MODALITIES, arrays):
+            target = np.lib.format.open_memmap(os.path.join(directory, f"{name}.npy"), mode="w+", dtype=array.dtype,
+                                               shape=(len(self),) + array.shape[1:])
+            for start in range(0, len(self), chunk_rows):
+                target[start:start + chunk_rows] = array[self.indices[start:start + chunk_rows]]
+            target.flush()
+        _write_index(directory, len(self), arrays)
+
+    def batches(self, batch_size, shuffle=False, seed=None):
+        """Yield materialized batches, reading only the rows of each batch from the underlying files."""
+        order = np.arange(len(self))
+        if shuffle:
+            np.random.default_rng(seed).shuffle(order)
+        for start in range(0, len(order), batch_size):
+            yield self.take(order[start:start + batch_size])
@@ -1,12 +1,95 @@
 import os
 import subprocess
 import random
-import tensorflow as tf
+import argparse
 import unittest
 from unittest.mock import patch, MagicMock
-from utils.helpers import safe_remove, safe_remove_hdf5_dataset, ensure_directory_exists_and_writable, clear_existing_checkpoints
-from utils.gpu_monitor import start_gpu_monitoring
-from utils.parser import parse_arguments
+
+# Directories the training pipeline writes to
+CHECKED_DIRECTORIES = ("checkpoints/", "data/", "logs/")
+# Models checked by --models: name, builder module and function, batch-1 input shapes
+CHECKED_MODELS = (
+    ("Material Layer Model", "models.material_layers", "build_material_model", [(1, 32, 32, 3), (1, 100)]),
+    ("Samvara Model", "models.samvara_model", "build_samvara_model", [(1, 32, 32, 3), (1, 100), (1, 2), (1, 2)]),
+)
+
+def check_directory_permissions(directory_path):
+    if not os.path.exists(directory_path):
+        return f"Directory {directory_path} does not exist."
+    if not os.access(directory_path, os.W_OK):
+        return f"Permission denied: {directory_path} is not writable."
+    return f"Directory {directory_path} is accessible and writable."
+
+def check_gpu_memory_usage():
+    # nvidia-smi answers without importing TensorFlow
+    try:
+        result = subprocess.run(["nvidia-smi", "--query-gpu=memory.used,memory.total", "--format=csv"],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if result.returncode == 0:
+            return f"GPU memory usage:\n{result.stdout.decode()}"
+        return f"Error checking GPU memory usage: {result.stderr.decode()}"
+    except Exception as e:
+        return f"Error checking GPU memory usage: {str(e)}"
+
+def check_gpu_availability():
+    # Importing TensorFlow takes seconds, so only this check does it
+    import tensorflow as tf
+    gpus = tf.config.experimental.list_physical_devices("GPU")
+    return f"Available GPUs: {len(gpus)}" if gpus else "No GPU detected."
+
+def _builder_name(build_fn):
+    return f"{build_fn.__module__}.{build_fn.__qualname__}"
+
+def test_model_loading(model_name, build_fn, weights_path, cache=None):
+    # With a cache, the inference function of these weights is restored instead of built and loaded again
+    try:
+        def build():
+            model = build_fn()
+            model.load_weights(weights_path)
+            return model
+        if cache is None:
+            build()
+        else:
+            from utils.model_cache import cache_key, file_fingerprint
+            key = cache_key(builder=_builder_name(build_fn), weights=file_fingerprint(weights_path))
+            cache.get_or_build(key, build, description=f"{model_name} ({weights_path})")
+        return f"Model {model_name} loaded successfully from {weights_path}."
+    except Exception as e:
+        return f"Error loading model {model_name}: {str(e)}"
+
+def test_model_inference(model_name, build_fn, input_shapes, cache=None):
+    # With a cache, the traced inference function is restored instead of built and traced again
+    try:
+        import numpy as np
+        if cache is None:
+            model = build_fn()
+            dtypes = [model_input.dtype.name for model_input in model.inputs]
+            output = model([np.zeros(shape, dtype=dtype) for shape, dtype in zip(input_shapes, dtypes)],
+                           training=False)
+        else:
+            from utils.model_cache import cache_key
+            key = cache_key(builder=_builder_name(build_fn), input_shapes=input_shapes)
+            predict = cache.get_or_build(key, build_fn, description=model_name)
+            output = predict([np.zeros(shape) for shape in input_shapes])
+        return f"Inference on {model_name} succeeded with output shape {tuple(output.shape)}."
+    except Exception as e:
+        return f"Error during inference on {model_name}: {str(e)}"
+
+def run_model_checks(models=CHECKED_MODELS, cache_dir=None):
+    import importlib
+    cache = None
+    if cache_dir:
+        from utils.model_cache import InferenceCache
+        cache = InferenceCache(cache_dir)
+    return [test_model_inference(name, getattr(importlib.import_module(module), function), input_shapes, cache)
+            for name, module, function, input_shapes in models]
+
+def run_health_checks(directories=CHECKED_DIRECTORIES, tensorflow=False):
+    results = [check_directory_permissions(directory) for directory in directories]
+    results.append(check_gpu_memory_usage())
+    if tensorflow:
+        results.append(check_gpu_availability())
+    return results
 
 def some_function():
     from utils.debugger import check_directory_permissions
@@ -349,9 +432,20 @@ class TestDebuggerFunctions(unittest.TestCase):
         result = test_randomized_model_input("Immaterial Layer Model", build_immaterial_model)
         self.assertIn("Error with randomized input on Immaterial Layer Model", result)
 
-def main():
-    # Parse the arguments using the parser from utils/parser.py
-    args = parse_arguments()
+def main(argv=None):
+    # The debugger has its own light parser, the training arguments are not needed here
+    parser = argparse.ArgumentParser(description="Samvara-AI Debugger")
+    parser.add_argument('-x', '--debug', action='store_true', help="Run in debug mode")
+    parser.add_argument('-s', '--screen', type=str, help="Specify screen name")
+    parser.add_argument('--dirs', type=str, nargs="*", default=list(CHECKED_DIRECTORIES),
+                        help="Directories to check for write access")
+    parser.add_argument('--tensorflow', action='store_true',
+                        help="Also import TensorFlow and check the GPUs it sees (takes seconds)")
+    parser.add_argument('--models', action='store_true',
+                        help="Also build the models and run inference on them (takes seconds without the cache)")
+    parser.add_argument('--model-cache', type=str, default="cache/models/",
+                        help="Directory of the persistent inference cache used by --models, empty to disable it")
+    args = parser.parse_args(argv)
 
     # Handle debug mode
     if args.debug:
@@ -368,5 +462,11 @@ def main():
         print("Running Samvara-AI normally")
         # Add your normal execution logic here
 
+    for result in run_health_checks(args.dirs, tensorflow=args.tensorflow):
+        print(result)
+    if args.models:
+        for result in run_model_checks(cache_dir=args.model_cache):
+            print(result)
+
 if __name__ == "__main__":
     main()
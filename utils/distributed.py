@@ -0,0 +1,127 @@
+# utils/distributed.py
+
+import os
+import sys
+import json
+import socket
+import logging
+import argparse
+import subprocess
+import tensorflow as tf
+
+STRATEGIES = ("none", "mirrored", "multi_worker")
+
+
+def make_strategy(mode="none", cpu_replicas=0):
+    """
+    Create the tf.distribute strategy for a training run. Must be called before any other TensorFlow work.
+    "mirrored" replicates the model on every local GPU; without GPUs, `cpu_replicas` splits the CPU into that many
+    logical devices instead. "multi_worker" synchronizes the replicas of several processes or hosts, described by
+    the TF_CONFIG environment variable (see `launch_local_workers`). "none" returns the default strategy.
+    """
+    if mode not in STRATEGIES:
+        raise ValueError(f"Unknown distribution strategy '{mode}', expected one of {STRATEGIES}")
+    if cpu_replicas > 1 and not tf.config.list_physical_devices("GPU"):
+        cpu = tf.config.list_physical_devices("CPU")[0]
+        tf.config.set_logical_device_configuration(cpu, [tf.config.LogicalDeviceConfiguration()] * cpu_replicas)
+
+    if mode == "mirrored":
+        devices = [device.name for device in tf.config.list_logical_devices("GPU")] or \
+                  [device.name for device in tf.config.list_logical_devices("CPU")]
+        strategy = tf.distribute.MirroredStrategy(devices)
+    elif mode == "multi_worker":
+        strategy = tf.distribute.MultiWorkerMirroredStrategy()
+    else:
+        strategy = tf.distribute.get_strategy()
+    logging.info(f"Distribution: {mode}, {strategy.num_replicas_in_sync} replicas in sync, "
+                 f"worker {worker_index(strategy)}{' (chief)' if is_chief(strategy) else ''}")
+    return strategy
+
+
+def worker_index(strategy):
+    """Index of this worker in the cluster, 0 outside multi-worker training."""
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None or resolver.task_type is None:
+        return 0
+    return resolver.task_id or 0
+
+
+def is_chief(strategy):
+    """
+    Whether this process is the chief, which alone writes the shared checkpoints. Without a "chief" task in the
+    cluster, worker 0 is the chief; outside multi-worker training the single process is.
+    """
+    resolver = getattr(strategy, "cluster_resolver", None)
+    if resolver is None or resolver.task_type is None:
+        return True
+    return resolver.task_type == "chief" or (resolver.task_type == "worker" and resolver.task_id == 0
+                                             and "chief" not in resolver.cluster_spec().as_dict())
+
+
+def worker_dir(directory, strategy):
+    """The chief uses `directory`, other workers a private subdirectory, so workers never write the same files."""
+    if is_chief(strategy):
+        return directory
+    return os.path.join(directory, f"worker_{worker_index(strategy)}/")
+
+
+def scale_for_replicas(batch_size, learning_rate, num_replicas):
+    """
+    Global batch size and learning rate for `num_replicas` synchronized replicas: `batch_size` is per replica,
+    and the learning rate grows linearly with the global batch (the learning rate warmup keeps the start stable).
+    """
+    return batch_size * num_replicas, learning_rate * num_replicas
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("localhost", 0))
+        return s.getsockname()[1]
+
+
+def launch_local_workers(num_workers, script_args, script="main.py", log_dir="logs/workers"):
+    """
+    Run `num_workers` multi-worker training processes of `script` on this machine, each with its own TF_CONFIG,
+    and wait for all of them. The chief's output goes to the console, the other workers log to `log_dir`.
+    Returns the exit codes.
+    """
+    addresses = [f"localhost:{_free_port()}" for _ in range(num_workers)]
+    os.makedirs(log_dir, exist_ok=True)
+    processes, log_files = [], []
+    for index in range(num_workers):
+        env = dict(os.environ)
+        env["TF_CONFIG"] = json.dumps({"cluster": {"worker": addresses}, "task": {"type": "worker", "index": index}})
+        command = [sys.executable, script, "--distributed", "multi_worker"] + list(script_args)
+        if index == 0:
+            processes.append(subprocess.Popen(command, env=env))
+        else:
+            log_file = open(os.path.join(log_dir, f"worker_{index}.log"), "w")
+            log_files.append(log_file)
+            processes.append(subprocess.Popen(command, env=env, stdout=log_file, stderr=subprocess.STDOUT))
+    logging.info(f"Started {num_workers} workers on {', '.join(addresses)}; worker logs in {log_dir}")
+
+    try:
+        exit_codes = [process.wait() for process in processes]
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+        exit_codes = [process.wait() for process in processes]
+    finally:
+        for log_file in log_files:
+            log_file.close()
+    return exit_codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samvara-AI Local Multi-Worker Launcher")
+    parser.add_argument('--workers', type=int, default=2, help="Number of worker processes")
+    parser.add_argument('--log-dir', type=str, default="logs/workers", help="Directory of the non-chief worker logs")
+    args, script_args = parser.parse_known_args()
+
+    logging.basicConfig(level=logging.INFO)
+    exit_codes = launch_local_workers(args.workers, script_args, log_dir=args.log_dir)
+    logging.info(f"Worker exit codes: {exit_codes}")
+    sys.exit(max(exit_codes, key=abs))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,320 @@
+# utils/export.py
+
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import numpy as np
+import tensorflow as tf
+from models.material_layers import MAX_TEXT_LENGTH
+from utils.augmentation import AUGMENTATION_CLASSES, AUGMENTATION_NAME
+
+# Quantization variants of the TFLite export, "none" being the float32 model
+QUANTIZATIONS = ("none", "float16", "int8")
+# Config class names of nested functional networks, which are folded recursively
+NETWORK_CLASSES = ("Functional", "Model", "SamvaraModel")
+RECURRENT_CLASSES = ("LSTM", "GRU", "SimpleRNN")
+
+
+def _custom_objects():
+    from models.immaterial_layers import CustomQuantumLayer
+    from models.samvara_model import SamvaraModel
+    return {"CustomQuantumLayer": CustomQuantumLayer, "SamvaraModel": SamvaraModel}
+
+
+def _batch_norm_affine(layer):
+    """Scale and offset of a BatchNormalization layer in inference mode: y = x * scale + offset."""
+    gamma = layer.gamma.numpy() if layer.gamma is not None else 1.0
+    beta = layer.beta.numpy() if layer.beta is not None else 0.0
+    scale = gamma / np.sqrt(layer.moving_variance.numpy() + layer.epsilon)
+    return scale, beta - layer.moving_mean.numpy() * scale
+
+
+def _fold_network(model, config, overrides):
+    """
+    Rewrite one functional network config in place: Dropout and augmentation layers are bypassed, and
+    BatchNormalization layers whose only consumer is a Dense (directly or through a last-axis Concatenate) are
+    bypassed with their affine folded into that Dense's kernel and bias, collected in `overrides`. Nested networks
+    are rewritten recursively.
+    """
+    layer_configs = {layer_config["name"]: layer_config for layer_config in config["layers"]}
+    consumers = {}
+    for layer_config in config["layers"]:
+        for node in layer_config["inbound_nodes"]:
+            for inbound in node:
+                consumers.setdefault(inbound[0], []).append(layer_config["name"])
+
+    def single_consumer(name):
+        names = consumers.get(name, [])
+        return layer_configs[names[0]] if len(names) == 1 else None
+
+    bypassed = []
+    for layer_config in config["layers"]:
+        layer = model.get_layer(layer_config["name"])
+        if layer_config["class_name"] in NETWORK_CLASSES:
+            _fold_network(layer, layer_config["config"], overrides)
+        elif layer_config["class_name"] in ("Dropout",) + AUGMENTATION_CLASSES \
+                or layer_config["name"] == AUGMENTATION_NAME:
+            bypassed.append(layer_config["name"])
+        elif layer_config["class_name"] == "BatchNormalization" and len(layer.input_shape) == 2:
+            consumer = single_consumer(layer.name)
+            rows = slice(0, layer.input_shape[-1])
+            if consumer is not None and consumer["class_name"] == "Concatenate" \
+                    and consumer["config"]["axis"] in (-1, 1) and len(consumer["inbound_nodes"]) == 1:
+                # Rows of the Dense kernel that multiply this layer's slice of the concatenation
+                offset = 0
+                for inbound in consumer["inbound_nodes"][0]:
+                    width = model.get_layer(inbound[0]).output_shape[-1]
+                    if inbound[0] == layer.name:
+                        rows = slice(offset, offset + width)
+                    offset += width
+                consumer = single_consumer(consumer["name"])
+            if consumer is None or consumer["class_name"] != "Dense":
+                continue
+            dense = model.get_layer(consumer["name"])
+            if not dense.use_bias:
+                continue
+            kernel, bias = overrides.get(dense, dense.get_weights())
+            scale, offset = _batch_norm_affine(layer)
+            bias = bias + offset @ kernel[rows]
+            kernel = kernel.copy()
+            kernel[rows] *= scale[:, None]
+            overrides[dense] = [kernel, bias]
+            bypassed.append(layer.name)
+
+    # Consumers of a bypassed layer read its input instead
+    for name in bypassed:
+        source = layer_configs[name]["inbound_nodes"][0][0]
+        for layer_config in config["layers"]:
+            layer_config["inbound_nodes"] = [[source if inbound[0] == name else inbound for inbound in node]
+                                             for node in layer_config["inbound_nodes"]]
+        config["output_layers"] = [[source[0], source[1], source[2]] if output[0] == name else output
+                                   for output in config["output_layers"]]
+    config["layers"] = [layer_config for layer_config in config["layers"] if layer_config["name"] not in bypassed]
+
+
+def _copy_weights(source, target, overrides):
+    for layer in source.layers:
+        if layer.name not in {target_layer.name for target_layer in target.layers}:
+            continue
+        target_layer = target.get_layer(layer.name)
+        if isinstance(layer, tf.keras.Model):
+            _copy_weights(layer, target_layer, overrides)
+        elif layer.weights:
+            target_layer.set_weights(overrides.get(layer, layer.get_weights()))
+
+
+def _unroll_recurrent(config):
+    """Unroll the recurrent layers of a network config, fixing variable-length inputs to MAX_TEXT_LENGTH."""
+    for layer_config in config["layers"]:
+        if layer_config["class_name"] in NETWORK_CLASSES:
+            _unroll_recurrent(layer_config["config"])
+        elif layer_config["class_name"] in RECURRENT_CLASSES:
+            layer_config["config"]["unroll"] = True
+        elif layer_config["class_name"] == "InputLayer":
+            shape = layer_config["config"]["batch_input_shape"]
+            layer_config["config"]["batch_input_shape"] = [shape[0]] + [MAX_TEXT_LENGTH if dim is None else dim
+                                                                        for dim in shape[1:]]
+
+
+def fold_inference_layers(model, unroll=False):
+    """
+    Inference-only copy of a functional model: Dropout and augmentation removed and BatchNormalization folded into
+    the following Dense layer where possible, so no training-only ops remain in the exported graph. With `unroll`,
+    recurrent layers are unrolled over their (fixed-length) sequences.
+    """
+    config = model.get_config()
+    config.pop("material_lr_multiplier", None)
+    overrides = {}
+    _fold_network(model, config, overrides)
+    if unroll:
+        _unroll_recurrent(config)
+    inference_model = tf.keras.Model.from_config(config, custom_objects=_custom_objects())
+    _copy_weights(model, inference_model, overrides)
+    return inference_model
+
+
+def calibration_inputs(model, num_samples=100, store_dir="data/store/"):
+    """Sample inputs for calibration and latency measurements: rows of the dataset store, or synthetic data."""
+    from utils.dataset_store import dataset_store_exists, open_dataset_store
+
+    if store_dir and dataset_store_exists(store_dir):
+        store = open_dataset_store(store_dir)
+        inputs = store.take(np.arange(min(num_samples, len(store))))[:len(model.inputs)]
+    else:
+        from utils.benchmark import synthetic_inputs
+        inputs, _ = synthetic_inputs("full", num_samples)
+    return [np.asarray(x, dtype=model_input.dtype.as_numpy_dtype) for x, model_input in zip(inputs, model.inputs)]
+
+
+def convert_tflite(model, quantization="none", representative_inputs=None):
+    """
+    Convert a Keras model to a TFLite flatbuffer (variables frozen to constants). "float16" stores float16
+    weights; "int8" quantizes weights and activations, calibrated on `representative_inputs`, keeping float
+    kernels for ops without an int8 implementation.
+    The model is traced with a batch size of 1, so the interpreter runs one sample per invocation (the LSTM state
+    has a fixed batch size). Variable-length text is fixed to MAX_TEXT_LENGTH tokens, shorter text is right-padded
+    with 0.
+    """
+    signature = [tf.TensorSpec([1] + [MAX_TEXT_LENGTH if dim is None else dim for dim in model_input.shape[1:]],
+                               model_input.dtype, name=model_input.name.split(":")[0])
+                 for model_input in model.inputs]
+    serve = tf.function(lambda *inputs: model(list(inputs), training=False), input_signature=signature)
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([serve.get_concrete_function()], model)
+    if quantization == "float16":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        converter.target_spec.supported_types = [tf.float16]
+    elif quantization == "int8":
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+
+        def representative_dataset():
+            # Keyed by input name: the converted model does not keep the Keras input order
+            for row in range(len(representative_inputs[0])):
+                yield {spec.name: x[row:row + 1] for spec, x in zip(signature, representative_inputs)}
+
+        converter.representative_dataset = representative_dataset
+    elif quantization != "none":
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATIONS}")
+    return converter.convert()
+
+
+def _directory_size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def _median_ms(function, repeats):
+    function()
+    latencies = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        function()
+        latencies.append(time.perf_counter() - start_time)
+    return float(np.median(latencies) * 1000)
+
+
+def _tflite_runner(path, model, num_threads=None):
+    """Predict function over a batch-1 TFLite model, which runs a batch one sample at a time."""
+    interpreter = tf.lite.Interpreter(model_path=path, num_threads=num_threads)
+    interpreter.allocate_tensors()
+    input_details = interpreter.get_input_details()
+    output_index = interpreter.get_output_details()[0]["index"]
+    # Inputs are matched by name: the converter does not keep the Keras input order
+    positions = [next(i for i, model_input in enumerate(model.inputs)
+                      if model_input.name.split(":")[0] in detail["name"]) for detail in input_details]
+
+    def predict(inputs):
+        outputs = []
+        for row in range(len(inputs[0])):
+            for detail, position in zip(input_details, positions):
+                interpreter.set_tensor(detail["index"], inputs[position][row:row + 1].astype(detail["dtype"]))
+            interpreter.invoke()
+            outputs.append(interpreter.get_tensor(output_index))
+        return np.concatenate(outputs)
+
+    return predict
+
+
+def measure_artifact(kind, path, model, inputs, repeats=50, batch_size=32):
+    """Size, cold-load time (load + first prediction), batch-1 latency and batch throughput of one artifact."""
+    single = [x[:1] for x in inputs]
+    batch = [np.repeat(x[:1], batch_size, axis=0) if len(x) < batch_size else x[:batch_size] for x in inputs]
+    start_time = time.perf_counter()
+    if kind == "keras":
+        from utils.inference_server import load_samvara_model, make_predict_fn
+        predict = make_predict_fn(load_samvara_model(path))
+    elif kind == "saved_model":
+        serve = tf.saved_model.load(path).signatures["serving_default"]
+        names = [model_input.name.split(":")[0] for model_input in model.inputs]
+        predict = lambda x: list(serve(**{name: tf.constant(value) for name, value in zip(names, x)}).values())[0].numpy()
+    else:
+        predict = _tflite_runner(path, model)
+    predict(single)
+    load_seconds = time.perf_counter() - start_time
+    outputs = predict(inputs)
+
+    return {
+        "artifact": path,
+        "size_mb": _directory_size(path) / (1024 * 1024),
+        "cold_load_ms": load_seconds * 1000,
+        "latency_ms": _median_ms(lambda: predict(single), repeats),
+        f"batch_{batch_size}_samples_per_sec": batch_size / (_median_ms(lambda: predict(batch), repeats) / 1000),
+        "outputs": outputs,
+    }
+
+
+def export_model(model_path, output_dir, quantizations=QUANTIZATIONS, store_dir="data/store/",
+                 num_samples=100, repeats=50):
+    """
+    Export a saved .keras Samvara model as an inference-only SavedModel and TFLite models (one per quantization),
+    and report size, cold-load time and CPU latency of every artifact against the original, together with the
+    maximum output difference and the agreement of the predicted classes.
+    """
+    from utils.inference_server import load_samvara_model
+
+    os.makedirs(output_dir, exist_ok=True)
+    model = load_samvara_model(model_path)
+    inference_model = fold_inference_layers(model)
+    inputs = calibration_inputs(model, num_samples, store_dir)
+
+    artifacts = [("original", "keras", model_path)]
+    saved_model_dir = os.path.join(output_dir, "saved_model")
+    shutil.rmtree(saved_model_dir, ignore_errors=True)
+    signature = [tf.TensorSpec(model_input.shape, model_input.dtype, name=model_input.name.split(":")[0])
+                 for model_input in inference_model.inputs]
+    serve = tf.function(lambda *x: inference_model(list(x), training=False), input_signature=signature)
+    tf.saved_model.save(inference_model, saved_model_dir, signatures=serve.get_concrete_function())
+    artifacts.append(("saved_model", "saved_model", saved_model_dir))
+
+    for quantization in quantizations:
+        label = quantization if quantization != "none" else "float32"
+        tflite_path = os.path.join(output_dir, f"samvara_{label}.tflite")
+        # Quantizing the masked LSTM loop fails in the converter (float16 runs out of memory, int8 calibration
+        # crashes), the unrolled LSTM converts
+        source_model = fold_inference_layers(model, unroll=True) if quantization != "none" else inference_model
+        with open(tflite_path, "wb") as f:
+            f.write(convert_tflite(source_model, quantization, inputs))
+        artifacts.append((f"tflite_{label}", "tflite", tflite_path))
+        logging.info(f"Exported {tflite_path}")
+
+    report = {"model": model_path, "samples": len(inputs[0]), "artifacts": {}}
+    reference = None
+    for name, kind, path in artifacts:
+        result = measure_artifact(kind, path, model, inputs, repeats=repeats)
+        outputs = result.pop("outputs")
+        if reference is None:
+            reference = outputs
+        result["max_abs_diff"] = float(np.max(np.abs(outputs - reference)))
+        result["class_agreement"] = float(np.mean(np.argmax(outputs, axis=-1) == np.argmax(reference, axis=-1)))
+        report["artifacts"][name] = result
+
+    original = report["artifacts"]["original"]
+    for name, result in report["artifacts"].items():
+        logging.info(f"{name:>14}: {result['size_mb']:8.2f} MB ({result['size_mb'] / original['size_mb']:.2f}x), "
+                     f"cold load {result['cold_load_ms']:8.1f} ms, latency {result['latency_ms']:7.3f} ms "
+                     f"({original['latency_ms'] / result['latency_ms']:.2f}x), max diff {result['max_abs_diff']:.2e}, "
+                     f"class agreement {100 * result['class_agreement']:.1f}%")
+    with open(os.path.join(output_dir, "export_report.json"), "w") as f:
+        json.dump(report, f, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Samvara-AI Model Export")
+    parser.add_argument('--model', type=str, required=True, help="Path of the saved .keras model")
+    parser.add_argument('--output', type=str, default="exports/", help="Directory of the exported artifacts")
+    parser.add_argument('--quantize', type=str, default=",".join(QUANTIZATIONS),
+                        help=f"Comma-separated TFLite variants to export, of {', '.join(QUANTIZATIONS)}")
+    parser.add_argument('--store-dir', type=str, default="data/store/",
+                        help="Dataset store for calibration; synthetic data is used when it does not exist")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    export_model(args.model, args.output, quantizations=[q for q in args.quantize.split(",") if q],
+                 store_dir=args.store_dir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# utils/fast_training.py
+
+import time
+import logging
+import tensorflow as tf
+
+def has_gpu():
+    return bool(tf.config.list_physical_devices("GPU"))
+
+def mixed_precision_policy_name():
+    """float16 is only fast on GPUs, CPUs get bfloat16, which needs no loss scaling."""
+    return "mixed_float16" if has_gpu() else "mixed_bfloat16"
+
+def configure_fast_training(mixed_precision=False, jit_compile=False, steps_per_execution=1):
+    """
+    Set up the opt-in fast-training mode and return the extra keyword arguments for Model.compile.
+    Must run before the models are built, since the mixed precision policy is picked up at layer creation.
+    The softmax head and the CustomQuantumLayer keep float32 policies in both modes (see models/).
+    """
+    policy = mixed_precision_policy_name() if mixed_precision else "float32"
+    tf.keras.mixed_precision.set_global_policy(policy)
+    logging.info(f"Training mode: policy={policy}, jit_compile={jit_compile}, steps_per_execution={steps_per_execution}")
+    if jit_compile and not has_gpu():
+        # Measured 16-32x slower per step than the default path on CPU (LSTM and quantum layer under XLA)
+        logging.warning("XLA compilation is enabled without a GPU; on CPU it makes training steps much slower")
+    return {"jit_compile": jit_compile, "steps_per_execution": steps_per_execution}
+
+def measure_step_time(mixed_precision=False, jit_compile=False, steps_per_execution=1,
+                      batch_size=32, steps=50, include_immaterial=True):
+    """Build and compile the Samvara model in the given mode and return its mean training step time in seconds."""
+    from models.samvara_model import build_samvara_model
+    from utils.benchmark import synthetic_inputs
+
+    compile_kwargs = configure_fast_training(mixed_precision, jit_compile, steps_per_execution)
+    try:
+        model = build_samvara_model(include_immaterial=include_immaterial)
+        model.compile(optimizer=tf.keras.optimizers.Adam(), loss="categorical_crossentropy", metrics=["accuracy"],
+                      **compile_kwargs)
+        inputs, labels = synthetic_inputs("full" if include_immaterial else "material", batch_size)
+        dataset = tf.data.Dataset.from_tensors((inputs, labels)).repeat()
+
+        # Warm up, so tracing and XLA compilation are not part of the measurement
+        model.fit(dataset, steps_per_epoch=steps_per_execution * 2, epochs=1, verbose=0)
+        start_time = time.perf_counter()
+        model.fit(dataset, steps_per_epoch=steps, epochs=1, verbose=0)
+        return (time.perf_counter() - start_time) / steps
+    finally:
+        tf.keras.mixed_precision.set_global_policy("float32")
+
+def training_modes(steps_per_execution=8, gpu=None):
+    """
+    The modes compare_training_modes measures. The combined "fast" mode only includes XLA on GPU hosts, where it
+    helps; on CPU it is measured on its own but left out of "fast".
+    """
+    gpu = has_gpu() if gpu is None else gpu
+    fast = {"mixed_precision": True, "steps_per_execution": steps_per_execution}
+    if gpu:
+        fast["jit_compile"] = True
+    return {
+        "default": {},
+        "jit_compile": {"jit_compile": True},
+        "mixed_precision": {"mixed_precision": True},
+        "steps_per_execution": {"steps_per_execution": steps_per_execution},
+        "fast (all)" if gpu else "fast (no XLA)": fast,
+    }
+
+def compare_training_modes(batch_size=32, steps=50, steps_per_execution=8):
+    """Measure the default path against each fast-training option and log the speedups."""
+    results = {}
+    for name, options in training_modes(steps_per_execution).items():
+        results[name] = measure_step_time(batch_size=batch_size, steps=steps, **options)
+
+    baseline = results["default"]
+    for name, step_time in results.items():
+        logging.info(f"{name:>16}: {step_time * 1000:.2f} ms/step ({baseline / step_time:.2f}x vs default)")
+    return results
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    compare_training_modes()
@@ -1,30 +1,31 @@
 # utils/gpu_monitor.py
 
-import subprocess
 import time
-from threading import Thread
 import logging
+from utils.telemetry import Telemetry, query_gpus
 
 # Function to log GPU usage
 def log_gpu_usage():
-    """Log the current GPU usage using nvidia-smi."""
-    try:
-        result = subprocess.run(['nvidia-smi'], stdout=subprocess.PIPE)
-        logging.info(result.stdout.decode())
-    except FileNotFoundError:
+    """Log the current utilization, memory and temperature of every GPU, one structured line per GPU."""
+    gpus = query_gpus()
+    if gpus is None:
         logging.warning("nvidia-smi not found. Ensure NVIDIA drivers are installed and nvidia-smi is available.")
+        return None
+    for gpu in gpus:
+        logging.info(f"GPU {gpu['index']:.0f} ({gpu['name']}): {gpu['utilization_gpu']}% utilization, "
+                     f"{gpu['memory_used_mb']}/{gpu['memory_total_mb']} MB, {gpu['temperature_c']} C")
+    return gpus
 
 # Function to monitor GPU usage during training at regular intervals
 def monitor_gpu_during_training(interval=60):
     """Monitor GPU usage at the specified interval."""
-    while True:
-        log_gpu_usage()
+    while log_gpu_usage() is not None:
         time.sleep(interval)
 
 # Function to start GPU monitoring in a separate thread
 def start_gpu_monitoring(interval=300):
-    """Start monitoring GPU usage in a separate thread."""
-    gpu_monitor_thread = Thread(target=monitor_gpu_during_training, args=(interval,))
-    gpu_monitor_thread.daemon = True  # Daemonize thread so it will not block the main program from exiting
-    gpu_monitor_thread.start()
-    return gpu_monitor_thread
+    """
+    Start sampling CPU, RSS and GPU stats in a separate (daemon) thread and return the thread.
+    Kept for existing callers; new code uses utils.telemetry.Telemetry directly.
+    """
+    return Telemetry(interval=interval).start()._thread
@@ -1,6 +1,7 @@
 import os
 import shutil
 import h5py
+import numpy as np
 
 def safe_remove(file_path):
     try:
@@ -32,5 +33,24 @@ def clear_existing_checkpoints(checkpoint_dir):
     if not os.path.exists(checkpoint_dir):
         os.makedirs(checkpoint_dir)
     for file in os.listdir(checkpoint_dir):
-        os.remove(os.path.join(checkpoint_dir, file))
+        path = os.path.join(checkpoint_dir, file)
+        # Mid-phase backups are directories
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        else:
+            os.remove(path)
     return f"Cleared existing checkpoints in {checkpoint_dir}."
+
+# Random token sequences of varying length, right-padded with 0 to max_length (token ids start at 1).
+# Without an rng they follow the global NumPy seed.
+def random_token_sequences(num_samples, vocab_size=10000, min_length=10, max_length=100, rng=None):
+    rng = rng if rng is not None else np.random.default_rng(np.random.randint(0, 2**31 - 1))
+    lengths = rng.integers(min_length, max_length + 1, num_samples)
+    tokens = rng.integers(1, vocab_size, (num_samples, max_length)).astype('int32')
+    tokens[np.arange(max_length) >= lengths[:, None]] = 0
+    return tokens
+
+# Drop the trailing columns that are padding in every row, so a batch is only as long as its longest sequence
+def trim_padding(tokens):
+    lengths = np.count_nonzero(tokens, axis=1)
+    return tokens[:, :max(int(lengths.max(initial=0)), 1)]
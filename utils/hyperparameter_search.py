@@ -0,0 +1,315 @@
+# utils/hyperparameter_search.py
+
+import os
+import json
+import time
+import shutil
+import logging
+import argparse
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+
+# Search space: name -> ("log_uniform", low, high), ("uniform", low, high) or ("choice", values)
+SEARCH_SPACE = {
+    "learning_rate": ("log_uniform", 1e-4, 1e-2),
+    "batch_size": ("choice", (16, 32, 64)),
+    "mutation_rate": ("log_uniform", 1e-3, 1e-1),
+    "crossover_rate": ("uniform", 0.3, 0.9),
+    "fitness_threshold": ("uniform", 0.5, 1.5),
+}
+# Keys of a configuration that are passed to evolve_population, the others configure training
+EVOLUTION_KEYS = ("mutation_rate", "crossover_rate", "fitness_threshold", "generations", "selection")
+
+# Per-process state of a search worker: its data and its model cache
+_worker = {}
+
+
+def sample_config(space, rng):
+    """Draw one configuration from the search space."""
+    config = {}
+    for name, (kind, *spec) in space.items():
+        if kind == "log_uniform":
+            config[name] = float(np.exp(rng.uniform(np.log(spec[0]), np.log(spec[1]))))
+        elif kind == "uniform":
+            config[name] = float(rng.uniform(spec[0], spec[1]))
+        elif kind == "choice":
+            config[name] = spec[0][rng.integers(len(spec[0]))]
+        else:
+            raise ValueError(f"Unknown distribution '{kind}' for hyperparameter '{name}'")
+    return config
+
+
+def split_config(config):
+    """Split a configuration into its training and evolution hyperparameters."""
+    evolution_params = {key: value for key, value in config.items() if key in EVOLUTION_KEYS}
+    training_params = {key: value for key, value in config.items() if key not in EVOLUTION_KEYS}
+    return training_params, evolution_params
+
+
+class ModelCache:
+    """
+    Compiled models of a worker process, reused across trials with the same architecture.
+    Building, compiling and tracing the training step dominates short trials; a cached model only has its weights
+    and optimizer state reset to the initial values and its learning rate set.
+    """
+    def __init__(self):
+        self._models = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key, build_fn, learning_rate):
+        import tensorflow as tf
+
+        if key in self._models:
+            model, initial_weights = self._models[key]
+            model.set_weights(initial_weights)
+            for variable in model.optimizer.variables:
+                variable.assign(tf.zeros_like(variable))
+            self.hits += 1
+        else:
+            model = build_fn()
+            self._models[key] = (model, model.get_weights())
+            self.misses += 1
+        model.optimizer.learning_rate.assign(learning_rate)
+        return model
+
+
+def _build_full_model():
+    import tensorflow as tf
+    from models.samvara_model import build_samvara_model
+
+    model = build_samvara_model(include_immaterial=True)
+    model.compile(optimizer=tf.keras.optimizers.Adam(), loss='categorical_crossentropy', metrics=['accuracy'])
+    return model
+
+
+def _init_worker(store_dir, num_samples, validation_split, threads):
+    """Load the search data once per worker process and limit TF to its share of the cores."""
+    import tensorflow as tf
+    from utils.dataset_store import dataset_store_exists, open_dataset_store
+
+    logging.basicConfig(level=logging.WARNING)
+    tf.config.threading.set_intra_op_parallelism_threads(threads)
+    tf.config.threading.set_inter_op_parallelism_threads(threads)
+
+    if store_dir and dataset_store_exists(store_dir):
+        store = open_dataset_store(store_dir)
+        arrays = store.take(np.arange(min(num_samples, len(store))))
+    else:
+        from utils.benchmark import synthetic_inputs
+        inputs, labels = synthetic_inputs("full", num_samples)
+        arrays = tuple(inputs) + (labels,)
+    # Like main.py: the first rows train (and are evolved), the last rows validate
+    num_train = int(len(arrays[-1]) * (1.0 - validation_split))
+    _worker["train"] = tuple(array[:num_train] for array in arrays)
+    _worker["validation"] = tuple(array[num_train:] for array in arrays)
+    _worker["models"] = ModelCache()
+
+
+def run_trial(trial_id, config, epochs, initial_epoch, trial_dir, seed):
+    """
+    Train one trial up to `epochs` epochs, resuming from its checkpoint at `initial_epoch`, and return its record.
+    The training rows are evolved with the trial's evolution hyperparameters once, on the first rung, and the
+    evolved population is kept in the trial directory for later rungs (which may run on another worker).
+    """
+    import tensorflow as tf
+    from models.microbiome_model import run_evolutionary_algorithm
+    from utils.dataset_store import dataset_store_exists, open_dataset_store
+
+    start_time = time.perf_counter()
+    training_params, evolution_params = split_config(config)
+    batch_size = int(training_params.get("batch_size", 32))
+
+    evolved_dir = os.path.join(trial_dir, "evolved")
+    if not dataset_store_exists(evolved_dir):
+        np.random.seed(seed)
+        evolved = run_evolutionary_algorithm(*_worker["train"], seed=seed, as_view=True,
+                                             evolution_params=evolution_params)
+        evolved.save(evolved_dir)
+    image, text, real, imaginary, labels = open_dataset_store(evolved_dir).take()
+    record = {"trial": trial_id, "epochs": epochs, "survivors": len(labels), "pid": os.getpid()}
+    if len(labels) < batch_size:
+        # Too few survivors to train on, the configuration is as bad as it gets
+        record.update(score=0.0, seconds=time.perf_counter() - start_time, status="failed")
+        return record
+
+    cache = _worker["models"]
+    model = cache.get("full", _build_full_model, training_params.get("learning_rate", 0.001))
+    checkpoint = tf.train.Checkpoint(model=model, optimizer=model.optimizer)
+    checkpoint_prefix = os.path.join(trial_dir, "checkpoint")
+    if initial_epoch:
+        checkpoint.read(checkpoint_prefix).expect_partial()
+
+    val_image, val_text, val_real, val_imaginary, val_labels = _worker["validation"]
+    history = model.fit([image, text, real, imaginary], labels, batch_size=batch_size, epochs=epochs,
+                        initial_epoch=initial_epoch, shuffle=True, verbose=0,
+                        validation_data=([val_image, val_text, val_real, val_imaginary], val_labels))
+    checkpoint.write(checkpoint_prefix)
+
+    record.update(score=float(history.history["val_accuracy"][-1]),
+                  val_accuracy=[float(value) for value in history.history["val_accuracy"]],
+                  seconds=time.perf_counter() - start_time, status="ok",
+                  cache_hits=cache.hits, cache_misses=cache.misses)
+    return record
+
+
+def hyperband_brackets(max_epochs, eta=3, min_epochs=1):
+    """(number of trials, epochs of the first rung) per Hyperband bracket, from most to least aggressive."""
+    s_max = int(np.floor(np.log(max_epochs / min_epochs) / np.log(eta) + 1e-9))
+    return [(int(np.ceil((s_max + 1) / (s + 1) * eta ** s)), max(min_epochs, int(round(max_epochs / eta ** s))))
+            for s in range(s_max, -1, -1)]
+
+
+class HyperparameterSearch:
+    """
+    Successive halving and Hyperband over the search space, with trials trained in parallel worker processes.
+    A rung trains every live trial for its epoch budget; only the best 1/eta (by final validation accuracy)
+    continue to the next rung with eta times the budget, the others are pruned. Promoted trials resume from their
+    checkpoint instead of starting over. Workers are spawned processes that keep their data and compiled models
+    across trials (see ModelCache).
+    """
+    def __init__(self, search_dir="search/", space=None, workers=2, eta=3, max_epochs=9, min_epochs=1,
+                 store_dir="data/store/", num_samples=2000, validation_split=0.2, seed=0):
+        self.search_dir = search_dir
+        self.space = space or SEARCH_SPACE
+        self.workers = workers
+        self.eta = eta
+        self.max_epochs = max_epochs
+        self.min_epochs = min_epochs
+        self.rng = np.random.default_rng(seed)
+        self.trials = []
+        threads = max(1, (os.cpu_count() or 1) // workers)
+        self._worker_args = (store_dir, num_samples, validation_split, threads)
+        self._executor = None
+
+    def _new_trials(self, count):
+        trials = []
+        for _ in range(count):
+            trial_id = len(self.trials)
+            trial = {"trial": trial_id, "config": sample_config(self.space, self.rng), "epochs": 0, "score": None,
+                     "status": "running", "seed": int(self.rng.integers(2**31 - 1)), "rungs": [],
+                     "dir": os.path.join(self.search_dir, f"trial_{trial_id:04d}")}
+            self.trials.append(trial)
+            trials.append(trial)
+        return trials
+
+    def _run_rung(self, trials, epochs):
+        futures = {self._executor.submit(run_trial, trial["trial"], trial["config"], epochs, trial["epochs"],
+                                         trial["dir"], trial["seed"]): trial for trial in trials}
+        for future in as_completed(futures):
+            trial = futures[future]
+            try:
+                record = future.result()
+            except Exception as e:
+                logging.error(f"Trial {trial['trial']} failed: {e}")
+                record = {"score": 0.0, "status": "failed", "error": str(e)}
+            trial["rungs"].append(record)
+            trial["epochs"] = epochs
+            trial["score"] = record["score"]
+            if record["status"] == "failed":
+                trial["status"] = "failed"
+
+    def successive_halving(self, num_trials, min_epochs=None):
+        """Run one successive halving bracket of `num_trials` new trials starting at `min_epochs` epochs."""
+        epochs = min_epochs or self.min_epochs
+        live = self._new_trials(num_trials)
+        while live:
+            logging.info(f"Rung with {len(live)} trials at {epochs} epochs")
+            self._run_rung(live, epochs)
+            live = sorted((trial for trial in live if trial["status"] != "failed"),
+                          key=lambda trial: trial["score"], reverse=True)
+            if epochs >= self.max_epochs or len(live) <= 1:
+                break
+            promoted = max(1, len(live) // self.eta)
+            for trial in live[promoted:]:
+                trial["status"] = "pruned"
+            live = live[:promoted]
+            epochs = min(epochs * self.eta, self.max_epochs)
+        for trial in live:
+            trial["status"] = "completed"
+        self._save()
+
+    def hyperband(self):
+        """Run every Hyperband bracket, from many short trials to few trials trained for max_epochs."""
+        for num_trials, min_epochs in hyperband_brackets(self.max_epochs, self.eta, self.min_epochs):
+            logging.info(f"Hyperband bracket: {num_trials} trials from {min_epochs} epochs")
+            self.successive_halving(num_trials, min_epochs)
+
+    def __enter__(self):
+        os.makedirs(self.search_dir, exist_ok=True)
+        # Spawned workers: TF does not survive a fork once initialized
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                                             initializer=_init_worker, initargs=self._worker_args)
+        return self
+
+    def __exit__(self, *exc_info):
+        self._executor.shutdown()
+        self._executor = None
+
+    def best(self):
+        """The trial with the highest score among those trained for the most epochs."""
+        candidates = [trial for trial in self.trials if trial["score"] is not None and trial["status"] != "failed"]
+        if not candidates:
+            return None
+        return max(candidates, key=lambda trial: (trial["epochs"], trial["score"]))
+
+    def _save(self):
+        with open(os.path.join(self.search_dir, "trials.json"), "w") as f:
+            json.dump(self.trials, f, indent=2)
+        best = self.best()
+        if best is not None:
+            with open(os.path.join(self.search_dir, "best_hyperparameters.json"), "w") as f:
+                json.dump(best["config"], f, indent=2)
+
+    def cleanup(self):
+        """Remove the evolved populations and checkpoints of the trials, keeping the result files."""
+        for trial in self.trials:
+            shutil.rmtree(trial["dir"], ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samvara-AI Hyperparameter Search")
+    parser.add_argument('--method', type=str, default="hyperband", choices=["hyperband", "halving"],
+                        help="Hyperband, or a single successive halving bracket of --trials trials")
+    parser.add_argument('--trials', type=int, default=27, help="Number of trials of a successive halving bracket")
+    parser.add_argument('--workers', type=int, default=2, help="Number of parallel trial processes")
+    parser.add_argument('--eta', type=int, default=3, help="Keep the best 1/eta trials at every rung")
+    parser.add_argument('--max-epochs', type=int, default=9, help="Epoch budget of the longest trials")
+    parser.add_argument('--min-epochs', type=int, default=1, help="Epoch budget of the first rung")
+    parser.add_argument('--samples', type=int, default=2000, help="Number of dataset rows used by every trial")
+    parser.add_argument('--store-dir', type=str, default="data/store/",
+                        help="Dataset store written by main.py; synthetic data is used when it does not exist")
+    parser.add_argument('--search-dir', type=str, default="search/", help="Directory of the trials and results")
+    parser.add_argument('--seed', type=int, default=0, help="Seed of the configuration sampler")
+    parser.add_argument('--keep-trials', action='store_true', help="Keep the trial checkpoints and populations")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    search = HyperparameterSearch(search_dir=args.search_dir, workers=args.workers, eta=args.eta,
+                                  max_epochs=args.max_epochs, min_epochs=args.min_epochs, store_dir=args.store_dir,
+                                  num_samples=args.samples, seed=args.seed)
+    start_time = time.perf_counter()
+    with search:
+        if args.method == "hyperband":
+            search.hyperband()
+        else:
+            search.successive_halving(args.trials)
+    if not args.keep_trials:
+        search.cleanup()
+
+    statuses = [trial["status"] for trial in search.trials]
+    trained_epochs = sum(trial["epochs"] for trial in search.trials)
+    logging.info(f"Search finished in {time.perf_counter() - start_time:.1f}s: {len(statuses)} trials, "
+                 f"{statuses.count('pruned')} pruned, {statuses.count('failed')} failed, "
+                 f"{trained_epochs} epochs trained in total")
+    best = search.best()
+    if best is not None:
+        logging.info(f"Best trial {best['trial']}: val_accuracy {best['score']:.4f} after {best['epochs']} epochs, "
+                     f"{best['config']}")
+        logging.info(f"Use it with: python main.py --hyperparameters "
+                     f"{os.path.join(args.search_dir, 'best_hyperparameters.json')}")
+
+if __name__ == "__main__":
+    main()
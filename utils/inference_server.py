@@ -0,0 +1,342 @@
+# utils/inference_server.py
+
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib import request as urllib_request
+import numpy as np
+from utils.helpers import random_token_sequences
+
+# Request fields, in the order of the full Samvara model inputs
+INPUT_KEYS = ("image", "text", "quantum_real", "quantum_imaginary")
+
+def load_samvara_model(model_path):
+    """Load a saved .keras Samvara model, including the CustomQuantumLayer."""
+    import tensorflow as tf
+    from models.immaterial_layers import CustomQuantumLayer
+    from models.samvara_model import SamvaraModel
+
+    custom_objects = {"CustomQuantumLayer": CustomQuantumLayer, "SamvaraModel": SamvaraModel}
+    return tf.keras.models.load_model(model_path, custom_objects=custom_objects, compile=False)
+
+def make_predict_fn(model):
+    """
+    Wrap the model in a tf.function with a batch-size-agnostic signature, so batches of any size
+    reuse one traced graph instead of retracing per size.
+    """
+    import tensorflow as tf
+
+    signature = [tf.TensorSpec(shape=model_input.shape, dtype=model_input.dtype) for model_input in model.inputs]
+
+    @tf.function(input_signature=signature)
+    def serve(*inputs):
+        return model(list(inputs), training=False)
+
+    dtypes = [model_input.dtype.as_numpy_dtype for model_input in model.inputs]
+    predict = lambda inputs: serve(*(np.asarray(x, dtype=dtype) for x, dtype in zip(inputs, dtypes))).numpy()
+    # Input shapes (None for any size) against which requests are validated
+    predict.input_shapes = [list(model_input.shape) for model_input in model.inputs]
+    return predict
+
+def load_predict_fn(model_path, cache_dir=None):
+    """
+    Predict function of a saved .keras model. With `cache_dir`, the traced function is restored from the persistent
+    inference cache when the model file is unchanged, skipping the model load and the tracing.
+    """
+    if not cache_dir:
+        return make_predict_fn(load_samvara_model(model_path))
+    from utils.model_cache import InferenceCache, cache_key, file_fingerprint
+
+    key = cache_key(model_file=file_fingerprint(model_path))
+    return InferenceCache(cache_dir).get_or_build(key, lambda: load_samvara_model(model_path), description=model_path)
+
+
+def _pad_to_longest(sequences):
+    """Right-pad token sequence batches of different lengths with 0, so they can be merged into one batch."""
+    length = max(x.shape[1] for x in sequences)
+    return [np.pad(x, ((0, 0), (0, length - x.shape[1]))) for x in sequences]
+
+
+class DynamicBatcher:
+    """
+    Merge concurrent requests into batches for one predict function.
+    A batch is run as soon as it holds `max_batch_size` samples or `max_wait_ms` passed since its first request,
+    which bounds the latency added by batching while keeping batches large under load.
+    """
+    def __init__(self, predict_fn, max_batch_size=64, max_wait_ms=5, latency_window=10000):
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        # Request that did not fit in the previous batch; it starts the next one
+        self._pending = None
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=latency_window)
+        self._batch_sizes = deque(maxlen=latency_window)
+        self._counts = {"requests": 0, "samples": 0, "batches": 0, "errors": 0}
+        self._start_time = time.time()
+        self._running = True
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def submit(self, inputs):
+        """Queue one request (a list of the four input arrays, each with a batch dimension) and return a Future."""
+        future = Future()
+        self._queue.put((inputs, future, time.perf_counter()))
+        return future
+
+    def predict(self, inputs, timeout=None):
+        return self.submit(inputs).result(timeout)
+
+    def _collect_batch(self):
+        """
+        Block for the first request, then gather more until the batch is full or the wait time is over.
+        A request that would take the batch over `max_batch_size` is kept for the next batch; a single request
+        larger than `max_batch_size` is run on its own.
+        """
+        if self._pending is not None:
+            first, self._pending = self._pending, None
+        else:
+            first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        num_samples = len(first[0][0])
+        deadline = time.perf_counter() + self.max_wait
+        while num_samples < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._running = False
+                break
+            if num_samples + len(item[0][0]) > self.max_batch_size:
+                self._pending = item
+                break
+            batch.append(item)
+            num_samples += len(item[0][0])
+        return batch
+
+    def _run(self):
+        while self._running or self._pending is not None:
+            batch = self._collect_batch()
+            if batch is None:
+                return
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    with self._lock:
+                        self._counts["errors"] += 1
+                    continue
+                # One bad request must not fail the others merged with it: run each request on its own
+                logging.warning(f"Batch of {len(batch)} requests failed ({e}), running them one at a time")
+                for item in batch:
+                    try:
+                        self._run_batch([item])
+                    except Exception as request_error:
+                        item[1].set_exception(request_error)
+                        with self._lock:
+                            self._counts["errors"] += 1
+
+    def _run_batch(self, batch):
+        """Run the merged requests of `batch` and split the output back into one result per request."""
+        sizes = [len(inputs[0]) for inputs, _, _ in batch]
+        merged = [np.concatenate(_pad_to_longest([inputs[i] for inputs, _, _ in batch]) if key == "text"
+                                 else [inputs[i] for inputs, _, _ in batch])
+                  for i, key in enumerate(INPUT_KEYS)]
+        outputs = self.predict_fn(merged)
+        if len(outputs) != sum(sizes):
+            raise ValueError(f"Expected {sum(sizes)} predictions, got {len(outputs)}")
+
+        offsets = np.cumsum([0] + sizes)
+        finished = time.perf_counter()
+        for (_, future, enqueued), start, stop in zip(batch, offsets[:-1], offsets[1:]):
+            future.set_result(outputs[start:stop])
+        with self._lock:
+            self._latencies.extend(finished - enqueued for _, _, enqueued in batch)
+            self._batch_sizes.append(int(offsets[-1]))
+            self._counts["requests"] += len(batch)
+            self._counts["samples"] += int(offsets[-1])
+            self._counts["batches"] += 1
+
+    def metrics(self):
+        """Throughput since start, and batch size and latency percentiles over the recent requests."""
+        with self._lock:
+            latencies = np.array(self._latencies) * 1000
+            batch_sizes = np.array(self._batch_sizes)
+            metrics = dict(self._counts)
+        elapsed = time.time() - self._start_time
+        metrics["samples_per_sec"] = metrics["samples"] / elapsed if elapsed > 0 else 0.0
+        metrics["mean_batch_size"] = float(batch_sizes.mean()) if len(batch_sizes) else 0.0
+        for percentile in (50, 90, 99):
+            metrics[f"p{percentile}_latency_ms"] = float(np.percentile(latencies, percentile)) if len(latencies) else 0.0
+        return metrics
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+def parse_request(payload, input_shapes=None):
+    """
+    Turn a JSON request into the list of model inputs; single samples get a batch dimension.
+    With `input_shapes` (the model input shapes, None for any size) each input is checked for its rank and sample
+    shape, and all inputs for one batch size, so a malformed request is rejected before it is batched.
+    """
+    if not isinstance(payload, dict):
+        raise ValueError("The request must be a JSON object")
+    inputs = []
+    for key in INPUT_KEYS:
+        if key not in payload:
+            raise ValueError(f"Missing input: {key}")
+        inputs.append(np.asarray(payload[key], dtype=np.float32))
+    # A single image has rank 3, batched images rank 4
+    if inputs[0].ndim == 3:
+        inputs = [x[np.newaxis] for x in inputs]
+    if input_shapes is not None:
+        for key, x, shape in zip(INPUT_KEYS, inputs, input_shapes):
+            if x.ndim != len(shape) or any(size is not None and size != dim for size, dim in zip(shape[1:],
+                                                                                                  x.shape[1:])):
+                expected = "x".join("?" if size is None else str(size) for size in shape[1:])
+                raise ValueError(f"Input {key} has shape {x.shape[1:]}, expected samples of shape {expected}")
+    batch_sizes = {len(x) if x.ndim else 0 for x in inputs}
+    if len(batch_sizes) != 1 or 0 in batch_sizes:
+        raise ValueError(f"Inputs must have one non-zero batch size, got {sorted(batch_sizes)}")
+    return inputs
+
+
+def make_handler(batcher, request_timeout=30):
+    class InferenceHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, body):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/metrics":
+                self._send_json(200, batcher.metrics())
+            elif self.path == "/health":
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._send_json(404, {"error": f"Unknown path {self.path}"})
+                return
+            try:
+                payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                inputs = parse_request(payload, getattr(batcher.predict_fn, "input_shapes", None))
+            except ValueError as e:
+                self._send_json(400, {"error": str(e)})
+                return
+            try:
+                predictions = batcher.predict(inputs, timeout=request_timeout)
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+                return
+            self._send_json(200, {"predictions": predictions.tolist()})
+
+        def log_message(self, format, *args):
+            logging.debug(format % args)
+
+    return InferenceHandler
+
+
+class InferenceHTTPServer(ThreadingHTTPServer):
+    # The default listen backlog of 5 resets connections under concurrent load
+    request_queue_size = 1024
+
+
+def serve(model_path, host="0.0.0.0", port=8501, max_batch_size=64, max_wait_ms=5, cache_dir=None):
+    """Serve a saved model over HTTP: POST /predict, GET /metrics and GET /health."""
+    predict_fn = load_predict_fn(model_path, cache_dir)
+    batcher = DynamicBatcher(predict_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    server = InferenceHTTPServer((host, port), make_handler(batcher))
+    logging.info(f"Serving {model_path} on {host}:{port} (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        batcher.close()
+
+
+def generate_load(url, num_requests=1000, concurrency=32, samples_per_request=1):
+    """Send random requests concurrently to a running server and return the client-side throughput and latency."""
+    def random_request():
+        return {
+            "image": np.random.random((samples_per_request, 32, 32, 3)).tolist(),
+            "text": random_token_sequences(samples_per_request).tolist(),
+            "quantum_real": np.random.random((samples_per_request, 2)).tolist(),
+            "quantum_imaginary": np.random.random((samples_per_request, 2)).tolist(),
+        }
+
+    # Requests are prepared up front, so JSON encoding does not limit the measured throughput
+    bodies = [json.dumps(random_request()).encode() for _ in range(min(num_requests, 64))]
+
+    def send(i):
+        http_request = urllib_request.Request(f"{url}/predict", data=bodies[i % len(bodies)],
+                                              headers={"Content-Type": "application/json"})
+        start_time = time.perf_counter()
+        with urllib_request.urlopen(http_request) as response:
+            response.read()
+        return time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        latencies = np.array(list(executor.map(send, range(num_requests)))) * 1000
+    elapsed = time.perf_counter() - start_time
+    return {
+        "requests": num_requests,
+        "concurrency": concurrency,
+        "samples_per_sec": num_requests * samples_per_request / elapsed,
+        "p50_latency_ms": float(np.percentile(latencies, 50)),
+        "p99_latency_ms": float(np.percentile(latencies, 99)),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samvara-AI Inference Server")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="Serve a saved model")
+    serve_parser.add_argument('--model', type=str, required=True, help="Path of the saved .keras model")
+    serve_parser.add_argument('--host', type=str, default="0.0.0.0")
+    serve_parser.add_argument('--port', type=int, default=8501)
+    serve_parser.add_argument('--max-batch-size', type=int, default=64)
+    serve_parser.add_argument('--max-wait-ms', type=float, default=5)
+    serve_parser.add_argument('--model-cache', type=str, default="cache/models/",
+                              help="Directory of the persistent inference cache, empty to disable it")
+
+    load_parser = subparsers.add_parser("load", help="Generate load against a running server")
+    load_parser.add_argument('--url', type=str, default="http://localhost:8501")
+    load_parser.add_argument('--requests', type=int, default=1000)
+    load_parser.add_argument('--concurrency', type=int, default=32)
+    load_parser.add_argument('--samples-per-request', type=int, default=1)
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "serve":
+        serve(args.model, args.host, args.port, args.max_batch_size, args.max_wait_ms, args.model_cache)
+    else:
+        results = generate_load(args.url, args.requests, args.concurrency, args.samples_per_request)
+        print(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
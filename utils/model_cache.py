@@ -0,0 +1,205 @@
+# utils/model_cache.py
+
+import os
+import json
+import time
+import fcntl
+import shutil
+import hashlib
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+import numpy as np
+
+CACHE_DIR = "cache/models/"
+# Size bound of the cache; beyond it the least recently used entries are evicted
+MAX_CACHE_MB = 1024
+INDEX_FILENAME = "index.json"
+LOCK_FILENAME = ".lock"
+# Sources of the model code: a change to any of them invalidates every entry
+MODEL_SOURCES = ("models/material_layers.py", "models/immaterial_layers.py", "models/samvara_model.py")
+
+
+def file_fingerprint(path):
+    """Identity of a model or weights file in a cache key: absolute path, size and modification time."""
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def source_fingerprint(paths=MODEL_SOURCES):
+    """Hash of the model source files, so functions traced from older code are never restored."""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(os.path.join(root, path), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def cache_key(**parts):
+    """
+    Key of a cache entry: a hash of what identifies the model (its builder and config, or the file it is loaded
+    from) and its input signature, together with the model sources and the TensorFlow version.
+    """
+    import tensorflow as tf
+
+    parts = dict(parts, sources=source_fingerprint(), tensorflow=tf.__version__)
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()[:24]
+
+
+def _predict_fn(module, signature):
+    # The closure holds the module, which owns the variables the serving function reads
+    dtypes = [np.dtype(spec["dtype"]) for spec in signature]
+    predict = lambda inputs: module.serve(*(np.asarray(x, dtype=dtype) for x, dtype in zip(inputs, dtypes))).numpy()
+    predict.input_shapes = [spec["shape"] for spec in signature]
+    return predict
+
+
+class InferenceCache:
+    """
+    On-disk cache of traced inference functions, shared by all processes using the same directory.
+    An entry is a minimal SavedModel holding only the model variables and one serving function. Restoring it
+    skips building or loading the Keras model and tracing its predict function, which is most of the cold start
+    of a short inference job (the LSTM alone registers a fused and a standard kernel function on every build).
+    Only inference is served from the cache. Training graphs are not cached, since Keras retraces them for every
+    model object, so training and hyperparameter search trials do not use it.
+    """
+    def __init__(self, directory=CACHE_DIR, max_mb=MAX_CACHE_MB):
+        self.directory = directory
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    @contextmanager
+    def _locked(self):
+        """Hold an exclusive lock on the cache directory, shared by every process using it."""
+        with open(os.path.join(self.directory, LOCK_FILENAME), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read_index(self):
+        path = os.path.join(self.directory, INDEX_FILENAME)
+        if not os.path.exists(path):
+            return {}
+        with open(path) as f:
+            return json.load(f)
+
+    def _write_index(self, index):
+        # Written to a temporary file and renamed, so concurrent readers never see a partial index
+        temp_path = os.path.join(self.directory, f".{INDEX_FILENAME}.{os.getpid()}.tmp")
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, os.path.join(self.directory, INDEX_FILENAME))
+
+    def get(self, key):
+        """The cached predict function of `key`, or None."""
+        import tensorflow as tf
+
+        # Loaded under the lock, so another process cannot evict the entry while it is read
+        with self._locked():
+            index = self._read_index()
+            path = os.path.join(self.directory, key)
+            if key not in index or not os.path.isdir(path):
+                return None
+            restored = tf.saved_model.load(path)
+            index[key]["last_used"] = time.time()
+            self._write_index(index)
+        return _predict_fn(restored, index[key]["signature"])
+
+    def put(self, key, model, description=""):
+        """Trace the inference function of `model`, store it under `key` and return it as a predict function."""
+        import tensorflow as tf
+
+        signature = [{"name": model_input.name.split(":")[0], "shape": list(model_input.shape),
+                      "dtype": model_input.dtype.name} for model_input in model.inputs]
+        module = tf.Module()
+        module.model_variables = model.variables
+        module.serve = tf.function(lambda *inputs: model(list(inputs), training=False),
+                                   input_signature=[tf.TensorSpec(spec["shape"], spec["dtype"], name=spec["name"])
+                                                    for spec in signature])
+
+        # Saved under a temporary name outside the lock and renamed under it, so a partially written entry is never
+        # restored and the index update of another process is never lost. The name is unique per process and
+        # thread, so concurrent puts of the same key never write into the same directory
+        path = os.path.join(self.directory, key)
+        temp_path = os.path.join(self.directory, f".{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tf.saved_model.save(module, temp_path)
+        with self._locked():
+            shutil.rmtree(path, ignore_errors=True)
+            os.replace(temp_path, path)
+            index = self._read_index()
+            size = sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path)
+                       for name in names)
+            index[key] = {"description": description, "bytes": size, "created": time.time(),
+                          "last_used": time.time(), "signature": signature}
+            self._evict(index, keep=key)
+            self._write_index(index)
+        return _predict_fn(module, signature)
+
+    def get_or_build(self, key, build_fn, description=""):
+        """The predict function of `key`: restored from the cache, or built with `build_fn()` and cached."""
+        start_time = time.perf_counter()
+        predict = self.get(key)
+        if predict is not None:
+            self.hits += 1
+            logging.info(f"Model cache hit for {description or key}, restored in "
+                         f"{time.perf_counter() - start_time:.2f}s")
+            return predict
+        self.misses += 1
+        predict = self.put(key, build_fn(), description)
+        logging.info(f"Model cache miss for {description or key}, built and cached in "
+                     f"{time.perf_counter() - start_time:.2f}s")
+        return predict
+
+    def _evict(self, index, keep=None):
+        """Remove the least recently used entries until the cache fits in its size bound. Call under the lock."""
+        total = sum(entry["bytes"] for entry in index.values())
+        for key in sorted(index, key=lambda key: index[key]["last_used"]):
+            if total <= self.max_bytes:
+                break
+            if key == keep:
+                continue
+            shutil.rmtree(os.path.join(self.directory, key), ignore_errors=True)
+            total -= index.pop(key)["bytes"]
+            logging.info(f"Evicted model cache entry {key}")
+
+    def entries(self):
+        """Cache entries from most to least recently used."""
+        index = self._read_index()
+        return sorted(({"key": key, **entry} for key, entry in index.items()), key=lambda entry: -entry["last_used"])
+
+    def clear(self):
+        with self._locked():
+            for name in os.listdir(self.directory):
+                if name == LOCK_FILENAME:
+                    continue
+                path = os.path.join(self.directory, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+                else:
+                    os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Samvara-AI Model Cache")
+    parser.add_argument('--dir', type=str, default=CACHE_DIR, help="Directory of the cache")
+    parser.add_argument('--clear', action='store_true', help="Remove every entry")
+    args = parser.parse_args()
+
+    cache = InferenceCache(args.dir)
+    if args.clear:
+        cache.clear()
+        print(f"Cleared {args.dir}")
+        return
+    for entry in cache.entries():
+        print(f"{entry['key']}  {entry['bytes'] / (1024 * 1024):8.1f} MB  "
+              f"last used {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(entry['last_used']))}  "
+              f"{entry['description']}")
+
+if __name__ == "__main__":
+    main()
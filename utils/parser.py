@@ -1,6 +1,13 @@
 import argparse
+from utils.augmentation import AUGMENTATION_MODES
 
-def parse_arguments():
+def non_negative_int(value):
+    number = int(value)
+    if number < 0:
+        raise argparse.ArgumentTypeError(f"expected a non-negative integer, got {value}")
+    return number
+
+def parse_arguments(argv=None):
     # Create argument parser
     parser = argparse.ArgumentParser(description="Samvara-AI Debugger")
 
@@ -10,7 +17,65 @@ def parse_arguments():
     # Add screen name argument
     parser.add_argument('-s', '--screen', type=str, help="Specify screen name")
 
+    # Add fresh-start argument (by default an interrupted run resumes from its checkpoints)
+    parser.add_argument('--fresh', action='store_true', help="Discard checkpoints and training state and start over")
+
+    # Add phase-2 warm-start arguments
+    parser.add_argument('--material-mode', type=str, default="train", choices=["train", "freeze", "partial", "layerwise"],
+                        help="How the warm-started material layers train in phase 2")
+    parser.add_argument('--unfreeze-layers', type=non_negative_int, default=2,
+                        help="Number of top material layers to unfreeze with --material-mode partial")
+    parser.add_argument('--material-lr-multiplier', type=float, default=0.1,
+                        help="Learning rate multiplier for the material layers with --material-mode layerwise")
+
+    # Run the evolutionary algorithm as a producer that feeds phase 2 while it trains
+    parser.add_argument('--overlap-evolution', action='store_true',
+                        help="Stream evolved generations into phase 2 training instead of evolving first")
+
+    # Image augmentation in the input pipeline, inside the model, or off
+    parser.add_argument('--augmentation', type=str, default="none", choices=AUGMENTATION_MODES,
+                        help="Run the image augmentation as a tf.data stage, as the first model layers, or not at all "
+                             "(the default)")
+
+    # Score the evolution with the quantum outcomes or with the immaterial model
+    parser.add_argument('--fitness', type=str, default="quantum", choices=["quantum", "model"],
+                        help="Fitness function of the evolutionary phase; \"model\" scores with the immaterial model")
+    parser.add_argument('--selection', type=str, default=None, choices=["tournament", "rank", "threshold"],
+                        help="Parent selection refilling the slots of dropped individuals (default: tournament, "
+                             "\"threshold\" only drops them)")
+
+    # Use hyperparameters found by utils/hyperparameter_search.py
+    parser.add_argument('--hyperparameters', type=str, default=None,
+                        help="JSON file of tuned hyperparameters, e.g. search/best_hyperparameters.json")
+
+    # Add telemetry arguments
+    parser.add_argument('--telemetry-file', type=str, default="logs/telemetry.jsonl",
+                        help="JSON-lines file the telemetry records are appended to")
+    parser.add_argument('--telemetry-port', type=int, default=None,
+                        help="Serve the latest telemetry values at http://127.0.0.1:PORT/metrics")
+    parser.add_argument('--telemetry-input-wait', action='store_true',
+                        help="Also record the input pipeline wait per batch (replaces the Keras train function)")
+
+    # Add profiling arguments
+    parser.add_argument('--profile', action='store_true',
+                        help="Short profiling run: profiler traces, per-layer and function timings and a report")
+    parser.add_argument('--profile-batches', type=str, default="10,20",
+                        help="First and last batch of the traced window in each training phase, e.g. 10,20")
+
+    # Add opt-in fast-training arguments
+    parser.add_argument('--mixed-precision', action='store_true', help="Train with a mixed precision policy")
+    parser.add_argument('--jit-compile', action='store_true', help="Compile the training step with XLA")
+    parser.add_argument('--steps-per-execution', type=int, default=1,
+                        help="Number of batches to run per training function call")
+
+    # Add distributed training arguments
+    parser.add_argument('--distributed', type=str, default="none", choices=["none", "mirrored", "multi_worker"],
+                        help="Data-parallel training strategy; multi_worker reads the cluster from TF_CONFIG "
+                             "(see python -m utils.distributed for a local launcher)")
+    parser.add_argument('--cpu-replicas', type=int, default=0,
+                        help="Without GPUs, split the CPU into this many replicas for --distributed mirrored")
+
     # Add help argument (note: argparse automatically handles --help)
 
     # Parse arguments and return them
-    return parser.parse_args()
+    return parser.parse_args(argv)
@@ -0,0 +1,212 @@
+# utils/profiling.py
+
+import os
+import re
+import glob
+import json
+import time
+import logging
+import functools
+import threading
+from collections import defaultdict
+import numpy as np
+import tensorflow as tf
+
+# Trace events of TF ops are named "<op name>:<op type>"; the rest are executor and runtime bookkeeping
+OP_EVENT = re.compile(r"^(?P<name>[^:\s]+):(?P<type>[A-Za-z0-9_]+)$")
+
+
+class FunctionTimer:
+    """Collect wall-clock timings of Python functions, either wrapped directly or patched into a module."""
+    def __init__(self):
+        self.timings = defaultdict(list)
+        self._lock = threading.Lock()
+        self._patched = []
+
+    def wrap(self, function, name=None):
+        name = name or f"{function.__module__}.{function.__qualname__}"
+
+        @functools.wraps(function)
+        def timed(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.timings[name].append(time.perf_counter() - start_time)
+
+        return timed
+
+    def instrument(self, module, names):
+        """
+        Replace module-level functions by timed wrappers. Calls through the module globals are timed too,
+        e.g. evolve_population calling mutate_microbiomes. Only affects the current process.
+        """
+        for name in names:
+            original = getattr(module, name)
+            self._patched.append((module, name, original))
+            setattr(module, name, self.wrap(original))
+
+    def restore(self):
+        for module, name, original in reversed(self._patched):
+            setattr(module, name, original)
+        self._patched = []
+
+    def report(self):
+        """Per function: number of calls, total, mean and max time, sorted by total time."""
+        with self._lock:
+            timings = {name: np.array(values) for name, values in self.timings.items()}
+        rows = [{"function": name, "calls": len(values), "total_s": float(values.sum()),
+                 "mean_ms": float(values.mean() * 1000), "max_ms": float(values.max() * 1000)}
+                for name, values in timings.items()]
+        return sorted(rows, key=lambda row: row["total_s"], reverse=True)
+
+
+def _instrumented_layers(layer, path=""):
+    """Yield (path, layer) for every layer below `layer`, descending into nested models."""
+    for sublayer in getattr(layer, "layers", []):
+        if isinstance(sublayer, tf.keras.layers.InputLayer):
+            continue
+        sublayer_path = f"{path}/{sublayer.name}" if path else sublayer.name
+        yield sublayer_path, sublayer
+        yield from _instrumented_layers(sublayer, sublayer_path)
+
+
+def _median_time(function, repeats):
+    tf.nest.map_structure(lambda t: t.numpy() if hasattr(t, "numpy") else t, function())  # Trace and warm up
+    latencies = []
+    for _ in range(repeats):
+        start_time = time.perf_counter()
+        tf.nest.map_structure(lambda t: t.numpy() if hasattr(t, "numpy") else t, function())
+        latencies.append(time.perf_counter() - start_time)
+    return float(np.median(latencies))
+
+
+def profile_layers(model, inputs, repeats=10):
+    """
+    Forward and backward time of every layer (nested models included, their children listed below them).
+    One eager forward pass captures the actual inputs of each layer; each layer is then timed on its own as
+    a compiled forward pass and a compiled forward + gradient pass, backward being the difference.
+    """
+    captured = {}
+    layers = list(_instrumented_layers(model))
+    for path, layer in layers:
+        original_call = layer.call
+
+        def capture(*args, _path=path, _call=original_call, **kwargs):
+            captured.setdefault(_path, (args, kwargs))
+            return _call(*args, **kwargs)
+
+        layer.call = capture
+    try:
+        model(inputs, training=True)
+    finally:
+        for _, layer in layers:
+            del layer.call
+
+    rows = []
+    for path, layer in layers:
+        if path not in captured:
+            continue
+        args, kwargs = captured[path]
+        float_args = [t for t in tf.nest.flatten(args) if tf.is_tensor(t) and t.dtype.is_floating]
+
+        forward = tf.function(lambda: layer.call(*args, **kwargs))
+
+        @tf.function
+        def forward_backward():
+            with tf.GradientTape() as tape:
+                tape.watch(float_args)
+                outputs = layer.call(*args, **kwargs)
+                loss = tf.add_n([tf.reduce_sum(tf.cast(output, tf.float32)) for output in tf.nest.flatten(outputs)])
+            gradients = tape.gradient(loss, layer.trainable_variables + float_args)
+            return [gradient for gradient in gradients if gradient is not None]
+
+        forward_time = _median_time(forward, repeats)
+        backward_time = max(_median_time(forward_backward, repeats) - forward_time, 0.0)
+        rows.append({"layer": path, "class": layer.__class__.__name__, "params": int(layer.count_params()),
+                     "forward_ms": forward_time * 1000, "backward_ms": backward_time * 1000})
+    return rows
+
+
+def trace_callback(log_dir, profile_batches=(10, 20)):
+    """TensorBoard callback capturing a profiler trace of the given (first, last) batch window into log_dir."""
+    return tf.keras.callbacks.TensorBoard(log_dir=log_dir, profile_batch=profile_batches, histogram_freq=0,
+                                          write_graph=False, update_freq="epoch")
+
+
+def summarize_trace(log_dir, top=20):
+    """
+    Aggregate the op events of the profiler traces (.xplane.pb) under log_dir: the top ops by total time,
+    time per op type, and host (CPU op) vs device (GPU kernel) time.
+    """
+    from tensorflow.tsl.profiler.protobuf import xplane_pb2
+
+    op_times = defaultdict(lambda: [0, 0.0, ""])
+    type_times = defaultdict(float)
+    host_ms = device_ms = 0.0
+    paths = glob.glob(os.path.join(log_dir, "**", "*.xplane.pb"), recursive=True)
+    for path in paths:
+        space = xplane_pb2.XSpace()
+        with open(path, "rb") as f:
+            space.ParseFromString(f.read())
+        for plane in space.planes:
+            on_device = plane.name.startswith("/device:")
+            for line in plane.lines:
+                # Device planes: kernel time on the streams; host plane: op time on the executor threads
+                if on_device and not line.name.startswith("Stream"):
+                    continue
+                for event in line.events:
+                    name = plane.event_metadata[event.metadata_id].name
+                    duration_ms = event.duration_ps / 1e9
+                    if on_device:
+                        device_ms += duration_ms
+                        key, op_type = name, "kernel"
+                    else:
+                        match = OP_EVENT.match(name)
+                        if match is None:
+                            continue
+                        host_ms += duration_ms
+                        key, op_type = match.group("name"), match.group("type")
+                    op_times[key][0] += 1
+                    op_times[key][1] += duration_ms
+                    op_times[key][2] = op_type
+                    type_times[op_type] += duration_ms
+
+    top_ops = sorted(op_times.items(), key=lambda item: item[1][1], reverse=True)[:top]
+    return {
+        "trace_files": paths,
+        "host_ms": host_ms,
+        "device_ms": device_ms,
+        "top_ops": [{"op": name, "type": op_type, "count": count, "total_ms": total}
+                    for name, (count, total, op_type) in top_ops],
+        "op_types": dict(sorted(type_times.items(), key=lambda item: item[1], reverse=True)[:top]),
+    }
+
+
+def log_report(report):
+    """Log the consolidated profile report as readable tables."""
+    for phase, sections in report.get("phases", {}).items():
+        trace = sections.get("trace")
+        if trace:
+            logging.info(f"[{phase}] host op time {trace['host_ms']:.1f} ms, device kernel time "
+                         f"{trace['device_ms']:.1f} ms in the traced steps. Top ops:")
+            for row in trace["top_ops"][:10]:
+                logging.info(f"  {row['total_ms']:10.2f} ms {row['count']:6d}x  {row['type']:<30} {row['op']}")
+        if sections.get("layers"):
+            logging.info(f"[{phase}] per-layer forward / backward time:")
+            for row in sections["layers"]:
+                logging.info(f"  {row['forward_ms']:9.3f} ms / {row['backward_ms']:9.3f} ms  "
+                             f"{row['class']:<22} {row['layer']}")
+    if report.get("functions"):
+        logging.info("Function timings:")
+        for row in report["functions"]:
+            logging.info(f"  {row['total_s']:9.3f} s total, {row['calls']:5d} calls, {row['mean_ms']:9.2f} ms mean  "
+                         f"{row['function']}")
+
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"Profile report written to {path}")
@@ -0,0 +1,200 @@
+# utils/telemetry.py
+
+import os
+import json
+import time
+import shutil
+import logging
+import resource
+import threading
+import subprocess
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Fields of the structured nvidia-smi query, in query order
+GPU_FIELDS = ("index", "name", "utilization_gpu", "utilization_memory", "memory_used_mb", "memory_total_mb",
+              "temperature_c")
+GPU_QUERY = "index,name,utilization.gpu,utilization.memory,memory.used,memory.total,temperature.gpu"
+
+
+class RingBuffer:
+    """Fixed-capacity, thread-safe record buffer: once full, the oldest records are dropped."""
+    def __init__(self, capacity=10000):
+        self._records = deque(maxlen=capacity)
+        self._lock = threading.Lock()
+
+    def append(self, record):
+        with self._lock:
+            self._records.append(record)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self._records)
+
+    def __len__(self):
+        return len(self._records)
+
+
+def rss_mb():
+    """Current resident set size of this process in MB (peak RSS where /proc is not available)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def query_gpus(timeout=10):
+    """Query per-GPU utilization, memory and temperature from nvidia-smi; None if nvidia-smi is unavailable."""
+    if shutil.which("nvidia-smi") is None:
+        return None
+    try:
+        result = subprocess.run(["nvidia-smi", f"--query-gpu={GPU_QUERY}", "--format=csv,noheader,nounits"],
+                                stdout=subprocess.PIPE, stderr=subprocess.PIPE, timeout=timeout, check=True)
+    except (subprocess.SubprocessError, OSError) as e:
+        logging.warning(f"nvidia-smi query failed: {e}")
+        return None
+    gpus = []
+    for line in result.stdout.decode().strip().splitlines():
+        values = [value.strip() for value in line.split(",")]
+        gpu = {}
+        for field, value in zip(GPU_FIELDS, values):
+            try:
+                gpu[field] = value if field == "name" else float(value)
+            except ValueError:  # "[N/A]" on GPUs that do not report a field
+                gpu[field] = None
+        gpus.append(gpu)
+    return gpus
+
+
+class Telemetry:
+    """
+    Structured telemetry: a background sampler records process CPU utilization, RSS and (optionally) GPU stats
+    every `interval` seconds, and utils.telemetry_callback.TelemetryCallback records per-batch step
+    and input wait times.
+    Records go to a ring buffer; `export_jsonl` appends the new ones to a metrics file and `serve` exposes
+    the latest values as a Prometheus-style text endpoint.
+    With gpu=None GPU sampling is enabled when nvidia-smi is available.
+    """
+    def __init__(self, capacity=10000, interval=10.0, gpu=None, output_path=None):
+        self.buffer = RingBuffer(capacity)
+        self.interval = interval
+        self.gpu = shutil.which("nvidia-smi") is not None if gpu is None else gpu
+        self.output_path = output_path
+        self.latest = {}
+        self._sequence = 0
+        self._exported_sequence = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._server = None
+        self._last_cpu_time = sum(os.times()[:2])
+        self._last_wall_time = time.perf_counter()
+
+    def record(self, kind, **fields):
+        """Add one record of the given kind; numeric fields also update the latest values for the endpoint."""
+        with self._lock:
+            self._sequence += 1
+            record = {"seq": self._sequence, "time": time.time(), "kind": kind, **fields}
+            # Steps and epochs are labelled by phase, GPU samples by GPU index
+            if "phase" in fields:
+                label = f'phase="{fields["phase"]}"'
+            elif kind == "gpu":
+                label = f'gpu="{int(fields["index"])}"'
+            else:
+                label = None
+            for key, value in fields.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    self.latest[(kind, label, key)] = value
+        self.buffer.append(record)
+        return record
+
+    def sample(self):
+        """Record one system sample: process CPU utilization since the last sample, RSS and GPU stats."""
+        cpu_time = sum(os.times()[:2])
+        wall_time = time.perf_counter()
+        elapsed = wall_time - self._last_wall_time
+        cpu_percent = 100.0 * (cpu_time - self._last_cpu_time) / elapsed if elapsed > 0 else 0.0
+        self._last_cpu_time, self._last_wall_time = cpu_time, wall_time
+        record = self.record("system", cpu_percent=cpu_percent, rss_mb=rss_mb())
+
+        if self.gpu:
+            gpus = query_gpus()
+            if gpus is None:
+                logging.warning("GPU telemetry disabled, nvidia-smi is not available.")
+                self.gpu = False
+            for gpu in gpus or []:
+                self.record("gpu", **gpu)
+        return record
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.sample()
+
+    def start(self):
+        """Start the background sampler (a daemon thread, so it never blocks the program from exiting)."""
+        self.sample()
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and the endpoint, and export the remaining records."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+        if self.output_path:
+            self.export_jsonl(self.output_path)
+
+    def export_jsonl(self, path):
+        """Append the records added since the last export to a JSON-lines file. Returns the number written."""
+        records = [record for record in self.buffer.snapshot() if record["seq"] > self._exported_sequence]
+        if not records:
+            return 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "a") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+        self._exported_sequence = records[-1]["seq"]
+        return len(records)
+
+    def prometheus_text(self):
+        """The latest value of every numeric field in the Prometheus text exposition format."""
+        with self._lock:
+            latest = dict(self.latest)
+        lines = []
+        for (kind, label, key), value in sorted(latest.items(), key=lambda item: str(item[0])):
+            labels = f"{{{label}}}" if label is not None else ""
+            lines.append(f"samvara_{kind}_{key}{labels} {value}")
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port=9400, host="127.0.0.1"):
+        """Serve GET /metrics on a local port from a daemon thread."""
+        telemetry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = telemetry.prometheus_text().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logging.debug(format % args)
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        server_thread = threading.Thread(target=self._server.serve_forever)
+        server_thread.daemon = True
+        server_thread.start()
+        logging.info(f"Serving telemetry on http://{host}:{port}/metrics")
+        return self._server
@@ -0,0 +1,112 @@
+# utils/telemetry_callback.py
+
+import time
+import logging
+import numpy as np
+import tensorflow as tf
+
+# Private Keras model attributes the input wait measurement depends on
+INPUT_WAIT_MODEL_ATTRIBUTES = ("_steps_per_execution", "_train_counter", "_cluster_coordinator")
+
+
+class TelemetryCallback(tf.keras.callbacks.Callback):
+    """
+    Record per-batch step time of a `fit` phase, and an epoch summary.
+    With measure_input_wait=True the input pipeline wait is recorded too: Keras fetches the next batch inside the
+    compiled train function, so the callback replaces it with one that fetches the batch eagerly and runs the train
+    step on it. This depends on private Keras attributes and is only done for the plain single-device, single-step
+    setup, so it is opt-in.
+    """
+    def __init__(self, telemetry, phase, measure_input_wait=False, export_every_epoch=True):
+        super(TelemetryCallback, self).__init__()
+        self.telemetry = telemetry
+        self.phase = phase
+        self.measure_input_wait = measure_input_wait
+        self.export_every_epoch = export_every_epoch
+        self._original_train_function = None
+        self._input_wait = None
+
+    def _input_wait_supported(self):
+        model = self.model
+        single_step = model._steps_per_execution is None or int(model._steps_per_execution.numpy()) == 1
+        return (single_step and not model.run_eagerly and model._cluster_coordinator is None
+                and not tf.distribute.has_strategy() and model.distribute_strategy.num_replicas_in_sync == 1)
+
+    def _timed_train_function(self):
+        model = self.model
+
+        def run_step(data):
+            outputs = model.train_step(data)
+            model._train_counter.assign_add(1)
+            return outputs
+
+        compiled_step = tf.function(run_step, jit_compile=bool(model.jit_compile), reduce_retracing=True)
+
+        def train_function(iterator):
+            start_time = time.perf_counter()
+            data = next(iterator)
+            self._input_wait = time.perf_counter() - start_time
+            return compiled_step(data)
+
+        return train_function
+
+    def on_train_begin(self, logs=None):
+        if self.measure_input_wait:
+            missing = [name for name in INPUT_WAIT_MODEL_ATTRIBUTES if not hasattr(self.model, name)]
+            if missing:
+                raise RuntimeError(f"Measuring the input wait needs the model attributes {missing}, which this Keras "
+                                   "version does not have; run without --telemetry-input-wait")
+            if self._input_wait_supported():
+                self._original_train_function = self.model.train_function
+                self.model.train_function = self._timed_train_function()
+            else:
+                logging.warning(f"[{self.phase}] The input wait is only measured for single-device, single-step "
+                                "training; recording step times only")
+        self.telemetry.record("phase_start", phase=self.phase)
+
+    def on_train_end(self, logs=None):
+        if self._original_train_function is not None:
+            self.model.train_function = self._original_train_function
+            self._original_train_function = None
+        self.telemetry.record("phase_end", phase=self.phase)
+        if self.export_every_epoch and self.telemetry.output_path:
+            self.telemetry.export_jsonl(self.telemetry.output_path)
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self._epoch = epoch
+        self._epoch_start = time.perf_counter()
+        self._step_times = []
+        self._input_waits = []
+
+    def on_train_batch_begin(self, batch, logs=None):
+        self._batch_start = time.perf_counter()
+
+    def on_train_batch_end(self, batch, logs=None):
+        step_time = time.perf_counter() - self._batch_start
+        self._step_times.append(step_time)
+        fields = {"phase": self.phase, "epoch": self._epoch, "batch": batch, "step_ms": step_time * 1000}
+        if self._input_wait is not None:
+            self._input_waits.append(self._input_wait)
+            fields["input_wait_ms"] = self._input_wait * 1000
+            self._input_wait = None
+        self.telemetry.record("step", **fields)
+
+    def on_epoch_end(self, epoch, logs=None):
+        epoch_time = time.perf_counter() - self._epoch_start
+        step_times = np.array(self._step_times)
+        fields = {"phase": self.phase, "epoch": epoch, "epoch_seconds": epoch_time, "steps": len(step_times),
+                  "mean_step_ms": float(step_times.mean() * 1000) if len(step_times) else 0.0,
+                  "p99_step_ms": float(np.percentile(step_times, 99) * 1000) if len(step_times) else 0.0}
+        if self._input_waits:
+            input_wait = float(np.sum(self._input_waits))
+            fields["mean_input_wait_ms"] = input_wait / len(self._input_waits) * 1000
+            fields["input_wait_fraction"] = input_wait / epoch_time
+        self.telemetry.record("epoch", **fields)
+
+        message = (f"[{self.phase}] epoch {epoch + 1}: {epoch_time:.1f}s, {fields['mean_step_ms']:.1f} ms/step "
+                   f"(p99 {fields['p99_step_ms']:.1f} ms)")
+        if "input_wait_fraction" in fields:
+            message += f", {100 * fields['input_wait_fraction']:.1f}% waiting for input"
+        logging.info(message)
+        if self.export_every_epoch and self.telemetry.output_path:
+            self.telemetry.export_jsonl(self.telemetry.output_path)
@@ -0,0 +1,39 @@
+# utils/training_callbacks.py
+
+import time
+import logging
+import numpy as np
+import tensorflow as tf
+
+class TimeToTarget(tf.keras.callbacks.Callback):
+    """
+    Record the elapsed training time at every epoch end, and the epoch and time at which
+    `monitor` first reaches `target` (if a target is given).
+    """
+    def __init__(self, monitor="val_accuracy", target=None):
+        super(TimeToTarget, self).__init__()
+        self.monitor = monitor
+        self.target = target
+        self.reached = None
+
+    def on_train_begin(self, logs=None):
+        self.start_time = time.perf_counter()
+        self.elapsed = []
+        self.values = []
+
+    def on_epoch_end(self, epoch, logs=None):
+        logs = logs or {}
+        self.elapsed.append(time.perf_counter() - self.start_time)
+        self.values.append(logs.get(self.monitor, np.nan))
+        if self.target is not None and self.reached is None and logs.get(self.monitor, -np.inf) >= self.target:
+            self.reached = {"epochs": len(self.elapsed), "seconds": self.elapsed[-1]}
+            logging.info(f"{self.monitor} reached {self.target:.4f} after {len(self.elapsed)} epochs "
+                         f"({self.elapsed[-1]:.1f}s).")
+
+    def best(self):
+        """Best monitored value of this run, with the epochs and time it took to get there."""
+        if not self.values or np.all(np.isnan(self.values)):
+            return None
+        best_epoch = int(np.nanargmax(self.values))
+        return {"value": float(self.values[best_epoch]), "epochs": best_epoch + 1,
+                "seconds": self.elapsed[best_epoch]}
@@ -0,0 +1,44 @@
+# utils/training_state.py
+
+import os
+import json
+import time
+import logging
+
+STATE_FILENAME = "training_state.json"
+
+# Phases of the training pipeline, in the order they run
+PHASES = ("material", "evolution", "full")
+
+def load_training_state(checkpoint_dir):
+    """
+    Load the persisted pipeline state, or start a new one.
+    The run id replaces per-start timestamps in file names, so a restarted run finds its own checkpoints.
+    """
+    path = os.path.join(checkpoint_dir, STATE_FILENAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        logging.info(f"Resuming run {state['run_id']}, completed phases: {state['completed_phases'] or 'none'}")
+        return state
+    return {"run_id": int(time.time()), "completed_phases": []}
+
+def save_training_state(checkpoint_dir, state):
+    """Write the state atomically, so a crash while saving never leaves a corrupt state file."""
+    path = os.path.join(checkpoint_dir, STATE_FILENAME)
+    with open(path + ".tmp", "w") as f:
+        json.dump(state, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def is_phase_complete(state, phase):
+    return phase in state["completed_phases"]
+
+def mark_phase_complete(checkpoint_dir, state, phase):
+    if phase not in state["completed_phases"]:
+        state["completed_phases"].append(phase)
+    save_training_state(checkpoint_dir, state)
+    logging.info(f"Phase '{phase}' completed and recorded in {STATE_FILENAME}.")
+
+def backup_dir_for(checkpoint_dir, phase):
+    """Directory for the mid-phase backup (weights, optimizer state and epoch) of a training phase."""
+    return os.path.join(checkpoint_dir, f"backup_{phase}")